@@ -0,0 +1,28 @@
+"""
+Сетевой выключатель как библиотека для других программ на Python
+
+    from network_switch import Monitor, Profile, Action
+
+    monitor = Monitor(Profile({'interface': 'eth0', 'threshold': 100 * 1024}),
+                      action=Action(lambda mode: print('загрузка завершена')),
+                      on_event=print)
+    monitor.start()
+    ...
+    monitor.stop()
+
+Код программы находится в модуле network_switch.core; файл последней версии
+рядом с пакетом только запускает его
+"""
+from network_switch import core
+
+Monitor = core.Monitor
+MonitorEvent = core.MonitorEvent
+Profile = core.Profile
+CounterSource = core.CounterSource
+PsutilCounters = core.PsutilCounters
+Action = core.Action
+TRIGGER_MODES = core.TRIGGER_MODES
+ACTION_NAMES = core.ACTION_NAMES
+
+__all__ = ['Monitor', 'MonitorEvent', 'Profile', 'CounterSource', 'PsutilCounters', 'Action',
+           'TRIGGER_MODES', 'ACTION_NAMES']
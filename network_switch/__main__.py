@@ -0,0 +1,11 @@
+"""
+Запуск программы как модуля: python -m network_switch [команда и параметры]
+То же, что запуск файла программы "Сетевой выключатор_v1.3.0.py"
+"""
+import sys
+
+from network_switch import core
+
+if len(sys.argv) > 1:
+    sys.exit(core.run_cli(sys.argv[1:]))
+core.main()
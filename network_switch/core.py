@@ -0,0 +1,5423 @@
+import os
+import sys
+import time
+import threading
+import re
+import math
+import ctypes
+import mmap
+import bisect
+import itertools
+import struct
+import warnings
+import contextlib
+import importlib
+import heapq
+from array import array
+from collections import deque, namedtuple
+
+# Платформенные и необязательные модули (msvcrt, winsound, termios, subprocess, argparse,
+# concurrent.futures, numpy) импортируются в функциях, которым они нужны, а json, csv,
+# signal, copy, tempfile и psutil - при первом обращении: меню и первый замер
+# не должны ждать их загрузки
+
+class LazyModule:
+    """Модуль, который импортируется при первом обращении к его атрибутам"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+psutil = LazyModule('psutil')
+json = LazyModule('json')
+csv = LazyModule('csv')
+signal = LazyModule('signal')
+copy = LazyModule('copy')
+tempfile = LazyModule('tempfile')
+
+CONFIG_FILE = "profiles.json"
+HISTORY_FILE = "history.rrd"
+
+# Уровни хранения истории: (шаг в секундах, количество ячеек)
+HISTORY_TIERS = (
+    (1, 3600),      # 1 сек за последний час
+    (60, 1440),     # 1 мин за последние сутки
+    (900, 2976),    # 15 мин за последний месяц (31 день)
+)
+HISTORY_SAVE_INTERVAL = 60  # Как часто сбрасывать историю на диск (сек)
+
+JOURNAL_FILE = "journal.bin"
+JOURNAL_BLOCK_SIZE = 4096   # Размер блока журнала (байт)
+JOURNAL_BLOCKS = 2048       # Количество блоков в кольце (8 МБ)
+JOURNAL_TAG_BYTES = 31      # Наибольшая длина метки интерфейсов в заголовке блока (байт UTF-8)
+
+ANALYZE_CHUNK = 1 << 20     # Замеров в одном блоке при пакетном анализе
+ANALYZE_MAX_GAP = 300       # Разрыв между замерами (сек), после которого серия прерывается
+
+QUANTILE_SLOTS = 16              # На сколько частей делится окно перцентильного триггера
+QUANTILE_BUCKETS_PER_OCTAVE = 8  # Точность гистограммы: ~9% на корзину
+
+# Режимы срабатывания
+TRIGGER_MODES = {
+    't': 'Порог: замер ниже пороговой скорости',
+    'p': 'Перцентиль скорости за окно ниже порога',
+    'a': 'Падение относительно обычной скорости (адаптивный порог)',
+    'c': 'Обнаружение изменения скорости (CUSUM)',
+    'f': 'Прогноз момента окончания загрузки',
+    'v': 'Объем: получено (отправлено) заданное количество данных',
+    'r': 'Правила из профиля (сеть, диски, процессор, процессы, ступени)',
+    'i': 'Простой: взвешенная оценка сети, дисков, процессора и ввода пользователя'
+}
+
+ACTION_NAMES = {
+    's': 'выключение',
+    'r': 'перезагрузка',
+    'h': 'переход в спящий режим',
+    'b': 'звуковой сигнал'
+}
+
+# Значения профиля по умолчанию
+PROFILE_DEFAULTS = {
+    "traffic_type": "d",
+    "allowed_failures": 3,
+    "threshold": 0.1 * 1024**2,
+    "interval": 10,
+    "shutdown_delay": 30,
+    "action_mode": "s",
+    "monitor_disk": False
+}
+
+BUDGET_SMOOTHING = 0.2      # Вес нового замера в сглаженной скорости режима v
+BUDGET_FINE_WINDOW = 60     # За сколько секунд до прогноза переходить к частым замерам
+BUDGET_FINE_STEP = 1        # Минимальный интервал замеров вблизи цели (сек)
+BUDGET_MAX_SLEEP = 900      # Максимальный интервал между замерами (сек)
+
+BASELINE_ALPHA = 0.05           # Вес нового замера в скользящем среднем обычной скорости
+BASELINE_WARMUP = 10            # Сколько активных замеров нужно, прежде чем доверять базе
+FORECAST_MIN_COUNTDOWN = 5      # Наименьший обратный отсчет по прогнозу: время отменить действие (ESC)
+BASELINE_SAVE_INTERVAL = 600    # Как часто сохранять базу в профиль (сек)
+CUSUM_MIN_K = 0.05              # Наименьшее опорное значение k CUSUM (в единицах сигмы)
+
+# Сигналы режима i: вес, порог и период чтения (сек). Порог сети по умолчанию - порог профиля (МБ/с),
+# дисков - МБ/с самого загруженного устройства, процессора - %, ввода - секунды без ввода пользователя
+IDLE_SIGNALS = {
+    'net': {'weight': 2.0, 'threshold': None, 'every': 0},
+    'disk': {'weight': 1.0, 'threshold': 1.0, 'every': 30},
+    'cpu': {'weight': 1.0, 'threshold': 10.0, 'every': 10},
+    'input': {'weight': 1.0, 'threshold': 300, 'every': 5}
+}
+IDLE_LEVEL = 0.8        # Оценка простоя, начиная с которой замер считается пропуском
+BUSY_LEVEL = 0.4        # Оценка, ниже которой компьютер точно занят; между ними проверяются процессы
+IDLE_SCAN_MAX_AGE = 120 # Через сколько секунд снимок процессов устаревает
+
+ADAPTIVE_MARGIN = 4     # Во сколько раз скорость должна превышать порог, чтобы проверки дисков начали откладываться
+
+REPLAY_MAX_LINES = 20       # Сколько срабатываний выводить при воспроизведении трассы
+
+DAEMON_LOG_FILE = "network_switch.log"
+
+TIMER_MAX_WAIT = 30     # Не спать дольше (сек), чтобы заметить скачок часов после спящего режима
+TIMER_GRACE = 300       # Насколько (сек) таймер может опоздать, прежде чем срабатывание пропускается
+TIMER_COUNTDOWN = 30    # Обратный отсчет (сек) перед действием таймера: его можно отменить
+WEEKDAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+HOOK_TIMEOUT = 60       # Время на одну подготовительную команду по умолчанию (сек)
+HOOKS_DEADLINE = 120    # Общий срок подготовительных команд от начала отсчета по умолчанию (сек)
+
+PROFILE_POLL_INTERVAL = 2       # Период проверки файла профилей, если уведомления системы недоступны (сек)
+PROFILE_STATE_KEYS = ('baseline',)  # Ключи профиля, которые программа сама обновляет во время мониторинга
+
+CONTROL_MAX_MESSAGE = 64 * 1024     # Максимальный размер запроса и ответа управления (байт)
+
+STARTUP_RUNS = 5                # Сколько запусков делает замер времени старта
+STARTUP_MENU_BUDGET = 0.1       # Допустимое время от запуска до меню (сек)
+STARTUP_SAMPLE_BUDGET = 0.1     # Допустимое время от запуска до первого замера (сек)
+STARTUP_TIMEOUT = 30            # Сколько ждать запущенную копию программы (сек)
+
+# Файл запуска программы рядом с пакетом network_switch (код программы - в этом модуле)
+PROGRAM_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAUNCHER = os.path.join(PROGRAM_FOLDER, "Сетевой выключатор_v1.3.0.py")
+
+# Коды завершения при запуске без меню
+EXIT_DONE = 0       # Действие выполнено
+EXIT_ERROR = 1      # Ошибка: профиль или интерфейс не найден, мониторинг прерван ошибкой
+EXIT_STOPPED = 3    # Остановлено (Ctrl+C, сигнал завершения) до выполнения действия
+
+FLIGHT_RECORDS_DIR = "flight_records"
+FLIGHT_RECORDER_MINUTES = 15    # Сколько последних минут хранит бортовой самописец
+
+# Списки процессов для мониторинга
+GAME_LAUNCHERS = [
+    'steam.exe', 'epicgameslauncher.exe', 'origin.exe', 
+    'battle.net.exe', 'goggalaxy.exe', 'ubisoftconnect.exe',
+    'eaapp.exe', 'riotclient.exe', 'bethesda.net.exe'
+]
+
+SYSTEM_PROCESSES = [
+    'system', 'svchost.exe', 'explorer.exe', 'searchindexer.exe',
+    'dllhost.exe', 'taskhostw.exe', 'wininit.exe', 'csrss.exe',
+    'winlogon.exe', 'services.exe', 'lsass.exe', 'smss.exe'
+]
+
+class LastInputInfo(ctypes.Structure):
+    """Структура LASTINPUTINFO для GetLastInputInfo"""
+    _fields_ = [('cbSize', ctypes.c_uint), ('dwTime', ctypes.c_uint)]
+
+class Luid(ctypes.Structure):
+    """Структура LUID (идентификатор привилегии)"""
+    _fields_ = [('LowPart', ctypes.c_uint32), ('HighPart', ctypes.c_int32)]
+
+class TokenPrivileges(ctypes.Structure):
+    """Структура TOKEN_PRIVILEGES с одной привилегией"""
+    _fields_ = [('PrivilegeCount', ctypes.c_uint32), ('Luid', Luid), ('Attributes', ctypes.c_uint32)]
+
+TOKEN_ADJUST_PRIVILEGES = 0x0020
+TOKEN_QUERY = 0x0008
+SE_PRIVILEGE_ENABLED = 0x0002
+ERROR_NOT_ALL_ASSIGNED = 1300
+SHTDN_REASON_PLANNED_APPLICATION = 0x80040000  # SHTDN_REASON_FLAG_PLANNED | SHTDN_REASON_MAJOR_APPLICATION
+
+# Уведомления об изменении файлов: inotify (Linux) и ReadDirectoryChangesW (Windows)
+IN_CLOSE_WRITE = 0x0008
+IN_MOVED_FROM = 0x0040
+IN_MOVED_TO = 0x0080
+IN_DELETE = 0x0200
+FILE_LIST_DIRECTORY = 0x0001
+FILE_SHARE_ALL = 0x0007             # FILE_SHARE_READ | FILE_SHARE_WRITE | FILE_SHARE_DELETE
+OPEN_EXISTING = 3
+FILE_FLAG_BACKUP_SEMANTICS = 0x02000000
+FILE_NOTIFY_CHANGES = 0x0019        # FILE_NAME | SIZE | LAST_WRITE
+THREAD_TERMINATE = 0x0001
+
+class PlatformBackend:
+    """
+    Платформенные операции: действия питания, дисплей, звук, клавиатура и время без ввода
+    Клавиши: ESC - b'\\x1b', Ctrl+S - b'\\x13', Ctrl+D - b'\\x04', Enter - b'\\r'
+    """
+    name = "без поддержки платформы"
+
+    def shutdown(self):
+        raise NotImplementedError(f"выключение не поддерживается ({self.name})")
+
+    def reboot(self):
+        raise NotImplementedError(f"перезагрузка не поддерживается ({self.name})")
+
+    def hibernate(self):
+        raise NotImplementedError(f"спящий режим не поддерживается ({self.name})")
+
+    def cancel_shutdown(self):
+        """Отменяет выключение, запланированное средствами системы"""
+
+    def beep(self):
+        print('\a', end='', flush=True)
+
+    def display_off(self):
+        raise NotImplementedError(f"выключение дисплея не поддерживается ({self.name})")
+
+    def idle_seconds(self):
+        """Время (сек) с последнего ввода пользователя или None, если оно недоступно"""
+        return None
+
+    def enable_keys(self):
+        """Включает чтение отдельных клавиш (на время мониторинга и обратного отсчета)"""
+
+    def disable_keys(self):
+        """Возвращает обычный построчный ввод"""
+
+    def key_pressed(self):
+        return False
+
+    def read_key(self):
+        """Ждет нажатия клавиши"""
+        sys.stdin.readline()
+        return b'\r'
+
+class WindowsBackend(PlatformBackend):
+    """
+    Windows: InitiateSystemShutdownEx/AbortSystemShutdown, PowrProf, winsound, user32
+    и консоль msvcrt. Действия питания вызываются напрямую, без запуска shutdown.exe
+    """
+    name = "Windows"
+
+    def __init__(self):
+        self.privilege_enabled = False
+        self.pending = False
+
+    def enable_shutdown_privilege(self):
+        """Включает привилегию SeShutdownPrivilege для текущего процесса (один раз)"""
+        if self.privilege_enabled:
+            return
+        advapi32 = ctypes.WinDLL('advapi32', use_last_error=True)
+        kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        kernel32.GetCurrentProcess.restype = ctypes.c_void_p
+        token = ctypes.c_void_p()
+        if not advapi32.OpenProcessToken(ctypes.c_void_p(kernel32.GetCurrentProcess()),
+                                         TOKEN_ADJUST_PRIVILEGES | TOKEN_QUERY, ctypes.byref(token)):
+            raise ctypes.WinError(ctypes.get_last_error())
+        try:
+            privileges = TokenPrivileges(1, Luid(), SE_PRIVILEGE_ENABLED)
+            if not advapi32.LookupPrivilegeValueW(None, "SeShutdownPrivilege", ctypes.byref(privileges.Luid)):
+                raise ctypes.WinError(ctypes.get_last_error())
+            if not advapi32.AdjustTokenPrivileges(token, False, ctypes.byref(privileges), 0, None, None):
+                raise ctypes.WinError(ctypes.get_last_error())
+            # AdjustTokenPrivileges возвращает успех и тогда, когда привилегия не назначена -
+            # это видно только по коду последней ошибки
+            if ctypes.get_last_error() == ERROR_NOT_ALL_ASSIGNED:
+                raise ctypes.WinError(ERROR_NOT_ALL_ASSIGNED,
+                                      "учетной записи не назначена привилегия выключения (SeShutdownPrivilege)")
+        finally:
+            kernel32.CloseHandle(token)
+        self.privilege_enabled = True
+
+    def initiate_shutdown(self, reboot):
+        self.enable_shutdown_privilege()
+        advapi32 = ctypes.WinDLL('advapi32', use_last_error=True)
+        # Без задержки, с закрытием приложений без сохранения (как shutdown /f /t 0)
+        if not advapi32.InitiateSystemShutdownExW(None, None, 0, True, reboot, SHTDN_REASON_PLANNED_APPLICATION):
+            raise ctypes.WinError(ctypes.get_last_error())
+        self.pending = True
+
+    def shutdown(self):
+        self.initiate_shutdown(False)
+
+    def reboot(self):
+        self.initiate_shutdown(True)
+
+    def hibernate(self):
+        ctypes.windll.PowrProf.SetSuspendState(0, 1, 0)
+
+    def cancel_shutdown(self):
+        if not self.pending:
+            return
+        advapi32 = ctypes.WinDLL('advapi32', use_last_error=True)
+        if advapi32.AbortSystemShutdownW(None):
+            print("\n✅ Выключение системы отменено")
+        self.pending = False
+
+    def beep(self):
+        import winsound
+        winsound.Beep(1000, 500)  # Частота 1000 Гц, длительность 500 мс
+
+    def display_off(self):
+        ctypes.windll.user32.SendMessageW(0xFFFF, 0x0112, 0xF170, 2)
+
+    def idle_seconds(self):
+        info = LastInputInfo()
+        info.cbSize = ctypes.sizeof(info)
+        if not ctypes.windll.user32.GetLastInputInfo(ctypes.byref(info)):
+            return None
+        # GetTickCount переполняется каждые 49 дней, поэтому разность берется по модулю 2^32
+        return ((ctypes.windll.kernel32.GetTickCount() - info.dwTime) & 0xFFFFFFFF) / 1000
+
+    def key_pressed(self):
+        import msvcrt
+        return msvcrt.kbhit()
+
+    def read_key(self):
+        import msvcrt
+        return msvcrt.getch()
+
+class LinuxBackend(PlatformBackend):
+    """
+    Linux: действия питания - вызовы logind по D-Bus (пакет jeepney; без него - systemctl),
+    DPMS через xset или setterm, звонок терминала, чтение клавиш через termios;
+    xprintidle - время без ввода в X, если установлен
+    """
+    name = "Linux"
+
+    def __init__(self):
+        self.saved_terminal = None
+        self.keys_users = 0     # Посимвольный ввод нужен мониторингу и отсчету таймера одновременно
+        self.keys_lock = threading.Lock()
+        self.pending = False
+
+    def run(self, *command):
+        import subprocess
+        subprocess.run(command, check=True, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+    def logind(self, method, fallback):
+        """Вызывает метод org.freedesktop.login1.Manager (без запроса пароля)"""
+        try:
+            from jeepney import DBusAddress, new_method_call
+            from jeepney.io.blocking import open_dbus_connection
+            from jeepney.wrappers import unwrap_msg
+        except ImportError:
+            self.run('systemctl', fallback)
+            return
+        manager = DBusAddress('/org/freedesktop/login1', bus_name='org.freedesktop.login1',
+                              interface='org.freedesktop.login1.Manager')
+        with open_dbus_connection(bus='SYSTEM') as connection:
+            unwrap_msg(connection.send_and_get_reply(new_method_call(manager, method, 'b', (False,))))
+
+    def shutdown(self):
+        self.logind('PowerOff', 'poweroff')
+        self.pending = True
+
+    def reboot(self):
+        self.logind('Reboot', 'reboot')
+        self.pending = True
+
+    def hibernate(self):
+        self.logind('Hibernate', 'hibernate')
+
+    def cancel_shutdown(self):
+        if not self.pending:
+            return
+        try:
+            from jeepney import DBusAddress, new_method_call
+            from jeepney.io.blocking import open_dbus_connection
+        except ImportError:
+            return
+        manager = DBusAddress('/org/freedesktop/login1', bus_name='org.freedesktop.login1',
+                              interface='org.freedesktop.login1.Manager')
+        with open_dbus_connection(bus='SYSTEM') as connection:
+            connection.send_and_get_reply(new_method_call(manager, 'CancelScheduledShutdown'))
+        self.pending = False
+
+    def display_off(self):
+        if os.environ.get('DISPLAY'):
+            self.run('xset', 'dpms', 'force', 'off')
+        else:
+            self.run('setterm', '--blank', 'force')
+
+    def idle_seconds(self):
+        import shutil
+        import subprocess
+        if not os.environ.get('DISPLAY') or not shutil.which('xprintidle'):
+            return None
+        try:
+            result = subprocess.run(['xprintidle'], capture_output=True, text=True, timeout=2)
+            return int(result.stdout) / 1000
+        except (OSError, ValueError, subprocess.SubprocessError):
+            return None
+
+    def set_keys_mode(self, fd):
+        """Посимвольный ввод без эха; Ctrl+S не останавливает вывод терминала"""
+        import termios
+        saved = termios.tcgetattr(fd)
+        mode = termios.tcgetattr(fd)
+        mode[0] &= ~termios.IXON
+        mode[3] &= ~(termios.ICANON | termios.ECHO)
+        mode[6][termios.VMIN] = 1
+        mode[6][termios.VTIME] = 0
+        termios.tcsetattr(fd, termios.TCSANOW, mode)
+        return saved
+
+    def enable_keys(self):
+        with self.keys_lock:
+            self.keys_users += 1
+            if self.saved_terminal is None and sys.stdin and sys.stdin.isatty():
+                self.saved_terminal = self.set_keys_mode(sys.stdin.fileno())
+
+    def disable_keys(self):
+        import termios
+        with self.keys_lock:
+            self.keys_users = max(self.keys_users - 1, 0)
+            if self.saved_terminal is not None and not self.keys_users:
+                termios.tcsetattr(sys.stdin.fileno(), termios.TCSADRAIN, self.saved_terminal)
+                self.saved_terminal = None
+
+    def key_pressed(self):
+        import select
+        # Вне мониторинга клавиши не читаются, чтобы не перехватывать ввод меню
+        if self.saved_terminal is None:
+            return False
+        return bool(select.select([sys.stdin], [], [], 0)[0])
+
+    def read_key(self):
+        import select
+        import termios
+        fd = sys.stdin.fileno()
+        temporary = self.saved_terminal is None
+        saved = self.set_keys_mode(fd) if temporary and sys.stdin.isatty() else None
+        try:
+            key = os.read(fd, 1)
+            if key == b'\x1b' and select.select([fd], [], [], 0.05)[0]:
+                # Последовательность стрелок и функциональных клавиш, а не ESC
+                os.read(fd, 16)
+                return b''
+            return b'\r' if key == b'\n' else key
+        finally:
+            if saved is not None:
+                termios.tcsetattr(fd, termios.TCSADRAIN, saved)
+
+class DryRunBackend(PlatformBackend):
+    """Пробный запуск: действия питания и дисплея только выводятся, остальное - как на платформе"""
+
+    def __init__(self, platform):
+        self.platform = platform
+        self.name = f"пробный запуск ({platform.name})"
+        self.performed = []
+
+    def simulate(self, what):
+        self.performed.append(what)
+        print(f"\n🧪 Пробный запуск: {what} не выполняется")
+
+    def shutdown(self):
+        self.simulate("выключение")
+
+    def reboot(self):
+        self.simulate("перезагрузка")
+
+    def hibernate(self):
+        self.simulate("спящий режим")
+
+    def display_off(self):
+        self.simulate("выключение дисплея")
+
+    def beep(self):
+        self.platform.beep()
+
+    def idle_seconds(self):
+        return self.platform.idle_seconds()
+
+    def enable_keys(self):
+        self.platform.enable_keys()
+
+    def disable_keys(self):
+        self.platform.disable_keys()
+
+    def key_pressed(self):
+        return self.platform.key_pressed()
+
+    def read_key(self):
+        return self.platform.read_key()
+
+def detect_backend():
+    """Выбирает реализацию платформенных операций для текущей системы"""
+    if os.name == 'nt':
+        return WindowsBackend()
+    if sys.platform.startswith('linux'):
+        return LinuxBackend()
+    return PlatformBackend()
+
+BACKEND = detect_backend()
+
+def enable_dry_run():
+    """Переключает на пробный запуск: действия питания и дисплея только выводятся"""
+    global BACKEND
+    if not isinstance(BACKEND, DryRunBackend):
+        BACKEND = DryRunBackend(BACKEND)
+    return BACKEND
+
+def turn_off_display():
+    """Выключает дисплей"""
+    try:
+        BACKEND.display_off()
+        print("\n🖥️ Дисплей выключен")
+    except Exception as e:
+        print(f"❌ Ошибка при выключении дисплея: {e}")
+
+def seconds_since_input():
+    """Возвращает время (сек) с последнего ввода пользователя или None, если оно недоступно"""
+    try:
+        return BACKEND.idle_seconds()
+    except (AttributeError, OSError):
+        return None
+
+def parse_time_input(time_str):
+    """Разбирает строку времени в формате 1h30m15s"""
+    if not time_str:
+        return 0
+    
+    cleaned = re.sub(r'[^0-9hms]', '', time_str.lower())
+    
+    hours = minutes = seconds = 0
+    
+    if 'h' in cleaned:
+        parts = cleaned.split('h', 1)
+        hours = int(parts[0]) if parts[0] else 0
+        cleaned = parts[1] if len(parts) > 1 else ''
+    
+    if 'm' in cleaned:
+        parts = cleaned.split('m', 1)
+        minutes = int(parts[0]) if parts[0] else 0
+        cleaned = parts[1] if len(parts) > 1 else ''
+    
+    if 's' in cleaned:
+        parts = cleaned.split('s', 1)
+        seconds = int(parts[0]) if parts[0] else 0
+    
+    return hours * 3600 + minutes * 60 + seconds
+
+def format_time(seconds):
+    """Форматирует секунды в читаемый вид"""
+    hours = seconds // 3600
+    minutes = (seconds % 3600) // 60
+    seconds = seconds % 60
+    
+    parts = []
+    if hours > 0:
+        parts.append(f"{hours}h")
+    if minutes > 0 or hours > 0:
+        parts.append(f"{minutes}m")
+    parts.append(f"{seconds}s")
+    
+    return " ".join(parts)
+
+def is_game_launcher(pid):
+    """Проверяет, является ли процесс игровым лаунчером"""
+    try:
+        process = psutil.Process(pid)
+        name = process.name().lower()
+        return any(launcher in name for launcher in GAME_LAUNCHERS)
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return False
+
+def is_system_process(pid):
+    """Проверяет, является ли процесс системным"""
+    try:
+        process = psutil.Process(pid)
+        name = process.name().lower()
+        return name in SYSTEM_PROCESSES
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return False
+
+def check_disk_activity(threshold=1.0, report=print):
+    """
+    Проверяет активность дисков
+    threshold - порог в МБ/с (по умолчанию 1 МБ/с), report - куда выводить сообщения
+    Возвращает True если есть значимая активность
+    """
+    try:
+        # Получаем начальные значения
+        disk_start = psutil.disk_io_counters()
+        processes_start = {}
+        
+        for proc in psutil.process_iter(['pid', 'name', 'io_counters']):
+            try:
+                io = proc.info['io_counters']
+                if io is not None:
+                    processes_start[proc.info['pid']] = {
+                        'read_bytes': io.read_bytes,
+                        'write_bytes': io.write_bytes
+                    }
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        
+        # Ждем 1 секунду для измерения скорости
+        time.sleep(1)
+        
+        # Получаем конечные значения
+        disk_end = psutil.disk_io_counters()
+        total_bytes = (disk_end.read_bytes + disk_end.write_bytes - 
+                      disk_start.read_bytes - disk_start.write_bytes)
+        speed_mb = total_bytes / (1024 * 1024)  # МБ/с
+        
+        # Если активность ниже порога, можно пропустить
+        if speed_mb < threshold:
+            return False
+        
+        # Проверяем, какие процессы вызывали активность
+        active_processes = set()
+        for proc in psutil.process_iter(['pid', 'name', 'io_counters']):
+            try:
+                if proc.info['pid'] in processes_start:
+                    start_io = processes_start[proc.info['pid']]
+                    end_io = proc.info['io_counters']
+                    
+                    if end_io is None:
+                        continue
+                        
+                    read_diff = end_io.read_bytes - start_io['read_bytes']
+                    write_diff = end_io.write_bytes - start_io['write_bytes']
+                    
+                    if read_diff > 0 or write_diff > 0:
+                        if not is_system_process(proc.info['pid']):
+                            active_processes.add(proc.info['name'])
+            
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        
+        if active_processes:
+            report(f"\n💾 Активность дисков: {speed_mb:.2f} МБ/с (процессы: {', '.join(active_processes)})")
+            return True
+        
+        return False
+    
+    except Exception as e:
+        report(f"⚠️ Ошибка проверки дисков: {e}")
+        return False
+
+class HistoryTier:
+    """
+    Кольцевой буфер одного уровня истории (в стиле RRD)
+    Каждая ячейка хранит сумму, количество, минимум и максимум
+    значений за свой интервал, поэтому консолидация выполняется за O(1)
+    """
+    __slots__ = ('step', 'size', 'slots', 'sums', 'counts', 'mins', 'maxs')
+
+    def __init__(self, step, size):
+        self.step = step
+        self.size = size
+        self.slots = array('q', [-1]) * size   # Номер интервала, занимающего ячейку
+        self.sums = array('d', [0.0]) * size
+        self.counts = array('q', [0]) * size
+        self.mins = array('d', [0.0]) * size
+        self.maxs = array('d', [0.0]) * size
+
+    def add(self, timestamp, value):
+        """Добавляет значение в ячейку, соответствующую моменту времени"""
+        slot = int(timestamp) // self.step
+        idx = slot % self.size
+        if self.slots[idx] != slot:
+            # Ячейка занята устаревшим интервалом - перезаписываем
+            self.slots[idx] = slot
+            self.sums[idx] = value
+            self.counts[idx] = 1
+            self.mins[idx] = value
+            self.maxs[idx] = value
+            return
+        self.sums[idx] += value
+        self.counts[idx] += 1
+        if value < self.mins[idx]:
+            self.mins[idx] = value
+        if value > self.maxs[idx]:
+            self.maxs[idx] = value
+
+    def rows(self, since, until):
+        """Возвращает [(начало интервала, avg, min, max)] за период в хронологическом порядке"""
+        first = int(since) // self.step
+        last = int(until) // self.step
+        first = max(first, last - self.size + 1)
+        result = []
+        for slot in range(first, last + 1):
+            idx = slot % self.size
+            if self.slots[idx] == slot and self.counts[idx]:
+                result.append((slot * self.step,
+                               self.sums[idx] / self.counts[idx],
+                               self.mins[idx],
+                               self.maxs[idx]))
+        return result
+
+class HistoryStore:
+    """
+    Многоуровневое хранилище истории скорости с фиксированным объемом памяти
+    Объем не зависит от длительности мониторинга - старые ячейки перезаписываются
+    Файл: MAGIC, версия формата, уровни (шаг, размер), затем столбцы уровней
+    (int64 и double) в порядке байт little-endian - файл переносится между системами
+    """
+    MAGIC = b'NSHIST'
+    VERSION = 2
+    # Версия 1: счетчики в формате long платформы (4 байта в Windows, 8 в Linux)
+    # и порядок байт платформы; такой файл читается только там, где записан
+    LEGACY_MAGIC = b'NSHIST01'
+
+    def __init__(self, tiers=HISTORY_TIERS):
+        self.tiers = [HistoryTier(step, size) for step, size in tiers]
+
+    def add(self, timestamp, value):
+        """Добавляет замер во все уровни истории"""
+        for tier in self.tiers:
+            tier.add(timestamp, value)
+
+    def tier_for(self, span):
+        """Подбирает самый подробный уровень, покрывающий заданный период"""
+        for tier in self.tiers:
+            if tier.step * tier.size >= span:
+                return tier
+        return self.tiers[-1]
+
+    def save(self, path=HISTORY_FILE):
+        """Атомарно сохраняет историю в двоичный файл"""
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as file:
+            file.write(self.MAGIC + struct.pack('<H', self.VERSION))
+            file.write(struct.pack('<I', len(self.tiers)))
+            for tier in self.tiers:
+                file.write(struct.pack('<II', tier.step, tier.size))
+            for tier in self.tiers:
+                for column in (tier.slots, tier.sums, tier.counts, tier.mins, tier.maxs):
+                    if sys.byteorder == 'big':
+                        column = array(column.typecode, column)
+                        column.byteswap()
+                    column.tofile(file)
+            # Данные должны быть на диске до замены: иначе после сбоя питания
+            # на месте истории может оказаться пустой файл
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=HISTORY_FILE, tiers=HISTORY_TIERS):
+        """Загружает историю из файла; при несовпадении формата начинает с пустой"""
+        store = cls(tiers)
+        try:
+            with open(path, 'rb') as file:
+                head = file.read(len(cls.LEGACY_MAGIC))
+                legacy = head == cls.LEGACY_MAGIC
+                if not legacy and head != cls.MAGIC + struct.pack('<H', cls.VERSION):
+                    return store
+                count, = struct.unpack('<I', file.read(4))
+                saved = [struct.unpack('<II', file.read(8)) for _ in range(count)]
+                if saved != [tuple(t) for t in tiers]:
+                    return store
+                for tier in store.tiers:
+                    for column in (tier.slots, tier.sums, tier.counts, tier.mins, tier.maxs):
+                        del column[:]
+                        if legacy and column is tier.counts:
+                            native = array('l')
+                            native.fromfile(file, tier.size)
+                            column.fromlist(native.tolist())
+                            continue
+                        column.fromfile(file, tier.size)
+                        if not legacy and sys.byteorder == 'big':
+                            column.byteswap()
+        except FileNotFoundError:
+            pass
+        except (OSError, EOFError, struct.error) as e:
+            print(f"⚠️ Не удалось загрузить историю ({e}), начинаем с пустой")
+            store = cls(tiers)
+        return store
+
+JournalRecord = namedtuple('JournalRecord', 'timestamp interface rx tx disk failure_count')
+
+# Коды вердикта проверки дисков: не проверялось / нет активности / есть активность
+DISK_CODES = {None: 0, False: 1, True: 2}
+DISK_VERDICTS = (None, False, True)
+
+def journal_tag(interfaces):
+    """
+    Метка замеров в журнале: интерфейсы профиля через '+' (в записи - сумма их счетчиков)
+    Слишком длинная метка заменяется ее началом и контрольной суммой полной метки,
+    чтобы разные интерфейсы с общим началом имени не сливались
+    """
+    tag = '+'.join(interfaces)
+    data = tag.encode('utf-8')
+    if len(data) <= JOURNAL_TAG_BYTES:
+        return tag
+    import zlib
+    suffix = f"~{zlib.crc32(data):08x}"
+    return data[:JOURNAL_TAG_BYTES - len(suffix)].decode('utf-8', 'ignore') + suffix
+
+def _put_varint(buf, value):
+    """Дописывает в буфер целое со знаком в формате zigzag-varint"""
+    value = value * 2 if value >= 0 else -value * 2 - 1
+    while value > 0x7F:
+        buf.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buf.append(value)
+
+def _get_varint(data, pos):
+    """Читает zigzag-varint из буфера, возвращает (значение, новая позиция)"""
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            break
+        shift += 7
+    return (result >> 1) ^ -(result & 1), pos
+
+class MetricsJournal:
+    """
+    Двоичный журнал замеров в кольцевом файле фиксированного размера, отображенном в память
+    Файл разбит на блоки; в заголовке блока лежат исходные значения,
+    а записи кодируются как разность разностей (в стиле Gorilla) в формате varint.
+    Счетчик записей блока обновляется после записи данных, поэтому
+    при аварии теряется не больше последней записи.
+    Запись выполняется копированием в отображенную память, без системных вызовов.
+    """
+    MAGIC = b'NSJOURN1'
+    BLOCK_MAGIC = b'NSJB'
+    # magic, seq, count, used, base_ts_ms, base_rx, base_tx, interface
+    BLOCK_HEADER = struct.Struct('<4sQIIqQQ32p')
+
+    def __init__(self, path=JOURNAL_FILE, block_size=JOURNAL_BLOCK_SIZE, blocks=JOURNAL_BLOCKS):
+        self.path = path
+        self.block_size = block_size
+        self.blocks = blocks
+        size = block_size * (blocks + 1)  # Нулевой блок - заголовок файла
+
+        self.file = open(path, 'r+b' if os.path.exists(path) else 'w+b')
+        if os.fstat(self.file.fileno()).st_size != size:
+            self.file.truncate(size)
+        self.mm = mmap.mmap(self.file.fileno(), size)
+
+        magic, saved_block_size, saved_blocks = struct.unpack_from('<8sII', self.mm, 0)
+        if (magic, saved_block_size, saved_blocks) != (self.MAGIC, block_size, blocks):
+            # Новый файл или другой формат - размечаем заново
+            self.mm[:block_size] = bytes(block_size)
+            struct.pack_into('<8sII', self.mm, 0, self.MAGIC, block_size, blocks)
+            for index in range(blocks):
+                self.mm[(index + 1) * block_size:(index + 1) * block_size + 4] = b'\0\0\0\0'
+            self.seq = 0
+        else:
+            self.seq = max((header[1] for _, header in _journal_blocks(self.mm, block_size, blocks)), default=0)
+
+        self.block = (self.seq - 1) % blocks  # Последний записанный блок
+        self.interface = None
+        self._buf = bytearray()
+
+    def _start_block(self, ts, interface, rx, tx):
+        """Начинает новый блок, перезаписывая самый старый"""
+        self.seq += 1
+        self.block = (self.block + 1) % self.blocks
+        self.offset = (self.block + 1) * self.block_size
+        self.used = 0
+        self.count = 0
+        self.capacity = self.block_size - self.BLOCK_HEADER.size
+        self.interface = interface
+        self.prev_ts, self.prev_rx, self.prev_tx = ts, rx, tx
+        self.prev_dts = self.prev_drx = self.prev_dtx = 0
+        self.prev_failures = 0
+        self.BLOCK_HEADER.pack_into(self.mm, self.offset, self.BLOCK_MAGIC, self.seq, 0, 0,
+                                    ts, rx, tx, interface.encode('utf-8'))
+
+    def append(self, timestamp, interface, rx, tx, disk=None, failure_count=0):
+        """
+        Добавляет запись о замере в журнал
+        interface - метка не длиннее JOURNAL_TAG_BYTES байт (см. journal_tag)
+        """
+        ts = int(timestamp * 1000)
+        if interface != self.interface:
+            if len(interface.encode('utf-8')) > JOURNAL_TAG_BYTES:
+                # Обрезанное имя совпало бы с другим интерфейсом - такая запись отвергается
+                raise ValueError(f"метка интерфейса '{interface}' длиннее {JOURNAL_TAG_BYTES} байт")
+            self._start_block(ts, interface, rx, tx)
+
+        d_ts = ts - self.prev_ts
+        d_rx = rx - self.prev_rx
+        d_tx = tx - self.prev_tx
+        buf = self._buf
+        del buf[:]
+        flags = DISK_CODES[disk]
+        if failure_count != self.prev_failures:
+            flags |= 0x04
+        buf.append(flags)
+        _put_varint(buf, d_ts - self.prev_dts)
+        _put_varint(buf, d_rx - self.prev_drx)
+        _put_varint(buf, d_tx - self.prev_dtx)
+        if flags & 0x04:
+            _put_varint(buf, failure_count)
+
+        if self.used + len(buf) > self.capacity:
+            self._start_block(ts, interface, rx, tx)
+            self.append(timestamp, interface, rx, tx, disk, failure_count)
+            return
+
+        start = self.offset + self.BLOCK_HEADER.size + self.used
+        self.mm[start:start + len(buf)] = buf
+        self.used += len(buf)
+        self.count += 1
+        # Запись считается зафиксированной только после обновления счетчиков
+        struct.pack_into('<II', self.mm, self.offset + 12, self.count, self.used)
+
+        self.prev_ts, self.prev_rx, self.prev_tx = ts, rx, tx
+        self.prev_dts, self.prev_drx, self.prev_dtx = d_ts, d_rx, d_tx
+        self.prev_failures = failure_count
+
+    def flush(self):
+        """Сбрасывает изменения на диск (вызывается вне горячего цикла)"""
+        self.mm.flush()
+
+    def close(self):
+        """Закрывает журнал"""
+        self.mm.flush()
+        self.mm.close()
+        self.file.close()
+
+def _journal_blocks(data, block_size, blocks):
+    """Возвращает [(смещение, заголовок)] заполненных блоков в порядке записи"""
+    found = []
+    for index in range(blocks):
+        offset = (index + 1) * block_size
+        if data[offset:offset + 4] == MetricsJournal.BLOCK_MAGIC:
+            found.append((offset, MetricsJournal.BLOCK_HEADER.unpack_from(data, offset)))
+    found.sort(key=lambda item: item[1][1])
+    return found
+
+class JournalReader:
+    """
+    Чтение журнала замеров без копирования файла в память
+    Пример: with JournalReader('journal.bin') as reader: for record in reader: ...
+    """
+
+    def __init__(self, path=JOURNAL_FILE):
+        self.file = open(path, 'rb')
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.block_size, self.blocks = struct.unpack_from('<8sII', self.mm, 0)
+        if magic != MetricsJournal.MAGIC:
+            self.close()
+            raise ValueError(f"{path} не является журналом замеров")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __iter__(self):
+        data = memoryview(self.mm)
+        header_size = MetricsJournal.BLOCK_HEADER.size
+        try:
+            for offset, header in _journal_blocks(self.mm, self.block_size, self.blocks):
+                _, _, count, used, ts, rx, tx, interface = header
+                interface = interface.decode('utf-8', 'replace')
+                d_ts = d_rx = d_tx = 0
+                failures = 0
+                pos = offset + header_size
+                for _ in range(count):
+                    flags = data[pos]
+                    dd_ts, pos = _get_varint(data, pos + 1)
+                    dd_rx, pos = _get_varint(data, pos)
+                    dd_tx, pos = _get_varint(data, pos)
+                    if flags & 0x04:
+                        failures, pos = _get_varint(data, pos)
+                    d_ts += dd_ts
+                    d_rx += dd_rx
+                    d_tx += dd_tx
+                    ts += d_ts
+                    rx += d_rx
+                    tx += d_tx
+                    yield JournalRecord(ts / 1000, interface, rx, tx, DISK_VERDICTS[flags & 0x03], failures)
+        finally:
+            data.release()
+
+    def close(self):
+        """Закрывает файл журнала"""
+        self.mm.close()
+        self.file.close()
+
+def show_journal(path=JOURNAL_FILE, last=20):
+    """Выводит последние записи журнала замеров"""
+    try:
+        with JournalReader(path) as reader:
+            tail = deque(reader, maxlen=last)
+    except (OSError, ValueError) as e:
+        print(f"\n❌ Ошибка при чтении журнала: {e}")
+        return 1
+
+    if not tail:
+        print("\n❌ Журнал пуст.")
+        return 1
+
+    disk_names = {None: '-', False: 'нет', True: 'да'}
+    print(f"{'Время':<24}{'Интерфейс':<20}{'Принято':>16}{'Отправлено':>16}  Диски  Пропуски")
+    for record in tail:
+        stamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(record.timestamp))
+        print(f"{stamp:<24}{record.interface:<20}{record.rx:>16}{record.tx:>16}  "
+              f"{disk_names[record.disk]:<6} {record.failure_count}")
+    return 0
+
+def show_history(last='1h', resolution=None, path=HISTORY_FILE):
+    """Выводит сохраненную историю скорости за указанный период"""
+    store = HistoryStore.load(path)
+    span = parse_time_input(last) or 3600
+    if resolution:
+        steps = {'1s': 1, '1m': 60, '15m': 900}
+        tier = next((t for t in store.tiers if t.step == steps[resolution]), store.tier_for(span))
+    else:
+        tier = store.tier_for(span)
+
+    now = time.time()
+    rows = tier.rows(now - span, now)
+    if not rows:
+        print("\n❌ История за указанный период отсутствует.")
+        return 1
+
+    print(f"\n📈 История за {format_time(span)} (шаг {format_time(tier.step)}):")
+    print(f"{'Время':<20}{'Средн.':>10}{'Мин.':>10}{'Макс.':>10}  МБ/с")
+    for start, avg, low, high in rows:
+        stamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(start))
+        print(f"{stamp:<20}{avg/1024**2:>10.2f}{low/1024**2:>10.2f}{high/1024**2:>10.2f}")
+    return 0
+
+# Имена полей записей бортового самописца по типам
+FLIGHT_FIELDS = {
+    'sample': ('rx', 'tx', 'speed', 'failure_count'),
+    'disk': ('active',),
+    'event': ('message',),
+}
+
+class FlightRecorder:
+    """
+    Бортовой самописец: последние замеры, вердикты дисков и события
+    в заранее выделенном кольцевом буфере. Запись - одно присваивание в список
+    под блокировкой (пишут поток мониторинга, подготовительные команды и управление),
+    сброс в файл выполняется только при срабатывании или отмене действия
+    """
+    __slots__ = ('entries', 'size', 'pos', 'context', 'lock')
+
+    def __init__(self, interval, context=None, minutes=FLIGHT_RECORDER_MINUTES):
+        # Замер и возможная проверка дисков на каждый интервал плюс запас под события
+        self.size = int(minutes * 60 / max(interval, 1)) * 2 + 64
+        self.entries = [None] * self.size
+        self.pos = 0
+        self.context = context or {}
+        self.lock = threading.Lock()
+
+    def record(self, kind, *data):
+        """Добавляет запись в кольцевой буфер"""
+        entry = (time.time(), kind, data)
+        with self.lock:
+            self.entries[self.pos % self.size] = entry
+            self.pos += 1
+
+    def snapshot(self):
+        """Записи буфера от старых к новым"""
+        with self.lock:
+            start = max(0, self.pos - self.size)
+            return [self.entries[index % self.size] for index in range(start, self.pos)]
+
+    def event(self, message):
+        """Добавляет событие (нажатие клавиши, срабатывание и т.п.)"""
+        self.record('event', message)
+
+    @staticmethod
+    def reserve(reason):
+        """
+        Создает пустой файл с отметкой времени и возвращает его путь. Файлы одной
+        секунды получают номер (_2, _3...): O_EXCL не дает затереть чужую запись,
+        даже если ее в ту же секунду сохраняет другой процесс
+        """
+        os.makedirs(FLIGHT_RECORDS_DIR, exist_ok=True)
+        base = os.path.join(FLIGHT_RECORDS_DIR, f"flight_{time.strftime('%Y%m%d_%H%M%S')}_{reason}")
+        sequence = 1
+        while True:
+            path = f"{base}.jsonl" if sequence == 1 else f"{base}_{sequence}.jsonl"
+            try:
+                os.close(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL))
+                return path
+            except FileExistsError:
+                sequence += 1
+
+    def dump(self, reason):
+        """Атомарно записывает содержимое буфера в новый файл с отметкой времени"""
+        try:
+            path = self.reserve(reason)
+
+            lines = [json.dumps({'reason': reason, 'time': time.time(), **self.context}, ensure_ascii=False)]
+            for timestamp, kind, data in self.snapshot():
+                entry = {'t': round(timestamp, 3), 'kind': kind}
+                entry.update(zip(FLIGHT_FIELDS[kind], data))
+                lines.append(json.dumps(entry, ensure_ascii=False))
+
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                file.write('\n'.join(lines) + '\n')
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, path)
+            print(f"\n🛩️ Бортовой самописец сохранен: {path}")
+            return path
+        except Exception as e:
+            print(f"\n⚠️ Не удалось сохранить бортовой самописец: {e}")
+            return None
+
+class Trigger:
+    """Базовый класс правил срабатывания"""
+    __slots__ = ()
+
+    decisive = False    # True - одного пропуска достаточно для срабатывания
+    live = False        # True - читает состояние компьютера помимо счетчиков сети
+    countdown = None    # Длительность обратного отсчета (сек) вместо задержки профиля
+    action_mode = None  # Режим действия вместо режима профиля
+
+    @classmethod
+    def validate(cls, settings):
+        """
+        Проверяет параметры правила в настройках профиля (ValueError - неверный параметр)
+        Вызывается при создании профиля, чтобы ошибка не возникала на каждом замере
+        """
+
+    @staticmethod
+    def number(settings, key, default, minimum, maximum=None, above=False):
+        """Числовой параметр правила: не меньше minimum (above - строго больше) и не больше maximum"""
+        value = settings.get(key, default)
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value != value:
+            raise ValueError(f"параметр {key} должен быть числом")
+        if value < minimum or (above and value == minimum):
+            raise ValueError(f"параметр {key} должен быть {'больше' if above else 'не меньше'} {minimum}")
+        if maximum is not None and value > maximum:
+            raise ValueError(f"параметр {key} должен быть не больше {maximum}")
+        return value
+
+    def bind(self, perform, report=print):
+        """Передает функцию выполнения действий (для промежуточных ступеней) и вывода сообщений"""
+
+    def reconfigure(self, settings):
+        """
+        Применяет измененные настройки профиля без потери накопленного состояния
+        False - состояние несовместимо с новыми настройками, нужен новый триггер
+        """
+        return False
+
+    def start(self, now, total):
+        """Начало мониторинга: total - текущее значение счетчика байт"""
+
+    def rearm(self):
+        """
+        Обратный отсчет отменен: True - триггер продолжает работу с накопленным
+        состоянием (start вызывается снова), False - нужен новый триггер
+        """
+        return False
+
+    def update(self, speed, now, total):
+        """Учитывает замер; возвращает True, если замер считается пропуском"""
+        raise NotImplementedError
+
+    def next_interval(self, interval):
+        """Через сколько секунд делать следующий замер"""
+        return interval
+
+    def defer_checks(self, now):
+        """
+        True - проверку активности дисков перед замером можно отложить: она понадобится,
+        только если замер окажется пропуском (тогда цикл проверит диски после него)
+        """
+        return False
+
+    def status(self):
+        """Дополнительная информация для строки мониторинга"""
+        return ""
+
+class ThresholdTrigger(Trigger):
+    """
+    Классическое правило: пропуском считается замер ниже пороговой скорости
+    Если задан max_interval, замеры по-прежнему делаются с интервалом профиля (моменты
+    срабатывания не меняются), но пока скорость намного выше порога, проверка активности
+    дисков перед замером выполняется не чаще раза в max_interval
+    """
+    __slots__ = ('threshold', 'max_interval', 'speed', 'low', 'checked', 'started', 'now', 'deferred')
+
+    def __init__(self, settings):
+        self.threshold = settings['threshold']
+        self.max_interval = settings.get('max_interval', 0)
+        self.speed = None
+        self.low = False
+        self.started = self.now = self.checked = None
+        self.deferred = 0
+
+    @classmethod
+    def validate(cls, settings):
+        cls.number(settings, 'max_interval', 0, 0)
+
+    def start(self, now, total):
+        self.started = self.now = self.checked = now
+
+    def reconfigure(self, settings):
+        self.threshold = settings['threshold']
+        self.max_interval = settings.get('max_interval', 0)
+        return True
+
+    def update(self, speed, now, total):
+        self.speed = speed
+        self.now = now
+        self.low = speed < self.threshold
+        return self.low
+
+    def defer_checks(self, now):
+        far = (self.max_interval > 0 and self.speed is not None and self.threshold > 0
+               and self.speed >= self.threshold * ADAPTIVE_MARGIN)
+        if not far or now - self.checked >= self.max_interval:
+            self.checked = now
+            return False
+        self.deferred += 1
+        return True
+
+    def saved_checks(self):
+        """Сколько проверок дисков в час сэкономлено по сравнению с проверкой перед каждым замером"""
+        elapsed = (self.now or 0) - (self.started or 0)
+        return self.deferred * 3600 / elapsed if elapsed > 0 else 0.0
+
+    def status(self):
+        if not self.deferred:
+            return ""
+        return f" | сэкономлено {self.saved_checks():.0f} проверок дисков/ч"
+
+class SlidingLogHistogram:
+    """
+    Гистограмма скорости за скользящее окно с логарифмическими корзинами
+    Окно разбито на QUANTILE_SLOTS частей; устаревшая часть вычитается целиком,
+    поэтому память и время обновления не зависят от длины окна
+    """
+    __slots__ = ('slot_length', 'slots', 'total', 'count', 'current', 'buckets')
+
+    MIN_LOG = 10    # Нижняя граница шкалы - 1 КБ/с
+    MAX_LOG = 34    # Верхняя граница шкалы - 16 ГБ/с
+
+    def __init__(self, window, slots=QUANTILE_SLOTS):
+        self.buckets = (self.MAX_LOG - self.MIN_LOG) * QUANTILE_BUCKETS_PER_OCTAVE + 1
+        self.slot_length = window / slots
+        self.slots = [array('l', [0]) * self.buckets for _ in range(slots)]
+        self.total = array('l', [0]) * self.buckets
+        self.count = 0
+        self.current = None
+
+    def _bucket(self, value):
+        """Номер корзины для значения; нулевая корзина - все, что ниже 1 КБ/с"""
+        if value < 2 ** self.MIN_LOG:
+            return 0
+        idx = int((math.log2(value) - self.MIN_LOG) * QUANTILE_BUCKETS_PER_OCTAVE) + 1
+        return min(idx, self.buckets - 1)
+
+    def _bucket_value(self, idx):
+        """Представительное значение корзины (середина в логарифмической шкале)"""
+        if idx == 0:
+            return 0.0
+        return 2 ** (self.MIN_LOG + (idx - 0.5) / QUANTILE_BUCKETS_PER_OCTAVE)
+
+    def add(self, value, now):
+        """Добавляет значение в текущую часть окна"""
+        slot = int(now // self.slot_length)
+        if slot != self.current:
+            # Очищаем части окна, вышедшие за его пределы
+            start = slot - len(self.slots) + 1 if self.current is None else max(self.current + 1, slot - len(self.slots) + 1)
+            for expired in range(start, slot + 1):
+                counts = self.slots[expired % len(self.slots)]
+                for idx, value_count in enumerate(counts):
+                    if value_count:
+                        self.total[idx] -= value_count
+                        self.count -= value_count
+                        counts[idx] = 0
+            self.current = slot
+        idx = self._bucket(value)
+        self.slots[slot % len(self.slots)][idx] += 1
+        self.total[idx] += 1
+        self.count += 1
+
+    def quantile(self, q):
+        """Оценка q-квантиля (0..1) значений в окне"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for idx, value_count in enumerate(self.total):
+            cumulative += value_count
+            if cumulative >= target:
+                return self._bucket_value(idx)
+        return self._bucket_value(self.buckets - 1)
+
+class PercentileTrigger(Trigger):
+    """Пропуском считается замер, при котором перцентиль скорости за окно ниже порога"""
+    __slots__ = ('threshold', 'q', 'window', 'histogram', 'started', 'value')
+
+    def __init__(self, settings):
+        self.threshold = settings['threshold']
+        self.q = settings.get('percentile', 90) / 100
+        self.window = settings.get('percentile_window', 600)
+        self.histogram = SlidingLogHistogram(self.window)
+        self.started = None
+        self.value = 0.0
+
+    @classmethod
+    def validate(cls, settings):
+        cls.number(settings, 'percentile', 90, 1, 99)
+        cls.number(settings, 'percentile_window', 600, 0, above=True)
+
+    def reconfigure(self, settings):
+        # Гистограмма привязана к длине окна
+        if settings.get('percentile_window', 600) != self.window:
+            return False
+        self.threshold = settings['threshold']
+        self.q = settings.get('percentile', 90) / 100
+        return True
+
+    def update(self, speed, now, total):
+        if self.started is None:
+            self.started = now
+        self.histogram.add(speed, now)
+        self.value = self.histogram.quantile(self.q)
+        # Пока окно не заполнено, короткая история не может вызвать срабатывание
+        return now - self.started >= self.window and self.value < self.threshold
+
+    def status(self):
+        return f" | p{self.q * 100:.0f}: {self.value/1024**2:.2f} МБ/с"
+
+class BaselineTrigger(Trigger):
+    """
+    Адаптивный порог: пропуском считается падение скорости ниже доли от обычной
+    скорости или ниже среднего на k стандартных отклонений.
+    Обычная скорость - экспоненциальное среднее и дисперсия замеров во время загрузки.
+    Гистерезис: из состояния пропуска выходим только выше середины между порогом и средним
+    """
+    __slots__ = ('threshold', 'fraction', 'sigmas', 'mean', 'var', 'count',
+                 'low', 'limit', 'profile_name', 'saved_at')
+
+    def __init__(self, settings, profile_name=None):
+        self.threshold = settings['threshold']
+        self.fraction = settings.get('baseline_fraction', 0.2)
+        self.sigmas = settings.get('baseline_sigmas', 3.0)
+        baseline = settings.get('baseline') or {}
+        self.mean = baseline.get('mean', 0.0)
+        self.var = baseline.get('var', 0.0)
+        self.count = baseline.get('count', 0)
+        self.low = False
+        self.limit = self.threshold
+        self.profile_name = profile_name
+        self.saved_at = None
+
+    @classmethod
+    def validate(cls, settings):
+        cls.number(settings, 'baseline_fraction', 0.2, 0, 1)
+        cls.number(settings, 'baseline_sigmas', 3.0, 0)
+        baseline = settings.get('baseline') or {}
+        if not isinstance(baseline, dict):
+            raise ValueError("параметр baseline должен быть объектом")
+        for key in ('mean', 'var', 'count'):
+            cls.number(baseline, key, 0, 0)
+
+    def reconfigure(self, settings):
+        # Набранная база в памяти новее сохраненной в профиле - ее не трогаем
+        self.threshold = settings['threshold']
+        self.fraction = settings.get('baseline_fraction', 0.2)
+        self.sigmas = settings.get('baseline_sigmas', 3.0)
+        return True
+
+    def update(self, speed, now, total):
+        if self.count < BASELINE_WARMUP:
+            self.limit = self.threshold
+            low = speed < self.threshold
+        else:
+            self.limit = max(self.fraction * self.mean, self.mean - self.sigmas * self.sigma(), self.threshold)
+            if self.low:
+                low = speed < (self.limit + self.mean) / 2
+            else:
+                low = speed < self.limit
+        self.low = low
+
+        if not low:
+            # База обновляется только по замерам активной загрузки
+            self.learn(speed)
+        self.autosave(now)
+        return low
+
+    def sigma(self):
+        """
+        Стандартное отклонение обычной скорости, не меньше 1% от среднего:
+        при ровной скорости дисперсия стремится к нулю, и порог подходит вплотную к среднему
+        """
+        return max(math.sqrt(self.var), 0.01 * self.mean, 1.0)
+
+    def learn(self, speed):
+        """Обновляет экспоненциальное среднее и дисперсию обычной скорости"""
+        diff = speed - self.mean
+        alpha = max(BASELINE_ALPHA, 1 / (self.count + 1))
+        increment = alpha * diff
+        self.mean += increment
+        self.var = (1 - alpha) * (self.var + diff * increment)
+        self.count += 1
+
+    def autosave(self, now):
+        """Периодически сохраняет базу в профиль"""
+        if self.profile_name:
+            if self.saved_at is None:
+                self.saved_at = now
+            elif now - self.saved_at >= BASELINE_SAVE_INTERVAL:
+                self.save()
+                self.saved_at = now
+
+    def save(self):
+        """Сохраняет базу в профиль, чтобы после перезапуска не начинать с нуля"""
+        if self.profile_name:
+            update_profile(self.profile_name, baseline={'mean': self.mean, 'var': self.var, 'count': self.count})
+
+    def status(self):
+        return f" | обычная: {self.mean/1024**2:.2f} МБ/с, порог: {self.limit/1024**2:.2f} МБ/с"
+
+def cusum_limit(k, arl):
+    """
+    Порог h одностороннего CUSUM (в единицах сигмы) для заданного среднего числа
+    замеров до ложной тревоги arl при опорном значении k (приближение Зигмунда)
+    """
+    k = max(k, CUSUM_MIN_K)  # При k = 0 приближение делит на ноль
+
+    def run_length(h):
+        b = 2 * k * (h + 1.166)
+        return (math.exp(min(b, 700)) - b - 1) / (2 * k * k)
+
+    low, high = 0.0, 50.0
+    for _ in range(60):
+        middle = (low + high) / 2
+        if run_length(middle) < arl:
+            low = middle
+        else:
+            high = middle
+    return high
+
+class CusumTrigger(BaselineTrigger):
+    """
+    Последовательное обнаружение падения скорости (односторонний CUSUM)
+    Накопленная сумма отклонений вниз от обычной скорости сравнивается с порогом h,
+    который подбирается по допустимой частоте ложных срабатываний и минимальному
+    обнаруживаемому падению. Решение принимается сразу, без серии из allowed_failures
+    замеров; пока база не набрана или обычная скорость не выше порога (например,
+    по интерфейсу ничего не передавалось), работает классическое правило
+    """
+    __slots__ = ('drop', 'arl', 'allowed_failures', 'k', 'h', 'score', 'lows')
+
+    decisive = True
+
+    def __init__(self, settings, profile_name=None):
+        super().__init__(settings, profile_name)
+        self.drop = settings.get('cusum_drop', 0.5)
+        false_alarms = settings.get('cusum_false_alarms', 0.1)  # В сутки
+        self.arl = 86400 / max(settings.get('interval', 10), 1) / max(false_alarms, 1e-6)
+        self.allowed_failures = settings.get('allowed_failures', 3)
+        self.k = self.h = None
+        self.score = 0.0
+        self.lows = 0
+
+    @classmethod
+    def validate(cls, settings):
+        super().validate(settings)
+        cls.number(settings, 'cusum_drop', 0.5, 0, 1, above=True)
+        cls.number(settings, 'cusum_false_alarms', 0.1, 0, above=True)
+
+    def reconfigure(self, settings):
+        super().reconfigure(settings)
+        self.drop = settings.get('cusum_drop', 0.5)
+        false_alarms = settings.get('cusum_false_alarms', 0.1)
+        self.arl = 86400 / max(settings.get('interval', 10), 1) / max(false_alarms, 1e-6)
+        self.allowed_failures = settings.get('allowed_failures', 3)
+        self.k = None   # Порог h пересчитывается на следующем замере
+        return True
+
+    def _tune(self):
+        """Пересчитывает параметры CUSUM по текущей базе"""
+        sigma = self.sigma()
+        k = min(max(self.drop * self.mean / (2 * sigma), CUSUM_MIN_K), 5.0)
+        if self.k is None or abs(k - self.k) > 0.05 * self.k:
+            self.k = k
+            self.h = cusum_limit(k, self.arl)
+
+    def update(self, speed, now, total):
+        if self.count < BASELINE_WARMUP or self.mean <= self.threshold:
+            # База еще не набрана или не выше порога (падать некуда) - классическое правило
+            self.score = 0.0
+            self.lows = self.lows + 1 if speed < self.threshold else 0
+            if speed >= self.threshold:
+                self.learn(speed)
+            self.autosave(now)
+            return self.lows >= self.allowed_failures
+
+        self._tune()
+        sigma = self.sigma()
+        self.lows = 0
+        self.score = max(0.0, self.score + (self.mean - speed) / sigma - self.k)
+        if self.score == 0.0:
+            # Нет признаков изменения - продолжаем уточнять базу
+            self.learn(speed)
+        self.autosave(now)
+        return self.score > self.h and speed < self.mean * (1 - self.drop / 2)
+
+    def status(self):
+        if self.count < BASELINE_WARMUP:
+            return f" | CUSUM: набор базы {self.count}/{BASELINE_WARMUP}"
+        if self.h is None or self.mean <= self.threshold:
+            return f" | обычная: {self.mean/1024**2:.2f} МБ/с не выше порога, классическое правило"
+        return f" | обычная: {self.mean/1024**2:.2f} МБ/с, CUSUM: {self.score:.1f}/{self.h:.1f}"
+
+class ForecastTrigger(Trigger):
+    """
+    Прогноз окончания загрузки: экспоненциально взвешенная линейная регрессия
+    скорости по времени (обновление за O(1)). Если скорость уверенно снижается,
+    обратный отсчет запускается так, чтобы закончиться в предсказанный момент
+    пересечения порога. Классическое правило действует всегда, прогноз позволяет
+    только сработать раньше него
+    """
+    __slots__ = ('threshold', 'allowed_failures', 'shutdown_delay', 'window', 'min_r2',
+                 'origin', 'last', 'sums', 'lows', 'r2', 'eta', 'remaining', 'countdown')
+
+    decisive = True
+
+    def __init__(self, settings):
+        self.threshold = settings['threshold']
+        self.allowed_failures = settings.get('allowed_failures', 3)
+        self.shutdown_delay = settings.get('shutdown_delay', 30)
+        self.window = settings.get('forecast_window', 300)
+        self.min_r2 = settings.get('forecast_min_r2', 0.8)
+        self.origin = self.last = None
+        self.sums = [0.0] * 6   # Σw, Σwt, Σwt², Σwy, Σwty, Σwy²
+        self.lows = 0
+        self.r2 = 0.0
+        self.eta = self.remaining = self.countdown = None
+
+    @classmethod
+    def validate(cls, settings):
+        cls.number(settings, 'forecast_window', 300, 0, above=True)
+        cls.number(settings, 'forecast_min_r2', 0.8, 0, 1)
+
+    def reconfigure(self, settings):
+        self.threshold = settings['threshold']
+        self.allowed_failures = settings.get('allowed_failures', 3)
+        self.shutdown_delay = settings.get('shutdown_delay', 30)
+        self.window = settings.get('forecast_window', 300)
+        self.min_r2 = settings.get('forecast_min_r2', 0.8)
+        return True
+
+    def _fit(self, speed, now):
+        """Добавляет замер в регрессию; возвращает (наклон, свободный член, R²) или None"""
+        if self.origin is None:
+            self.origin = self.last = now
+        t = now - self.origin
+        decay = math.exp(-(now - self.last) / self.window)
+        self.last = now
+        sums = self.sums
+        for idx, value in enumerate((1.0, t, t * t, speed, t * speed, speed * speed)):
+            sums[idx] = sums[idx] * decay + value
+        weight, st, stt, sy, sty, syy = sums
+        if weight < 5:
+            return None
+        var_t = stt / weight - (st / weight) ** 2
+        var_y = syy / weight - (sy / weight) ** 2
+        cov = sty / weight - (st / weight) * (sy / weight)
+        if var_t <= 0 or var_y <= 0:
+            return None
+        slope = cov / var_t
+        return slope, sy / weight - slope * st / weight, cov * cov / (var_t * var_y)
+
+    def update(self, speed, now, total):
+        self.lows = self.lows + 1 if speed < self.threshold else 0
+        self.countdown = self.eta = self.remaining = None
+        fit = self._fit(speed, now)
+        self.r2 = fit[2] if fit else 0.0
+
+        if fit and fit[0] < 0 and self.r2 >= self.min_r2:
+            slope, intercept, _ = fit
+            t = now - self.origin
+            crossing = (self.threshold - intercept) / slope
+            self.eta = max(crossing - t, 0.0)
+            # Сколько байт еще придет до пересечения порога (площадь под прямой)
+            current = max(intercept + slope * t, self.threshold)
+            self.remaining = (current + self.threshold) / 2 * self.eta
+
+        if self.lows >= self.allowed_failures:
+            return True
+        if self.eta is not None and self.eta <= self.shutdown_delay:
+            self.countdown = max(int(self.eta), FORECAST_MIN_COUNTDOWN)
+            return True
+        return False
+
+    def status(self):
+        if self.eta is None:
+            return f" | прогноз: нет (R²={self.r2:.2f})"
+        return (f" | прогноз: порог через {format_time(int(self.eta))}, "
+                f"осталось ~{self.remaining/1024**2:.0f} МБ (R²={self.r2:.2f})")
+
+class ByteBudgetTrigger(Trigger):
+    """
+    Срабатывание по объему: действие выполняется, когда с начала мониторинга
+    получено (отправлено) заданное количество байт. Пока до цели далеко, замеры
+    делаются редко - незадолго до прогнозируемого окончания, а вблизи цели чаще.
+    После отмены отсчета объем считается от прежней точки отсчета, а следующей
+    целью становится очередное кратное заданного объема
+    """
+    __slots__ = ('budget', 'rounds', 'done', 'last_total', 'smoothed', 'eta')
+
+    decisive = True
+
+    def __init__(self, settings):
+        self.budget = self.validate(settings)
+        self.rounds = 1
+        self.done = 0
+        self.last_total = None
+        self.smoothed = None
+        self.eta = None
+
+    @classmethod
+    def validate(cls, settings):
+        # Без объема действие выполнилось бы на первом же замере
+        return cls.number(settings, 'budget_bytes', 0, 0, above=True)
+
+    def start(self, now, total):
+        # При повторном запуске после отмены учитывается и полученное во время отсчета
+        if self.last_total is None:
+            self.last_total = total
+
+    def rearm(self):
+        self.rounds = int(self.done // self.budget) + 1
+        return True
+
+    def reconfigure(self, settings):
+        self.budget = self.validate(settings)
+        return True
+
+    @property
+    def target(self):
+        return self.budget * self.rounds
+
+    def update(self, speed, now, total):
+        if self.last_total is not None:
+            # Сброс счетчика интерфейса не должен уменьшать полученный объем
+            self.done += max(total - self.last_total, 0)
+        self.last_total = total
+        self.smoothed = speed if self.smoothed is None else self.smoothed + BUDGET_SMOOTHING * (speed - self.smoothed)
+        remaining = self.target - self.done
+        self.eta = remaining / self.smoothed if self.smoothed > 0 else None
+        return remaining <= 0
+
+    def next_interval(self, interval):
+        if self.eta is None:
+            return interval
+        if self.eta > BUDGET_FINE_WINDOW + interval:
+            # Спим почти до прогнозируемого окончания
+            return min(self.eta - BUDGET_FINE_WINDOW, BUDGET_MAX_SLEEP)
+        return max(min(interval, self.eta / 2), BUDGET_FINE_STEP)
+
+    def status(self):
+        eta = format_time(int(self.eta)) if self.eta is not None else '-'
+        return f" | получено {self.done/1024**3:.2f} из {self.target/1024**3:.2f} ГБ, осталось ~{eta}"
+
+class SignalSources:
+    """
+    Источники сигналов для правил: сеть, диски, процессор, процессы
+    Каждый сигнал читается не больше одного раза за замер
+    """
+    __slots__ = ('speed', 'now', 'tick', 'disk_tick', 'disk_rate', 'disk_last', 'disk_time',
+                 'cpu_tick', 'cpu_value', 'proc_tick', 'proc_names')
+
+    def __init__(self):
+        self.speed = 0.0
+        self.now = 0.0
+        self.tick = 0
+        self.disk_tick = self.cpu_tick = self.proc_tick = -1
+        self.disk_rate = self.cpu_value = 0.0
+        self.disk_last = self.disk_time = None
+        self.proc_names = frozenset()
+
+    def begin(self, speed, now):
+        """Начинает новый замер"""
+        self.speed = speed
+        self.now = now
+        self.tick += 1
+
+    def net(self):
+        """Скорость сети (МБ/с)"""
+        return self.speed / 1024**2
+
+    def disk(self):
+        """Суммарная скорость чтения и записи дисков (МБ/с)"""
+        if self.disk_tick != self.tick:
+            self.disk_tick = self.tick
+            io = psutil.disk_io_counters()
+            total = io.read_bytes + io.write_bytes if io else 0
+            if self.disk_last is not None and self.now > self.disk_time:
+                self.disk_rate = max(total - self.disk_last, 0) / (self.now - self.disk_time) / 1024**2
+            self.disk_last, self.disk_time = total, self.now
+        return self.disk_rate
+
+    def cpu(self):
+        """Загрузка процессора (%) с момента предыдущего чтения"""
+        if self.cpu_tick != self.tick:
+            self.cpu_tick = self.tick
+            self.cpu_value = psutil.cpu_percent(interval=None)
+        return self.cpu_value
+
+    def processes(self):
+        """Имена запущенных процессов (в нижнем регистре)"""
+        if self.proc_tick != self.tick:
+            self.proc_tick = self.tick
+            names = set()
+            for proc in psutil.process_iter(['name']):
+                name = proc.info['name']
+                if name:
+                    names.add(name.lower())
+            self.proc_names = frozenset(names)
+        return self.proc_names
+
+def _parse_duration(value):
+    """Длительность из правила: число секунд или строка вида 1h30m"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    seconds = parse_time_input(str(value))
+    if seconds <= 0 and str(value).strip('0s ') != '':
+        raise ValueError(f"неверная длительность '{value}'")
+    return float(seconds)
+
+def compile_condition(spec, sources):
+    """
+    Компилирует условие правила в функцию check(now) -> bool
+    Условие: {"signal": "net"|"disk"|"cpu", "below"|"above": X}
+    или {"signal": "process", "absent"|"present": [имена]},
+    модификаторы "k"/"n" (k из последних n замеров) и "for" (не меньше T подряд),
+    составные условия: {"all": [...]} и {"any": [...]}
+    """
+    if not isinstance(spec, dict):
+        raise ValueError(f"условие должно быть объектом: {spec!r}")
+
+    if 'all' in spec or 'any' in spec:
+        parts = tuple(compile_condition(part, sources) for part in spec.get('all') or spec.get('any'))
+        if not parts:
+            raise ValueError("пустой список условий")
+        # Все части вычисляются на каждом замере, чтобы их состояние не устаревало
+        if 'all' in spec:
+            def check(now):
+                result = True
+                for part in parts:
+                    if not part(now):
+                        result = False
+                return result
+        else:
+            def check(now):
+                result = False
+                for part in parts:
+                    if part(now):
+                        result = True
+                return result
+        return check
+
+    signal = spec.get('signal')
+    if signal == 'process':
+        names = frozenset(name.lower() for name in (spec.get('absent') or spec.get('present') or ()))
+        if not names:
+            raise ValueError("для сигнала process нужен список absent или present")
+        read_names = sources.processes
+        if 'absent' in spec:
+            def base(now):
+                return names.isdisjoint(read_names())
+        else:
+            def base(now):
+                return not names.isdisjoint(read_names())
+    elif signal in ('net', 'disk', 'cpu'):
+        read = getattr(sources, signal)
+        if 'below' in spec:
+            limit = float(spec['below'])
+            def base(now):
+                return read() < limit
+        elif 'above' in spec:
+            limit = float(spec['above'])
+            def base(now):
+                return read() > limit
+        else:
+            raise ValueError(f"для сигнала {signal} нужен below или above")
+    else:
+        raise ValueError(f"неизвестный сигнал '{signal}'")
+
+    check = base
+    if 'k' in spec or 'n' in spec:
+        k, n = int(spec.get('k', spec.get('n', 1))), int(spec.get('n', spec.get('k', 1)))
+        if not 1 <= k <= n:
+            raise ValueError("должно выполняться 1 <= k <= n")
+        window = bytearray(n)
+        state = [0, 0]  # Позиция в кольце, количество выполнений в окне
+        inner = check
+
+        def check(now):
+            value = 1 if inner(now) else 0
+            pos = state[0]
+            state[1] += value - window[pos]
+            window[pos] = value
+            state[0] = (pos + 1) % n
+            return state[1] >= k
+
+    if 'for' in spec:
+        hold = _parse_duration(spec['for'])
+        since = [None]
+        inner_hold = check
+
+        def check(now):
+            if not inner_hold(now):
+                since[0] = None
+                return False
+            if since[0] is None:
+                since[0] = now
+            return now - since[0] >= hold
+
+    return check
+
+class RuleTrigger(Trigger):
+    """
+    Правила срабатывания из профиля, скомпилированные при загрузке
+    Ступени эскалации: каждая выполняется, когда условие держится не меньше hold;
+    промежуточные ступени только подают звуковой сигнал (сразу, без отсчета),
+    а выключение, перезагрузку или сон выполняет последняя через обратный отсчет
+    """
+    __slots__ = ('sources', 'check', 'stages', 'stage', 'since', 'perform', 'report', 'action_mode')
+
+    decisive = True
+    live = True
+
+    def __init__(self, settings):
+        self.stages = self.validate(settings)
+        self.sources = SignalSources()
+        rules = settings['rules']
+        condition = {key: value for key, value in rules.items() if key != 'stages'}
+        self.check = compile_condition(condition, self.sources)
+        self.stage = 0
+        self.since = None
+        self.perform = perform_action
+        self.report = print
+        self.action_mode = None
+
+    @classmethod
+    def validate(cls, settings):
+        """Проверяет правила и ступени; условия проверяются при компиляции. Возвращает ступени"""
+        rules = settings.get('rules')
+        if not rules:
+            raise ValueError("в профиле не заданы правила (rules)")
+        if not isinstance(rules, dict):
+            raise ValueError("правила (rules) должны быть объектом")
+        stages = rules.get('stages') or [{'hold': 0, 'action': settings.get('action_mode', 's')}]
+        if not isinstance(stages, list) or not all(isinstance(stage, dict) for stage in stages):
+            raise ValueError("ступени (stages) должны быть списком объектов")
+        stages = tuple((_parse_duration(stage.get('hold', 0)), stage.get('action', 's')) for stage in stages)
+        if any(mode not in ACTION_NAMES for _, mode in stages):
+            raise ValueError("неизвестный режим действия в ступенях")
+        if any(mode != 'b' for _, mode in stages[:-1]):
+            raise ValueError("промежуточные ступени могут только подавать звуковой сигнал (b); "
+                             "выключение, перезагрузка и сон - только последней ступенью")
+        return stages
+
+    def bind(self, perform, report=print):
+        self.perform = perform
+        self.report = report
+
+    def update(self, speed, now, total):
+        self.sources.begin(speed, now)
+        if not self.check(now):
+            self.since = None
+            self.stage = 0
+            return False
+        if self.since is None:
+            self.since = now
+        held = now - self.since
+        while self.stage < len(self.stages) and held >= self.stages[self.stage][0]:
+            hold, mode = self.stages[self.stage]
+            self.stage += 1
+            if self.stage == len(self.stages):
+                self.action_mode = mode
+                return True
+            self.report(f"🔔 Ступень {self.stage}: условие выполняется {format_time(int(held))}, действие '{mode}'")
+            self.perform(mode)
+        return False
+
+    def status(self):
+        if self.since is None:
+            return " | правила: не выполнены"
+        return f" | правила: выполнены {format_time(int(self.sources.now - self.since))}, ступень {self.stage}/{len(self.stages)}"
+
+class IdleTrigger(Trigger):
+    """
+    Срабатывание по простою компьютера: каждый сигнал (сеть, самый загруженный диск,
+    процессор, время без ввода) дает оценку простоя от 0 до 1, оценки складываются с весами.
+    Сигналы читаются каждый со своим периодом; если итоговая оценка неоднозначна,
+    проверяются процессы - загрузка процессора и дисков каждым процессом
+    """
+    __slots__ = ('signals', 'values', 'read_at', 'disk_last', 'cpu_last', 'scan_last', 'score', 'busy_processes')
+
+    live = True
+
+    def __init__(self, settings):
+        self.signals = self.active_signals(settings)
+        self.values = {}
+        self.read_at = {}
+        self.disk_last = self.cpu_last = self.scan_last = None
+        self.score = None
+        self.busy_processes = None
+
+    @classmethod
+    def validate(cls, settings):
+        config = settings.get('idle_signals') or {}
+        if not isinstance(config, dict):
+            raise ValueError("параметр idle_signals должен быть объектом")
+        for name, signal in config.items():
+            if name not in IDLE_SIGNALS:
+                raise ValueError(f"неизвестный сигнал простоя '{name}'")
+            if not isinstance(signal, dict):
+                raise ValueError(f"настройки сигнала простоя '{name}' должны быть объектом")
+            try:
+                for key in ('weight', 'threshold', 'every'):
+                    if key in signal and not (key == 'threshold' and signal[key] is None):
+                        cls.number(signal, key, 0, 0)
+            except ValueError as e:
+                raise ValueError(f"сигнал простоя '{name}': {e}") from None
+        if not cls.active_signals(settings):
+            # Без сигналов оценка простоя всегда наибольшая - действие сработало бы сразу
+            raise ValueError("у всех сигналов простоя (idle_signals) нулевой вес или порог")
+
+    @staticmethod
+    def active_signals(settings):
+        """Сигналы с ненулевыми весом и порогом: {имя: настройки сигнала}"""
+        config = settings.get('idle_signals') or {}
+        signals = {}
+        for name, defaults in IDLE_SIGNALS.items():
+            signal = dict(defaults, **config.get(name, {}))
+            if signal['threshold'] is None:
+                signal['threshold'] = settings['threshold'] / 1024**2
+            if signal['weight'] > 0 and signal['threshold'] > 0:
+                signals[name] = signal
+        return signals
+
+    def read_disk(self, now):
+        """Скорость самого загруженного диска (МБ/с) с предыдущего чтения"""
+        totals = {name: io.read_bytes + io.write_bytes
+                  for name, io in (psutil.disk_io_counters(perdisk=True) or {}).items()}
+        last, self.disk_last = self.disk_last, (now, totals)
+        if last is None or now <= last[0]:
+            return None
+        busiest = max((total - last[1].get(name, total) for name, total in totals.items()), default=0)
+        return max(busiest, 0) / (now - last[0]) / 1024**2
+
+    def read_cpu(self, now):
+        """Загрузка процессора (%) по разности cpu_times с предыдущего чтения"""
+        times = psutil.cpu_times()
+        idle = times.idle + getattr(times, 'iowait', 0.0)
+        # В Linux время гостевых систем уже входит в user и nice - второй раз не считается
+        total = sum(times) - getattr(times, 'guest', 0.0) - getattr(times, 'guest_nice', 0.0)
+        last, self.cpu_last = self.cpu_last, (idle, total)
+        if last is None or total <= last[1]:
+            return None
+        return 100.0 * (1.0 - (idle - last[0]) / (total - last[1]))
+
+    def read_input(self, now):
+        return seconds_since_input()
+
+    READERS = {'disk': read_disk, 'cpu': read_cpu, 'input': read_input}
+
+    def scan_processes(self, now):
+        """
+        Дорогая проверка: какие несистемные процессы заметно нагружали процессор
+        или диски с прошлого снимка. Без свежего снимка возвращает None
+        """
+        snapshot = {}
+        for proc in psutil.process_iter(['pid', 'name', 'cpu_times', 'io_counters']):
+            info = proc.info
+            name = (info['name'] or '').lower()
+            if not name or name in SYSTEM_PROCESSES or info['cpu_times'] is None:
+                continue
+            io = info['io_counters']
+            snapshot[info['pid']] = (name, sum(info['cpu_times'][:2]), io.read_bytes + io.write_bytes if io else 0)
+        last, self.scan_last = self.scan_last, (now, snapshot)
+        if last is None or not 0 < now - last[0] <= IDLE_SCAN_MAX_AGE:
+            return None
+        elapsed = now - last[0]
+        cpu_limit = self.signals.get('cpu', IDLE_SIGNALS['cpu'])['threshold'] / 100 * elapsed
+        disk_limit = self.signals.get('disk', IDLE_SIGNALS['disk'])['threshold'] * 1024**2 * elapsed
+        busy = set()
+        for pid, (name, cpu, io) in snapshot.items():
+            previous = last[1].get(pid)
+            if previous and previous[0] == name and (cpu - previous[1] > cpu_limit or io - previous[2] > disk_limit):
+                busy.add(name)
+        return busy
+
+    def update(self, speed, now, total):
+        for name, signal in self.signals.items():
+            if name == 'net':
+                self.values[name] = speed / 1024**2
+            elif now - self.read_at.get(name, float('-inf')) >= signal['every']:
+                self.values[name] = self.READERS[name](self, now)
+                self.read_at[name] = now
+
+        weighted = weights = 0.0
+        for name, signal in self.signals.items():
+            value = self.values.get(name)
+            if value is None:
+                continue
+            ratio = value / signal['threshold']
+            # Для ввода больше - значит дольше простой; для остальных сигналов оценка
+            # плавно падает от 1 на пороге до 0 на удвоенном пороге
+            idle = min(ratio, 1.0) if name == 'input' else min(max(2.0 - ratio, 0.0), 1.0)
+            weighted += signal['weight'] * idle
+            weights += signal['weight']
+        self.score = weighted / weights if weights else 1.0
+
+        self.busy_processes = None
+        if self.score >= IDLE_LEVEL:
+            return True
+        if self.score <= BUSY_LEVEL:
+            return False
+        self.busy_processes = self.scan_processes(now)
+        # Пока нет двух снимков процессов, неоднозначный замер пропуском не считается
+        return self.busy_processes is not None and not self.busy_processes
+
+    def status(self):
+        if self.score is None:
+            return ""
+        labels = {'net': "сеть {:.2f} МБ/с", 'disk': "диск {:.2f} МБ/с", 'cpu': "ЦП {:.0f}%", 'input': "без ввода {:.0f} с"}
+        parts = [labels[name].format(self.values[name]) for name in self.signals if self.values.get(name) is not None]
+        text = f" | простой {self.score:.0%} ({', '.join(parts)})"
+        if self.busy_processes:
+            text += f", заняты: {', '.join(sorted(self.busy_processes)[:3])}"
+        return text
+
+def make_counters(settings):
+    """Источник счетчиков для профиля (один или несколько интерфейсов)"""
+    return PsutilCounters(*(settings.get('interfaces') or [settings['interface']]))
+
+# Классы правил срабатывания по режимам TRIGGER_MODES
+TRIGGER_CLASSES = {
+    't': ThresholdTrigger,
+    'p': PercentileTrigger,
+    'a': BaselineTrigger,
+    'c': CusumTrigger,
+    'f': ForecastTrigger,
+    'v': ByteBudgetTrigger,
+    'r': RuleTrigger,
+    'i': IdleTrigger
+}
+
+def check_offline_mode(settings):
+    """
+    Офлайн-команды (воспроизведение, подбор, анализ) видят только записанные счетчики
+    сети; правило, читающее текущее состояние компьютера, по ним не проверить
+    """
+    mode = settings.get('trigger_mode', 't')
+    if TRIGGER_CLASSES.get(mode, Trigger).live:
+        raise ValueError(f"режим срабатывания '{mode}' ({TRIGGER_MODES[mode]}) зависит от текущего "
+                         f"состояния компьютера и по записанным замерам не проверяется")
+
+def make_trigger(settings, profile_name=None):
+    """
+    Создает триггер по настройкам профиля
+    profile_name - имя профиля, в который триггер может сохранять свое состояние
+    """
+    cls = TRIGGER_CLASSES.get(settings.get('trigger_mode', 't'), ThresholdTrigger)
+    if issubclass(cls, BaselineTrigger):
+        return cls(settings, profile_name)
+    return cls(settings)
+
+class Profile:
+    """
+    Проверенный профиль мониторинга
+    Значения проверяются и приводятся к нужным типам один раз при создании,
+    направление, название действия и правило срабатывания выбираются заранее,
+    поэтому цикл мониторинга не обращается к словарю настроек на каждом замере
+    """
+    __slots__ = ('name', 'settings', 'interfaces', 'traffic_type', 'counter_index', 'direction',
+                 'allowed_failures', 'threshold', 'interval', 'shutdown_delay', 'action_mode',
+                 'action_name', 'monitor_disk', 'trigger_mode', 'hooks', 'hooks_deadline')
+
+    def __init__(self, settings, name=None):
+        self.name = name
+        self.settings = dict(PROFILE_DEFAULTS, **settings)
+        try:
+            self.validate()
+            # Правило срабатывания создается и сразу отбрасывается, чтобы ошибки
+            # в его параметрах обнаружились до начала мониторинга
+            self.make_trigger()
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Профиль '{name}': {e}" if name else f"Ошибка в настройках: {e}") from None
+
+    @staticmethod
+    def number(settings, key, minimum, integer=False):
+        """Числовой параметр не меньше minimum (integer - только целое)"""
+        value = settings[key]
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or (integer and value != int(value)):
+            raise ValueError(f"параметр {key} должен быть {'целым ' if integer else ''}числом")
+        if value < minimum:
+            raise ValueError(f"параметр {key} должен быть не меньше {minimum}")
+        return int(value) if integer else value
+
+    def validate(self):
+        settings = self.settings
+        self.interfaces = tuple(settings.get('interfaces') or [settings.get('interface')])
+        if not all(isinstance(name, str) and name for name in self.interfaces):
+            raise ValueError("не задан сетевой интерфейс")
+
+        self.traffic_type = settings['traffic_type']
+        if self.traffic_type not in ('u', 'd'):
+            raise ValueError("тип трафика должен быть u или d")
+        # Индекс в паре (принято, отправлено), которую возвращают счетчики
+        self.counter_index = 1 if self.traffic_type == 'u' else 0
+        self.direction = "📤 Upload" if self.traffic_type == 'u' else "📥 Download"
+
+        self.allowed_failures = self.number(settings, 'allowed_failures', 1, integer=True)
+        self.threshold = self.number(settings, 'threshold', 0)
+        self.interval = self.number(settings, 'interval', 0)
+        if self.interval <= 0:
+            raise ValueError("параметр interval должен быть больше 0")
+        self.shutdown_delay = self.number(settings, 'shutdown_delay', 0, integer=True)
+
+        self.action_mode = settings['action_mode']
+        if self.action_mode not in ACTION_NAMES:
+            raise ValueError(f"неизвестный режим действия '{self.action_mode}'")
+        self.action_name = ACTION_NAMES[self.action_mode]
+        self.monitor_disk = bool(settings['monitor_disk'])
+
+        self.trigger_mode = settings.get('trigger_mode', 't')
+        if self.trigger_mode not in TRIGGER_MODES:
+            raise ValueError(f"неизвестный режим срабатывания '{self.trigger_mode}'")
+        TRIGGER_CLASSES[self.trigger_mode].validate(settings)
+
+        self.hooks = settings.get('hooks') or None
+        if self.hooks is not None and not isinstance(self.hooks, list):
+            raise ValueError("hooks должен быть списком команд")
+        for number, hook in enumerate(self.hooks or (), 1):
+            try:
+                check_hook(hook)
+            except ValueError as e:
+                raise ValueError(f"подготовительная команда №{number}: {e}") from None
+        self.hooks_deadline = _parse_duration(settings.get('hooks_deadline', HOOKS_DEADLINE))
+
+        # Правила срабатывания читают настройки из словаря - отдаем им уже проверенные значения
+        settings.update(allowed_failures=self.allowed_failures, threshold=self.threshold,
+                        interval=self.interval, shutdown_delay=self.shutdown_delay)
+
+    def make_counters(self):
+        return make_counters(self.settings)
+
+    def make_trigger(self):
+        return make_trigger(self.settings, self.name)
+
+def ask_trigger_settings(settings):
+    """Запрашивает режим срабатывания и его параметры (Enter - оставить текущие)"""
+    current = settings.get('trigger_mode', 't')
+    print("\nРежимы срабатывания:")
+    for key, name in TRIGGER_MODES.items():
+        print(f"{key} - {name}")
+    mode = input(f"Введите режим срабатывания [{current}]: ").lower()
+    if mode in TRIGGER_MODES:
+        settings['trigger_mode'] = mode
+    mode = settings.get('trigger_mode', 't')
+
+    try:
+        if mode == 't':
+            current = format_time(settings['max_interval']) if settings.get('max_interval') else 'нет'
+            value = input(f"Проверять диски при высокой скорости не чаще чем раз в (например, 5m, 0 - перед каждым замером) [{current}]: ")
+            if value:
+                settings['max_interval'] = parse_time_input(value)
+        elif mode == 'p':
+            percentile = input(f"Перцентиль (1-99) [{settings.get('percentile', 90)}]: ")
+            if percentile:
+                settings['percentile'] = min(max(int(percentile), 1), 99)
+            window = input(f"Длина окна (например, 10m) [{format_time(settings.get('percentile_window', 600))}]: ")
+            if window and parse_time_input(window) > 0:
+                settings['percentile_window'] = parse_time_input(window)
+        elif mode == 'a':
+            print("Пороговая скорость профиля остается нижней границей адаптивного порога")
+            fraction = input(f"Доля от обычной скорости (0-1) [{settings.get('baseline_fraction', 0.2)}]: ")
+            if fraction:
+                settings['baseline_fraction'] = min(max(float(fraction), 0.0), 1.0)
+            sigmas = input(f"Количество стандартных отклонений [{settings.get('baseline_sigmas', 3.0)}]: ")
+            if sigmas:
+                settings['baseline_sigmas'] = float(sigmas)
+        elif mode == 'c':
+            drop = input(f"Минимальное обнаруживаемое падение (доля от обычной скорости, 0-1) [{settings.get('cusum_drop', 0.5)}]: ")
+            if drop:
+                settings['cusum_drop'] = min(max(float(drop), 0.05), 1.0)
+            rate = input(f"Допустимое число ложных срабатываний в сутки [{settings.get('cusum_false_alarms', 0.1)}]: ")
+            if rate:
+                settings['cusum_false_alarms'] = max(float(rate), 1e-6)
+        elif mode == 'f':
+            window = input(f"Окно прогноза (например, 5m) [{format_time(settings.get('forecast_window', 300))}]: ")
+            if window and parse_time_input(window) > 0:
+                settings['forecast_window'] = parse_time_input(window)
+            min_r2 = input(f"Минимальное качество прогноза R² (0-1) [{settings.get('forecast_min_r2', 0.8)}]: ")
+            if min_r2:
+                settings['forecast_min_r2'] = min(max(float(min_r2), 0.0), 1.0)
+        elif mode == 'v':
+            while True:
+                budget = input(f"Объем данных (ГБ) [{settings.get('budget_bytes', 0)/1024**3:.2f}]: ")
+                try:
+                    if budget:
+                        settings['budget_bytes'] = int(float(budget) * 1024**3)
+                except (ValueError, OverflowError):
+                    print("❌ Неверный формат числа.")
+                    continue
+                if settings.get('budget_bytes', 0) > 0:
+                    break
+                print("❌ Объем данных должен быть больше 0")
+            current = ', '.join(settings.get('interfaces') or [settings['interface']])
+            extra = input(f"Интерфейсы через запятую [{current}]: ")
+            if extra:
+                settings['interfaces'] = [name.strip() for name in extra.split(',') if name.strip()]
+        elif mode == 'r':
+            if not settings.get('rules'):
+                # Начальное правило повторяет классическое: сеть ниже порога N замеров подряд
+                settings['rules'] = {
+                    'all': [{'signal': 'net', 'below': settings['threshold'] / 1024**2,
+                             'k': settings['allowed_failures'], 'n': settings['allowed_failures']}],
+                    'stages': [{'hold': 0, 'action': settings.get('action_mode', 's')}]
+                }
+            print("Правила редактируются в profiles.json (ключ rules), например:")
+            print('  {"all": [{"signal": "net", "below": 0.1, "k": 5, "n": 6},')
+            print('           {"signal": "cpu", "below": 10, "for": "2m"},')
+            print('           {"signal": "process", "absent": ["steam.exe"]}],')
+            print('   "stages": [{"hold": "0s", "action": "b"}, {"hold": "5m", "action": "s"}]}')
+            try:
+                RuleTrigger(settings)  # Проверяем правила сразу
+            except ValueError as e:
+                print(f"❌ Ошибка в правилах: {e}")
+        elif mode == 'i':
+            signals = settings.setdefault('idle_signals', {})
+            prompts = (
+                ('cpu', "Порог загрузки процессора (%)", float),
+                ('disk', "Порог скорости самого загруженного диска (МБ/с)", float),
+                ('input', "Время без ввода пользователя (например, 5m)", parse_time_input)
+            )
+            for name, prompt, parse in prompts:
+                signal = signals.setdefault(name, {})
+                current = signal.get('threshold', IDLE_SIGNALS[name]['threshold'])
+                shown = format_time(int(current)) if name == 'input' else current
+                value = input(f"{prompt} [{shown}]: ")
+                if value and parse(value) > 0:
+                    signal['threshold'] = parse(value)
+            print("Веса и периоды чтения сигналов настраиваются в profiles.json (ключ idle_signals)")
+    except ValueError:
+        print("❌ Неверный формат числа. Оставлено текущее значение.")
+
+class SystemClock:
+    """Реальные часы"""
+
+    def time(self):
+        return time.time()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def wait(self, event, seconds):
+        """Ждет событие не дольше seconds; возвращает True, если событие наступило"""
+        return event.wait(seconds)
+
+SYSTEM_CLOCK = SystemClock()
+
+class VirtualClock:
+    """Виртуальные часы: sleep() мгновенно сдвигает время вперед"""
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+    def wait(self, event, seconds):
+        self.now += seconds
+        return event.is_set()
+
+class CounterSource:
+    """
+    Источник счетчиков байт для мониторинга
+    read() возвращает нарастающие итоги (принято, отправлено) в байтах
+    """
+
+    def read(self):
+        raise NotImplementedError
+
+def net_counters():
+    """
+    Счетчики сетевых интерфейсов: {имя: (принято, отправлено)} в байтах
+    В Linux читается /proc/net/dev - оттуда же их берет psutil, но первому
+    замеру не нужно ждать загрузки psutil
+    """
+    if sys.platform.startswith('linux'):
+        try:
+            with open('/proc/net/dev', encoding='ascii', errors='replace') as file:
+                lines = file.readlines()[2:]
+        except OSError:
+            pass
+        else:
+            stats = {}
+            for line in lines:
+                name, _, data = line.rpartition(':')
+                fields = data.split()
+                stats[name.strip()] = int(fields[0]), int(fields[8])
+            return stats
+    return {name: (nic.bytes_recv, nic.bytes_sent) for name, nic in psutil.net_io_counters(pernic=True).items()}
+
+class PsutilCounters(CounterSource):
+    """Счетчики принятых/отправленных байт сетевых интерфейсов (суммарно, через net_counters)"""
+
+    def __init__(self, *interfaces):
+        self.interfaces = interfaces
+
+    def read(self):
+        """Возвращает (принято, отправлено) байт"""
+        stats = net_counters()
+        if len(self.interfaces) == 1:
+            return stats[self.interfaces[0]]
+        return (sum(stats[name][0] for name in self.interfaces),
+                sum(stats[name][1] for name in self.interfaces))
+
+class TraceFinished(Exception):
+    """Записанная трасса закончилась"""
+
+Trace = namedtuple('Trace', 'interface times rx tx')
+TRACE_COLUMNS = ('timestamp', 'interface', 'rx', 'tx')
+
+def load_trace(path):
+    """Загружает трассу счетчиков из CSV-файла"""
+    times, rx, tx = array('d'), array('q'), array('q')
+    interface = None
+    with open(path, newline='', encoding='utf-8') as file:
+        for row in csv.DictReader(file):
+            times.append(float(row['timestamp']))
+            rx.append(int(row['rx']))
+            tx.append(int(row['tx']))
+            interface = interface or row['interface']
+    if not times:
+        raise ValueError(f"Трасса {path} пуста")
+    return Trace(interface, times, rx, tx)
+
+class TraceCounters(CounterSource):
+    """Счетчики из записанной трассы: значение на момент времени виртуальных часов"""
+
+    def __init__(self, trace, clock):
+        self.trace = trace
+        self.clock = clock
+
+    def read(self):
+        now = self.clock.time()
+        times = self.trace.times
+        if now > times[-1]:
+            raise TraceFinished()
+        idx = max(bisect.bisect_right(times, now) - 1, 0)
+        return self.trace.rx[idx], self.trace.tx[idx]
+
+def record_trace(interface, path, duration=0, period=1.0):
+    """Записывает трассу счетчиков интерфейса в CSV-файл (Ctrl+C - остановка)"""
+    counters = PsutilCounters(interface)
+    started = time.monotonic()
+    count = 0
+    print(f"⏺️ Запись трассы {interface} в {path} (Ctrl+C - остановка)")
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(TRACE_COLUMNS)
+        try:
+            while not duration or time.monotonic() - started < duration:
+                rx, tx = counters.read()
+                writer.writerow((f"{time.time():.3f}", interface, rx, tx))
+                count += 1
+                if count % 60 == 0:
+                    file.flush()
+                # Планируем следующий замер от начала записи, чтобы не накапливать сдвиг
+                time.sleep(max(0.0, started + count * period - time.monotonic()))
+        except KeyboardInterrupt:
+            pass
+    print(f"\n✅ Записано замеров: {count}")
+    return count
+
+def replay_trace(trace, settings):
+    """
+    Прогоняет трассу через логику monitor_traffic на виртуальных часах
+    Возвращает список (время трассы, режим действия) для каждого срабатывания
+    """
+    check_offline_mode(settings)
+    # Активность дисков в трассе не записывается, а подготовительные команды профиля
+    # выполнялись бы по-настоящему и в реальном времени - при воспроизведении их нет
+    profile = Profile(dict(settings, interface=trace.interface, interfaces=None, monitor_disk=False, hooks=None))
+    clock = VirtualClock(trace.times[0])
+    counters = TraceCounters(trace, clock)
+    fired = []
+
+    def action(mode):
+        fired.append((clock.time(), mode))
+
+    # Вывод не перехватывается (sys.stdout общий для всех потоков) - окружение цикла молчит само
+    reporter = SilentReporter(clock, action)
+    try:
+        while True:
+            monitor_traffic(
+                profile, counters=counters, clock=clock, action=action,
+                interactive=False, persist=False, reporter=reporter
+            )
+    except TraceFinished:
+        pass
+    return fired
+
+def show_replay(path, settings, compare=None, end=None):
+    """
+    Воспроизводит трассу и выводит моменты срабатывания действия
+    compare - список режимов срабатывания для сравнения задержки обнаружения,
+    end - момент реального окончания загрузки (секунды от начала трассы)
+    """
+    try:
+        trace = load_trace(path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"\n❌ Ошибка при загрузке трассы: {e}")
+        return 1
+    try:
+        check_offline_mode(settings)
+    except ValueError as e:
+        print(f"\n❌ {e}")
+        return 1
+
+    duration = int(trace.times[-1] - trace.times[0])
+    print(f"▶️ Воспроизведение {path}: {format_time(duration)} данных, замеров: {len(trace.times)}")
+    if compare:
+        modes = [settings.get('trigger_mode', 't')] + [mode for mode in compare if mode != settings.get('trigger_mode', 't')]
+        print(f"\n{'Режим':<7}{'Первое срабатывание':>22}{'Задержка':>12}{'Срабатываний':>14}{'Время, мс':>11}")
+        for mode in modes:
+            if TRIGGER_CLASSES[mode].live:
+                print(f"{mode:<7}{'не воспроизводится по трассе':>59}")
+                continue
+            started = time.perf_counter()
+            fired = replay_trace(trace, dict(settings, trigger_mode=mode))
+            elapsed = time.perf_counter() - started
+            first = int(fired[0][0] - trace.times[0]) if fired else None
+            delay = '-' if first is None or end is None else (
+                format_time(first - end) if first >= end else f"-{format_time(end - first)}")
+            print(f"{mode:<7}{format_time(first) if fired else '-':>22}{delay:>12}{len(fired):>14}{elapsed*1000:>11.0f}")
+        return 0
+
+    started = time.perf_counter()
+    fired = replay_trace(trace, settings)
+    elapsed = time.perf_counter() - started
+
+    if not fired:
+        print("✅ Действие не сработало бы ни разу")
+    for moment, mode in fired[:REPLAY_MAX_LINES]:
+        stamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(moment))
+        print(f"🔴 Действие '{mode}' сработало бы в {stamp} "
+              f"(через {format_time(int(moment - trace.times[0]))} от начала трассы)")
+    if len(fired) > REPLAY_MAX_LINES:
+        print(f"... и еще {len(fired) - REPLAY_MAX_LINES} (всего срабатываний: {len(fired)})")
+    print(f"⏱️ Воспроизведение заняло {elapsed*1000:.0f} мс")
+    return 0
+
+def require_numpy():
+    """Импортирует NumPy, необходимый только для офлайн-анализа"""
+    try:
+        import numpy
+    except ImportError:
+        raise RuntimeError("Для этой команды нужен пакет numpy (pip install numpy)")
+    return numpy
+
+def trace_fire_times(path, intervals, thresholds, failures, shutdown_delay, traffic_type='d'):
+    """
+    Векторно вычисляет момент срабатывания действия для сетки параметров на одной трассе
+    Повторяет логику monitor_traffic: замер каждые interval секунд, действие после
+    failures подряд замеров ниже порога и задержки shutdown_delay.
+    Возвращает длительность трассы и массив [интервал, порог, пропуски] со временем
+    срабатывания от начала трассы (nan - не сработало)
+    """
+    np = require_numpy()
+    data = np.loadtxt(path, delimiter=',', skiprows=1, usecols=(0, 2, 3), ndmin=2)
+    times = data[:, 0]
+    counter = data[:, 2] if traffic_type == 'u' else data[:, 1]
+    limits = np.asarray(thresholds, dtype=float)[:, None]
+    result = np.full((len(intervals), len(thresholds), len(failures)), np.nan)
+
+    for i, interval in enumerate(intervals):
+        ticks = np.arange(times[0], times[-1] + 1e-6, interval)
+        if len(ticks) < 2:
+            continue
+        values = counter[np.searchsorted(times, ticks, side='right') - 1]
+        low = (np.diff(values) / interval)[None, :] < limits
+        pos = np.arange(low.shape[1])
+        # Длина серии низких замеров, заканчивающейся в каждой позиции
+        run = pos - np.maximum.accumulate(np.where(low, -1, pos), axis=1)
+        for j, count in enumerate(failures):
+            hit = run >= count
+            first = hit.argmax(axis=1)
+            result[i, :, j] = np.where(hit.any(axis=1), ticks[1:][first] + shutdown_delay, np.nan)
+    return times[-1] - times[0], result - times[0]
+
+def _tune_trace(job):
+    """Обработка одной трассы в отдельном процессе"""
+    return trace_fire_times(*job)
+
+def tune_profile(folder, labels, intervals, thresholds, failures, shutdown_delay=30, traffic_type='d', workers=None):
+    """
+    Перебирает сетку параметров по всем трассам папки
+    labels - {имя файла трассы: момент окончания загрузки от начала трассы (секунды или строка
+    вида 1h30m) или None, если загрузка не закончилась}
+    Возвращает список результатов, отсортированный по доле ложных срабатываний,
+    доле пропущенных окончаний и средней задержке обнаружения
+    """
+    np = require_numpy()
+    names = [name for name in sorted(labels) if os.path.exists(os.path.join(folder, name))]
+    if not names:
+        raise ValueError("Нет размеченных трасс")
+    ends = []
+    for name in names:
+        try:
+            ends.append(np.nan if labels[name] is None else _parse_duration(labels[name]))
+        except ValueError as e:
+            raise ValueError(f"Метка трассы {name}: {e}") from None
+    ends = np.array(ends, dtype=float)
+
+    jobs = [(os.path.join(folder, name), intervals, thresholds, failures, shutdown_delay, traffic_type)
+            for name in names]
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        durations, fires = zip(*pool.map(_tune_trace, jobs))
+    for name, end, duration in zip(names, ends, durations):
+        if end == end and not 0 <= end <= duration:
+            raise ValueError(f"Метка трассы {name} ({format_time(int(end))}) вне трассы длительностью "
+                             f"{format_time(int(duration))}: время окончания задается от начала трассы")
+    fires = np.stack(fires)
+
+    ends = ends[:, None, None, None]
+    fired = ~np.isnan(fires)
+    false_rate = (fired & ~(fires >= ends)).mean(axis=0)      # Сработало до окончания загрузки
+    miss_rate = (~fired & ~np.isnan(ends)).mean(axis=0)       # Окончание так и не обнаружено
+    delays = np.where(fired & (fires >= ends), fires - ends, np.nan)
+    with np.errstate(invalid='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        mean_delay = np.nanmean(delays, axis=0)
+
+    results = []
+    for i, j, k in np.ndindex(false_rate.shape):
+        results.append({
+            'interval': intervals[i],
+            'threshold': thresholds[j],
+            'allowed_failures': failures[k],
+            'false_rate': float(false_rate[i, j, k]),
+            'miss_rate': float(miss_rate[i, j, k]),
+            'mean_delay': float(mean_delay[i, j, k]),
+        })
+    results.sort(key=lambda r: (r['false_rate'], r['miss_rate'],
+                                r['mean_delay'] if r['mean_delay'] == r['mean_delay'] else float('inf')))
+    return results
+
+def show_tuning(folder, labels_path, intervals, thresholds, failures, settings, top=10, apply_to=None, workers=None):
+    """
+    Подбирает параметры профиля по трассам и выводит лучшие варианты
+    Варианты оцениваются по классическому правилу (режим t), поэтому сохранить
+    лучший вариант (apply_to) можно только в профиль этого режима
+    """
+    mode = settings.get('trigger_mode', 't')
+    if apply_to and mode != 't':
+        print(f"\n❌ Подобранные значения рассчитаны для режима t, а профиль использует режим {mode} "
+              f"({TRIGGER_MODES[mode]}); --apply не выполняется")
+        return 1
+    try:
+        check_offline_mode(settings)
+        with open(labels_path, encoding='utf-8') as file:
+            labels = json.load(file)
+        started = time.perf_counter()
+        results = tune_profile(folder, labels, intervals, [t * 1024**2 for t in thresholds], failures,
+                               settings['shutdown_delay'], settings['traffic_type'], workers)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"\n❌ Ошибка подбора параметров: {e}")
+        return 1
+
+    print(f"\n🎯 Проверено вариантов: {len(results)} за {time.perf_counter() - started:.1f} сек")
+    if mode != 't':
+        print(f"⚠️ Варианты оценены по классическому правилу (режим t), а не по режиму профиля {mode}")
+    print(f"{'Порог МБ/с':>11}{'Пропуски':>10}{'Интервал':>10}{'Ложные':>9}{'Пропущено':>11}{'Задержка':>12}")
+    for r in results[:top]:
+        delay = format_time(int(r['mean_delay'])) if r['mean_delay'] == r['mean_delay'] else '-'
+        print(f"{r['threshold']/1024**2:>11.2f}{r['allowed_failures']:>10}{r['interval']:>10}"
+              f"{r['false_rate']:>9.0%}{r['miss_rate']:>11.0%}{delay:>12}")
+
+    if apply_to:
+        best = results[0]
+        profile = dict(settings)
+        profile.update(threshold=best['threshold'], allowed_failures=best['allowed_failures'],
+                       interval=best['interval'])
+        if not save_profile(apply_to, profile):
+            return 1
+    return 0
+
+def iter_sample_chunks(path, chunk=ANALYZE_CHUNK, interfaces=None):
+    """
+    Читает замеры из журнала (.bin) или трассы (.csv) блоками фиксированного размера
+    interfaces - брать только замеры этого набора интерфейсов (None - все замеры);
+    в журнале набор помечен меткой journal_tag, трасса записывается по одному интерфейсу
+    Возвращает структурированные массивы NumPy с полями t, rx, tx
+    """
+    np = require_numpy()
+    dtype = np.dtype([('t', 'f8'), ('rx', 'f8'), ('tx', 'f8')])
+    if path.lower().endswith('.csv'):
+        source = open(path, newline='', encoding='utf-8')
+        rows = csv.reader(source)
+        next(rows, None)
+        interface = '+'.join(interfaces) if interfaces else None
+        samples = ((float(row[0]), float(row[2]), float(row[3])) for row in rows
+                   if interface is None or row[1] == interface)
+    else:
+        source = JournalReader(path)
+        tag = journal_tag(interfaces) if interfaces else None
+        samples = ((record.timestamp, record.rx, record.tx) for record in source
+                   if tag is None or record.interface == tag)
+    try:
+        while True:
+            block = np.fromiter(itertools.islice(samples, chunk), dtype=dtype)
+            if not len(block):
+                break
+            yield block
+    finally:
+        source.close()
+
+class ProfileReport:
+    """Потоковая статистика по замерам для одного профиля"""
+
+    def __init__(self, name, settings, edges):
+        np = require_numpy()
+        self.name = name
+        self.threshold = settings['threshold']
+        self.allowed_failures = settings['allowed_failures']
+        self.column = 'tx' if settings.get('traffic_type') == 'u' else 'rx'
+        # Замеры профиля с несколькими интерфейсами - суммы, журнал помечает их всем набором
+        self.interfaces = tuple(settings.get('interfaces') or [settings.get('interface')])
+        self.edges = edges
+        self.histogram = np.zeros(len(edges) - 1, dtype=np.int64)
+        self.samples = 0
+        self.total_time = 0.0
+        self.below_time = 0.0
+        self.near_misses = 0
+        self.fires = []
+        self.start_stream()
+
+    def start_stream(self):
+        """Начинает новый файл: серия пропусков и предыдущий замер сбрасываются"""
+        self.prev = None
+        self.run = 0
+
+    def feed(self, block):
+        """Обрабатывает блок замеров"""
+        np = require_numpy()
+        times = block['t']
+        counter = block[self.column]
+        if self.prev is not None:
+            times = np.concatenate(([self.prev[0]], times))
+            counter = np.concatenate(([self.prev[1]], counter))
+        self.prev = (times[-1], counter[-1])
+        if len(times) < 2:
+            return
+
+        dt = np.diff(times)
+        delta = np.diff(counter)
+        valid = (dt > 0) & (dt <= ANALYZE_MAX_GAP) & (delta >= 0)
+        speed = np.divide(delta, dt, out=np.zeros_like(delta), where=valid)
+        low = valid & (speed < self.threshold)
+
+        # Длина серии низких замеров с учетом хвоста предыдущего блока
+        pos = np.arange(len(low))
+        last_ok = np.maximum.accumulate(np.where(low, -1, pos))
+        run = np.where(last_ok < 0, pos + 1 + self.run, pos - last_ok)
+        run[~low] = 0
+        carried_run = self.run
+        self.run = int(run[-1])
+
+        self.samples += int(valid.sum())
+        self.total_time += float(dt[valid].sum())
+        self.below_time += float(dt[low].sum())
+        self.histogram += np.histogram(np.minimum(speed[valid], self.edges[-1]), bins=self.edges)[0]
+        if self.allowed_failures > 1:
+            # Серия дошла до предпоследнего пропуска, но прервалась
+            ended = np.append(run[1:] == 0, False)
+            self.near_misses += int(((run == self.allowed_failures - 1) & ended).sum())
+            if run[0] == 0 and carried_run == self.allowed_failures - 1:
+                self.near_misses += 1  # Серия прервалась на границе блоков
+        self.fires.extend(times[1:][run == self.allowed_failures].tolist())
+
+    def percentile(self, q):
+        """Оценка перцентиля скорости по гистограмме (линейная интерполяция внутри корзины)"""
+        np = require_numpy()
+        total = self.histogram.sum()
+        if not total:
+            return float('nan')
+        cumulative = np.cumsum(self.histogram)
+        target = q / 100 * total
+        idx = int(np.searchsorted(cumulative, target))
+        before = cumulative[idx - 1] if idx else 0
+        share = (target - before) / self.histogram[idx] if self.histogram[idx] else 0
+        return float(self.edges[idx] + share * (self.edges[idx + 1] - self.edges[idx]))
+
+def analyze_history(paths, profiles):
+    """Пакетный анализ истории замеров для набора профилей"""
+    np = require_numpy()
+    # Корзины гистограммы: 0, затем логарифмическая шкала от 1 КБ/с до 1 ТБ/с
+    edges = np.concatenate(([0.0], np.logspace(10, 40, 61, base=2)))
+    reports = [ProfileReport(name, settings, edges) for name, settings in profiles.items()]
+    # Профили одного интерфейса обрабатываются за один проход по файлу
+    groups = {}
+    for report in reports:
+        groups.setdefault(report.interfaces, []).append(report)
+    for path in paths:
+        for interfaces, group in groups.items():
+            for report in group:
+                report.start_stream()
+            for block in iter_sample_chunks(path, interfaces=interfaces):
+                for report in group:
+                    report.feed(block)
+    return reports
+
+def show_analysis(paths, profiles, csv_path=None, npz_path=None):
+    """Выводит отчет по истории замеров и при необходимости сохраняет его"""
+    try:
+        started = time.perf_counter()
+        reports = analyze_history(paths, profiles)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"\n❌ Ошибка анализа: {e}")
+        return 1
+
+    print(f"\n📊 Проанализировано файлов: {len(paths)} за {time.perf_counter() - started:.1f} сек")
+    rows = []
+    for report in reports:
+        share = report.below_time / report.total_time if report.total_time else 0
+        p50, p90, p99 = (report.percentile(q) for q in (50, 90, 99))
+        print(f"\nПрофиль '{report.name}' (порог {report.threshold/1024**2:.2f} МБ/с, пропуски {report.allowed_failures}):")
+        print(f"  Замеров: {report.samples}, время наблюдения: {format_time(int(report.total_time))}")
+        print(f"  Ниже порога: {format_time(int(report.below_time))} ({share:.1%})")
+        print(f"  Скорость p50/p90/p99: {p50/1024**2:.2f} / {p90/1024**2:.2f} / {p99/1024**2:.2f} МБ/с")
+        print(f"  Почти срабатываний: {report.near_misses}, срабатываний: {len(report.fires)}")
+        for moment in report.fires[:5]:
+            print(f"    🔴 {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(moment))}")
+        if len(report.fires) > 5:
+            print(f"    ... и еще {len(report.fires) - 5}")
+        rows.append((report.name, report.threshold, report.allowed_failures, report.samples,
+                     round(report.total_time, 1), round(report.below_time, 1), round(share, 4),
+                     p50, p90, p99, report.near_misses, len(report.fires)))
+
+    try:
+        if csv_path:
+            with open(csv_path, 'w', newline='', encoding='utf-8') as file:
+                writer = csv.writer(file)
+                writer.writerow(('profile', 'threshold', 'allowed_failures', 'samples', 'total_time',
+                                 'below_time', 'below_share', 'p50', 'p90', 'p99', 'near_misses', 'fires'))
+                writer.writerows(rows)
+            print(f"\n✅ Отчет сохранен в {csv_path}")
+        if npz_path:
+            np = require_numpy()
+            arrays = {'profiles': np.array([r.name for r in reports]), 'edges': reports[0].edges if reports else np.zeros(0)}
+            for idx, report in enumerate(reports):
+                arrays[f'histogram_{idx}'] = report.histogram
+                arrays[f'fires_{idx}'] = np.array(report.fires)
+            np.savez_compressed(npz_path, **arrays)
+            print(f"✅ Данные сохранены в {npz_path}")
+    except OSError as e:
+        print(f"\n❌ Ошибка при сохранении отчета: {e}")
+        return 1
+    return 0
+
+def get_interface():
+    """Выбор сетевого интерфейса"""
+    try:
+        interfaces = list(net_counters())
+        if not interfaces:
+            print("\n❌ Не найдено сетевых интерфейсов!")
+            return None
+            
+        print("Доступные интерфейсы:")
+        for idx, name in enumerate(interfaces, 1):
+            print(f"{idx}. {name}")
+            
+        while True:
+            try:
+                choice = input("\nВведите номер интерфейса (или Enter для отмены): ")
+                if not choice:
+                    return None
+                choice = int(choice) - 1
+                return interfaces[choice]
+            except (ValueError, IndexError):
+                print("❌ Неверный ввод. Попробуйте снова.")
+    except Exception as e:
+        print(f"\n❌ Ошибка при получении интерфейсов: {e}")
+        return None
+
+class ProfileStore:
+    """
+    Профили из profiles.json с кэшем в памяти
+    Файл перечитывается, только если изменились время модификации или размер;
+    запись идет во временный файл с fsync и атомарной заменой, поэтому выключение
+    посреди записи не оставляет обрезанный файл
+    """
+
+    def __init__(self, path=CONFIG_FILE):
+        self.path = path
+        self.profiles = {}
+        self.signature = None
+        self.corrupt = False
+        self.lock = threading.RLock()
+
+    def stat(self):
+        try:
+            info = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (info.st_mtime_ns, info.st_size)
+
+    def load(self):
+        """Возвращает копию профилей; файл читается только после его изменения"""
+        with self.lock:
+            signature = self.stat()
+            if signature != self.signature:
+                self.signature = signature
+                self.profiles = {}
+                self.corrupt = False
+                if signature is not None:
+                    try:
+                        with open(self.path, "r", encoding='utf-8') as file:
+                            self.profiles = json.load(file)
+                    except ValueError:
+                        self.corrupt = True
+                        raise
+            elif self.corrupt:
+                # Файл не менялся с неудачного чтения - он по-прежнему поврежден
+                raise ValueError(f"файл профилей '{self.path}' поврежден")
+            return copy.deepcopy(self.profiles)
+
+    def save(self, profiles):
+        """Атомарно записывает все профили"""
+        with self.lock:
+            folder = os.path.dirname(os.path.abspath(self.path))
+            if self.corrupt and os.path.exists(self.path):
+                # Поврежденный файл не затираем молча - его еще можно восстановить вручную
+                os.replace(self.path, self.path + '.bak')
+                print(f"\n⚠️ Поврежденный файл профилей сохранен как '{self.path}.bak'")
+            handle, tmp_path = tempfile.mkstemp(dir=folder, prefix='.profiles-', suffix='.tmp')
+            try:
+                with os.fdopen(handle, "w", encoding='utf-8') as file:
+                    json.dump(profiles, file, indent=4, ensure_ascii=False)
+                    file.flush()
+                    os.fsync(file.fileno())
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                with contextlib.suppress(OSError):
+                    os.remove(tmp_path)
+                raise
+            if os.name != 'nt':
+                # Сама замена должна пережить сбой питания - синхронизируем каталог
+                directory = os.open(folder, os.O_RDONLY)
+                try:
+                    os.fsync(directory)
+                finally:
+                    os.close(directory)
+            self.profiles = copy.deepcopy(profiles)
+            self.signature = self.stat()
+            self.corrupt = False
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Несколько изменений - одна запись:
+        with PROFILES.batch() as profiles: profiles['a'] = ...; del profiles['b']
+        Если внутри блока возникло исключение, файл не изменяется.
+        Поврежденный файл читается как пустой набор профилей, а при записи
+        сохраняется рядом с расширением .bak
+        """
+        with self.lock:
+            try:
+                profiles = self.load()
+            except ValueError:
+                profiles = {}
+            yield profiles
+            self.save(profiles)
+
+PROFILES = ProfileStore()
+
+class FileWatcher:
+    """
+    Следит за изменением файла в отдельном потоке и выставляет событие changed
+    Используются уведомления системы (inotify в Linux, ReadDirectoryChangesW в Windows),
+    поэтому без изменений файл не читается; если они недоступны - опрос раз в
+    PROFILE_POLL_INTERVAL секунд. Следим за каталогом: атомарная замена файла меняет его inode
+    """
+
+    def __init__(self, path):
+        self.folder = os.path.dirname(os.path.abspath(path))
+        self.name = os.path.basename(path)
+        self.changed = threading.Event()
+        self.stopping = threading.Event()
+        self.thread = None
+        self.wake = None
+
+    def start(self):
+        self.stopping.clear()
+        self.changed.clear()
+        if sys.platform.startswith('linux'):
+            self.wake = os.pipe()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is None:
+            return
+        self.stopping.set()
+        if self.wake:
+            os.write(self.wake[1], b'x')
+        if os.name == 'nt' and self.thread.is_alive():
+            self.cancel_windows()
+        self.thread.join(PROFILE_POLL_INTERVAL + 1)
+        if self.wake:
+            for fd in self.wake:
+                os.close(fd)
+            self.wake = None
+        self.thread = None
+
+    def run(self):
+        try:
+            if self.wake:
+                self.watch_inotify()
+                return
+            if os.name == 'nt':
+                self.watch_windows()
+                return
+        except (OSError, AttributeError) as e:
+            if self.stopping.is_set():
+                return
+            print(f"\n⚠️ Уведомления об изменении файлов недоступны ({e}), "
+                  f"проверка раз в {PROFILE_POLL_INTERVAL} с")
+        self.watch_polling()
+
+    def watch_inotify(self):
+        import select
+        libc = ctypes.CDLL(None, use_errno=True)
+        fd = libc.inotify_init1(os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        try:
+            if libc.inotify_add_watch(fd, os.fsencode(self.folder), IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE) < 0:
+                raise OSError(ctypes.get_errno(), "inotify_add_watch")
+            name = os.fsencode(self.name)
+            while True:
+                ready = select.select([fd, self.wake[0]], [], [])[0]
+                if self.wake[0] in ready:
+                    return
+                data = os.read(fd, 64 * 1024)
+                offset = 0
+                while offset < len(data):
+                    # struct inotify_event: wd, mask, cookie, len, name[len]
+                    length = struct.unpack_from('iIII', data, offset)[3]
+                    if data[offset + 16:offset + 16 + length].rstrip(b'\0') == name:
+                        self.changed.set()
+                    offset += 16 + length
+        finally:
+            os.close(fd)
+
+    def watch_windows(self):
+        from ctypes import wintypes
+        kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        kernel32.CreateFileW.restype = ctypes.c_void_p
+        kernel32.CreateFileW.argtypes = (wintypes.LPCWSTR, wintypes.DWORD, wintypes.DWORD, ctypes.c_void_p,
+                                         wintypes.DWORD, wintypes.DWORD, ctypes.c_void_p)
+        kernel32.ReadDirectoryChangesW.argtypes = (ctypes.c_void_p, ctypes.c_void_p, wintypes.DWORD, wintypes.BOOL, wintypes.DWORD,
+                                                   ctypes.POINTER(wintypes.DWORD), ctypes.c_void_p, ctypes.c_void_p)
+        kernel32.CloseHandle.argtypes = (ctypes.c_void_p,)
+        handle = kernel32.CreateFileW(self.folder, FILE_LIST_DIRECTORY, FILE_SHARE_ALL, None,
+                                      OPEN_EXISTING, FILE_FLAG_BACKUP_SEMANTICS, None)
+        if handle is None or handle == ctypes.c_void_p(-1).value:
+            raise ctypes.WinError(ctypes.get_last_error())
+        try:
+            buffer = ctypes.create_string_buffer(64 * 1024)
+            returned = wintypes.DWORD()
+            while not self.stopping.is_set():
+                # Синхронный вызов ждет изменений; stop() прерывает его через CancelSynchronousIo
+                if not kernel32.ReadDirectoryChangesW(handle, buffer, len(buffer), False, FILE_NOTIFY_CHANGES,
+                                                      ctypes.byref(returned), None, None):
+                    if self.stopping.is_set():
+                        return
+                    raise ctypes.WinError(ctypes.get_last_error())
+                if not returned.value:
+                    # Буфер переполнен, список изменений потерян - считаем, что файл мог измениться
+                    self.changed.set()
+                    continue
+                data = buffer.raw[:returned.value]
+                offset = 0
+                while True:
+                    # FILE_NOTIFY_INFORMATION: NextEntryOffset, Action, FileNameLength, FileName
+                    next_offset, _, length = struct.unpack_from('<III', data, offset)
+                    if data[offset + 12:offset + 12 + length].decode('utf-16-le').lower() == self.name.lower():
+                        self.changed.set()
+                    if not next_offset:
+                        break
+                    offset += next_offset
+        finally:
+            kernel32.CloseHandle(handle)
+
+    def cancel_windows(self):
+        """Прерывает ожидание ReadDirectoryChangesW в потоке наблюдения"""
+        kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        kernel32.OpenThread.restype = ctypes.c_void_p
+        kernel32.CancelSynchronousIo.argtypes = (ctypes.c_void_p,)
+        kernel32.CloseHandle.argtypes = (ctypes.c_void_p,)
+        thread = kernel32.OpenThread(THREAD_TERMINATE, False, self.thread.native_id)
+        if not thread:
+            return
+        try:
+            # Поток мог еще не войти в вызов - повторяем, пока он не завершится
+            for _ in range(20):
+                kernel32.CancelSynchronousIo(thread)
+                self.thread.join(0.05)
+                if not self.thread.is_alive():
+                    break
+        finally:
+            kernel32.CloseHandle(thread)
+
+    def watch_polling(self):
+        path = os.path.join(self.folder, self.name)
+
+        def signature():
+            try:
+                info = os.stat(path)
+            except FileNotFoundError:
+                return None
+            return (info.st_mtime_ns, info.st_size)
+
+        last = signature()
+        while not self.stopping.wait(PROFILE_POLL_INTERVAL):
+            current = signature()
+            if current != last:
+                last = current
+                self.changed.set()
+
+class ProfileWatcher:
+    """
+    Горячая перезагрузка профиля во время мониторинга
+    overrides - параметры командной строки, которые остаются поверх значений из файла
+    """
+
+    def __init__(self, name, overrides=None, store=PROFILES):
+        self.name = name
+        self.overrides = overrides or {}
+        self.store = store
+        self.files = FileWatcher(store.path)
+        self.changed = self.files.changed
+
+    def start(self):
+        self.files.start()
+
+    def stop(self):
+        self.files.stop()
+
+    def reload(self, profile):
+        """Новый Profile, если настройки профиля в файле изменились, иначе None"""
+        self.changed.clear()
+        try:
+            saved = self.store.load().get(self.name)
+        except ValueError as e:
+            print(f"\n⚠️ Файл профилей не читается ({e}) - мониторинг продолжается с прежними настройками")
+            return None
+        if saved is None:
+            print(f"\n⚠️ Профиль '{self.name}' удален из файла - мониторинг продолжается с прежними настройками")
+            return None
+        try:
+            updated = Profile(dict(saved, **self.overrides), self.name)
+        except ValueError as e:
+            print(f"\n❌ {e} - изменения не применены")
+            return None
+
+        def comparable(settings):
+            return {key: value for key, value in settings.items() if key not in PROFILE_STATE_KEYS}
+
+        if comparable(updated.settings) == comparable(profile.settings):
+            return None
+        return updated
+
+def save_profile(profile_name, settings):
+    """Сохраняет профиль в файл"""
+    try:
+        with PROFILES.batch() as profiles:
+            profiles[profile_name] = settings
+        print(f"\n✅ Профиль '{profile_name}' сохранен в 'profiles.json'.")
+        return True
+    except Exception as e:
+        print(f"\n❌ Ошибка при сохранении профиля: {e}")
+        return False
+
+def update_profile(profile_name, **fields):
+    """Обновляет отдельные поля профиля без вывода сообщений"""
+    try:
+        with PROFILES.lock:
+            profiles = PROFILES.load()
+            if profile_name not in profiles:
+                return False
+            profiles[profile_name].update(fields)
+            PROFILES.save(profiles)
+        return True
+    except Exception as e:
+        print(f"\n⚠️ Ошибка при обновлении профиля: {e}")
+        return False
+
+def load_profiles():
+    """Загружает профили из файла"""
+    try:
+        return PROFILES.load()
+    except Exception as e:
+        print(f"\n❌ Ошибка при загрузке профилей: {e}")
+        return {}
+
+def list_profiles():
+    """Выводит список сохраненных профилей"""
+    try:
+        profiles = load_profiles()
+        if not profiles:
+            print("\n❌ Нет сохраненных профилей.")
+            return None
+        print("\nДоступные профили:")
+        for idx, name in enumerate(profiles.keys(), 1):
+            print(f"{idx}. {name}")
+        return profiles
+    except Exception as e:
+        print(f"\n❌ Ошибка при выводе профилей: {e}")
+        return None
+
+def delete_profile():
+    """Удаляет выбранный профиль"""
+    try:
+        profiles = load_profiles()
+        if not profiles:
+            print("\n❌ Нет сохраненных профилей для удаления.")
+            return
+        
+        print("\nВыберите профиль для удаления:")
+        profile_names = list(profiles.keys())
+        for idx, name in enumerate(profile_names, 1):
+            print(f"{idx}. {name}")
+        
+        while True:
+            try:
+                choice = input("\nВведите номер профиля для удаления (0 - отмена): ")
+                if choice == '0':
+                    return
+                if not choice:
+                    continue
+                    
+                choice = int(choice)
+                if 1 <= choice <= len(profile_names):
+                    profile_to_delete = profile_names[choice - 1]
+                    confirm = input(f"\nВы уверены, что хотите удалить профиль '{profile_to_delete}'? (y/n): ").lower()
+                    if confirm == 'y':
+                        del profiles[profile_to_delete]
+                        PROFILES.save(profiles)
+                        print(f"\n✅ Профиль '{profile_to_delete}' успешно удален.")
+                        return
+                    else:
+                        print("\n❌ Удаление отменено.")
+                        return
+                else:
+                    print("❌ Неверный номер профиля. Попробуйте снова.")
+            except ValueError:
+                print("❌ Введите число. Попробуйте снова.")
+    except Exception as e:
+        print(f"\n❌ Ошибка при удалении профиля: {e}")
+
+def move_profile():
+    """Изменяет порядок профилей"""
+    try:
+        profiles = load_profiles()
+        if not profiles:
+            print("\n❌ Нет сохраненных профилей для перемещения.")
+            return
+        
+        profile_names = list(profiles.keys())
+        print("\nТекущий порядок профилей:")
+        for idx, name in enumerate(profile_names, 1):
+            print(f"{idx}. {name}")
+        
+        while True:
+            try:
+                choice = input("\nВведите номер профиля для перемещения (0 - отмена): ")
+                if choice == '0':
+                    return
+                if not choice:
+                    continue
+                    
+                choice = int(choice)
+                if 1 <= choice <= len(profile_names):
+                    profile_to_move = profile_names[choice - 1]
+                    new_position = input(f"Введите новую позицию для профиля '{profile_to_move}' (1-{len(profile_names)}): ")
+                    
+                    if not new_position:
+                        continue
+                        
+                    new_position = int(new_position)
+                    if 1 <= new_position <= len(profile_names):
+                        if choice == new_position:
+                            print("\n❌ Профиль уже находится на этой позиции.")
+                            continue
+                            
+                        new_profiles = {}
+                        keys = list(profiles.keys())
+                        keys.remove(profile_to_move)
+                        keys.insert(new_position - 1, profile_to_move)
+                        
+                        for key in keys:
+                            new_profiles[key] = profiles[key]
+                            
+                        PROFILES.save(new_profiles)
+
+                        print("\n✅ Порядок профилей успешно изменен.")
+                        return
+                    else:
+                        print(f"❌ Позиция должна быть от 1 до {len(profile_names)}.")
+                else:
+                    print("❌ Неверный номер профиля. Попробуйте снова.")
+            except ValueError:
+                print("❌ Введите число. Попробуйте снова.")
+    except Exception as e:
+        print(f"\n❌ Ошибка при перемещении профиля: {e}")
+
+def edit_profile(profile_name):
+    """Редактирует выбранный профиль"""
+    try:
+        profiles = load_profiles()
+        if profile_name not in profiles:
+            print("\n❌ Профиль не найден.")
+            return False
+            
+        settings = profiles[profile_name]
+        new_settings = settings.copy()
+        
+        print(f"\nРедактирование профиля: {profile_name}")
+        print("Нажмите Enter, чтобы оставить текущее значение\n")
+        
+        print(f"Текущий интерфейс: {settings['interface']}")
+        print("1. Выбрать новый интерфейс")
+        print("2. Оставить текущий")
+        interface_choice = input("Выберите вариант (1/2): ")
+        if interface_choice == "1":
+            new_interface = get_interface()
+            if new_interface:
+                new_settings['interface'] = new_interface
+        
+        current_type = 'Upload (u)' if settings['traffic_type'] == 'u' else 'Download (d)'
+        print(f"\nТекущий тип трафика: {current_type}")
+        new_type = input("Введите новый тип трафика (u/d) или Enter чтобы оставить текущий: ").lower()
+        if new_type in ['u', 'd']:
+            new_settings['traffic_type'] = new_type
+        
+        print(f"\nТекущее количество допустимых пропусков: {settings['allowed_failures']}")
+        new_failures = input("Введите новое количество или Enter чтобы оставить текущее: ")
+        if new_failures:
+            try:
+                new_settings['allowed_failures'] = int(new_failures)
+            except ValueError:
+                print("❌ Неверный формат числа. Оставлено текущее значение.")
+        
+        current_threshold = settings['threshold'] / 1024**2
+        print(f"\nТекущая пороговая скорость: {current_threshold:.2f} МБ/с")
+        new_threshold = input("Введите новую пороговую скорость (МБ/с) или Enter чтобы оставить текущую: ")
+        if new_threshold:
+            try:
+                new_settings['threshold'] = float(new_threshold) * 1024**2
+            except ValueError:
+                print("❌ Неверный формат числа. Оставлено текущее значение.")
+        
+        print(f"\nТекущий интервал проверки: {settings['interval']} сек")
+        new_interval = input("Введите новый интервал (сек) или Enter чтобы оставить текущий: ")
+        if new_interval:
+            try:
+                new_settings['interval'] = int(new_interval)
+            except ValueError:
+                print("❌ Неверный формат числа. Оставлено текущее значение.")
+        
+        current_delay = settings['shutdown_delay']
+        print(f"\nТекущая задержка до выключения: {format_time(current_delay)}")
+        new_delay = input("Введите новую задержку (например, 1h30m15s) или Enter чтобы оставить текущую: ")
+        if new_delay:
+            try:
+                parsed_seconds = parse_time_input(new_delay)
+                if parsed_seconds > 0:
+                    new_settings['shutdown_delay'] = parsed_seconds
+                else:
+                    print("❌ Некорректный формат времени. Оставлено текущее значение.")
+            except ValueError:
+                print("❌ Неверный формат времени. Оставлено текущее значение.")
+        
+        action_modes = {
+            's': 'Выключение',
+            'r': 'Перезагрузка',
+            'h': 'Спящий режим',
+            'b': 'Звуковой сигнал'
+        }
+        current_mode = settings.get('action_mode', 's')
+        print(f"\nТекущий режим действия: {action_modes.get(current_mode, 'Выключение')}")
+        print("Доступные режимы:")
+        print("s - Выключение компьютера")
+        print("r - Перезагрузка компьютера")
+        print("h - Спящий режим")
+        print("b - Звуковой сигнал")
+        new_mode = input("Введите новый режим действия (s/r/h/b) или Enter чтобы оставить текущий: ").lower()
+        if new_mode in ['s', 'r', 'h', 'b']:
+            new_settings['action_mode'] = new_mode
+        
+        # Новая опция: мониторинг активности дисков
+        current_disk_monitoring = settings.get('monitor_disk', False)
+        print(f"\nТекущая настройка мониторинга дисков: {'Включен' if current_disk_monitoring else 'Отключен'}")
+        disk_monitoring = input("Включить мониторинг активности дисков? (y/n) или Enter чтобы оставить текущее: ").lower()
+        if disk_monitoring == 'y':
+            new_settings['monitor_disk'] = True
+        elif disk_monitoring == 'n':
+            new_settings['monitor_disk'] = False
+        
+        ask_trigger_settings(new_settings)
+        try:
+            Profile(new_settings, profile_name)
+        except ValueError as e:
+            print(f"\n❌ {e}")
+            print("❌ Изменения не сохранены.")
+            return False
+        
+        print("\nИзмененные настройки:")
+        print(f"Интерфейс: {settings['interface']} → {new_settings['interface']}")
+        print(f"Тип трафика: {settings['traffic_type']} → {new_settings['traffic_type']}")
+        print(f"Допустимые пропуски: {settings['allowed_failures']} → {new_settings['allowed_failures']}")
+        print(f"Пороговая скорость: {settings['threshold']/1024**2:.2f} → {new_settings['threshold']/1024**2:.2f} МБ/с")
+        print(f"Интервал проверки: {settings['interval']} → {new_settings['interval']} сек")
+        print(f"Задержка до выключения: {format_time(settings['shutdown_delay'])} → {format_time(new_settings['shutdown_delay'])}")
+        print(f"Режим действия: {action_modes.get(settings.get('action_mode', 's'))} → {action_modes.get(new_settings.get('action_mode', 's'))}")
+        print(f"Мониторинг дисков: {'Включен' if settings.get('monitor_disk', False) else 'Отключен'} → {'Включен' if new_settings.get('monitor_disk', False) else 'Отключен'}")
+        print(f"Режим срабатывания: {TRIGGER_MODES[settings.get('trigger_mode', 't')]} → {TRIGGER_MODES[new_settings.get('trigger_mode', 't')]}")
+        
+        save = input("\nСохранить изменения? (y/n): ").lower()
+        if save == 'y':
+            return save_profile(profile_name, new_settings)
+        else:
+            print("❌ Изменения не сохранены.")
+            return False
+            
+    except Exception as e:
+        print(f"\n❌ Ошибка при редактировании профиля: {e}")
+        return False
+
+def execute_action(action_mode):
+    """
+    Выполняет выбранное действие без вывода в консоль
+    Возвращает время (сек) от решения до возврата из системного вызова
+    """
+    started = time.perf_counter()
+    if action_mode == 's':  # Выключение
+        BACKEND.shutdown()
+    elif action_mode == 'r':  # Перезагрузка
+        BACKEND.reboot()
+    elif action_mode == 'h':  # Спящий режим
+        BACKEND.hibernate()
+    elif action_mode == 'b':  # Звуковой сигнал
+        for _ in range(3):  # 3 повторения сигнала
+            BACKEND.beep()
+            time.sleep(0.3)
+    else:
+        raise ValueError(f"неизвестный режим действия '{action_mode}'")
+    return time.perf_counter() - started
+
+def perform_action(action_mode):
+    """
+    Выполняет выбранное действие
+    Возвращает время (сек) от решения до возврата из системного вызова или None при ошибке
+    """
+    try:
+        latency = execute_action(action_mode)
+    except Exception as e:
+        print(f"❌ Ошибка при выполнении действия: {e}")
+        return None
+    if action_mode != 'b':
+        print(f"\n⏱️ Действие передано системе за {latency*1000:.1f} мс")
+    return latency
+
+def check_hook(hook):
+    """
+    Проверяет подготовительную команду профиля (элемент hooks)
+    Возвращает (имя, тайм-аут в секундах); ошибки - ValueError
+    """
+    if not isinstance(hook, dict):
+        raise ValueError("должна быть объектом")
+    command, target = hook.get('command'), hook.get('python')
+    if bool(command) == bool(target):
+        raise ValueError("нужен один из ключей command или python")
+    if command and not isinstance(command, str):
+        raise ValueError("command должен быть строкой")
+    if target:
+        module_name, _, function_name = target.partition(':') if isinstance(target, str) else ('', '', '')
+        if not all(part.isidentifier() for part in module_name.split('.')) or \
+                not (function_name or 'main').isidentifier():
+            raise ValueError(f"python должен иметь вид модуль:функция, а не {target!r}")
+    timeout = _parse_duration(hook.get('timeout', HOOK_TIMEOUT))
+    if timeout <= 0:
+        raise ValueError("тайм-аут должен быть больше 0")
+    name = hook.get('name') or command or target
+    return str(name), timeout
+
+class HookRunner:
+    """
+    Подготовительные команды профиля (ключ hooks), которые запускаются в начале
+    обратного отсчета и выполняются параллельно, каждая со своим тайм-аутом:
+    {"name": "торрент", "command": "qbittorrent-nox --shutdown", "timeout": "30s"}
+    или {"python": "модуль:функция", "timeout": "10s"} - функция получает режим действия
+    """
+
+    def __init__(self, hooks, action_mode, recorder=None, report=None):
+        self.action_mode = action_mode
+        self.recorder = recorder
+        self.report = report or (lambda line: print(f"\n{line}"))
+        self.results = {}
+        self.processes = {}
+        self.lock = threading.Lock()
+        self.threads = []
+        self.started = None
+        self.hooks = []
+        for number, hook in enumerate(hooks or (), 1):
+            try:
+                name, timeout = check_hook(hook)
+                self.hooks.append((name, hook, timeout))
+            except ValueError as e:
+                self.report(f"❌ Подготовительная команда №{number} пропущена: {e}")
+
+    def start(self):
+        """Запускает все команды в отдельных потоках"""
+        self.started = time.monotonic()
+        for name, hook, timeout in self.hooks:
+            thread = threading.Thread(target=self.run_hook, args=(name, hook, timeout), daemon=True)
+            thread.start()
+            self.threads.append((name, thread))
+
+    def finish(self, name, status, detail=""):
+        elapsed = time.monotonic() - self.started
+        with self.lock:
+            if name in self.results:
+                return
+            self.results[name] = status
+        line = f"🪝 {name}: {status} за {elapsed:.1f} с{f' ({detail})' if detail else ''}"
+        self.report(line)
+        if self.recorder:
+            self.recorder.event(line)
+
+    def run_hook(self, name, hook, timeout):
+        try:
+            if hook.get('command'):
+                import subprocess
+                process = subprocess.Popen(hook['command'], shell=True, stdin=subprocess.DEVNULL,
+                                           stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                           encoding='utf-8', errors='replace')
+                with self.lock:
+                    self.processes[name] = process
+                try:
+                    output, _ = process.communicate(timeout=timeout)
+                except subprocess.TimeoutExpired:
+                    self.kill(name)
+                    self.finish(name, "тайм-аут")
+                    return
+                last_line = output.strip().splitlines()[-1] if output.strip() else ""
+                status = "готово" if process.returncode == 0 else f"ошибка (код {process.returncode})"
+                self.finish(name, status, last_line[:100])
+            else:
+                module_name, _, function_name = hook['python'].partition(':')
+                function = getattr(importlib.import_module(module_name), function_name or 'main')
+                # Функцию нельзя прервать, поэтому тайм-аут соблюдается ожиданием в отдельном потоке
+                worker = threading.Thread(target=self.call, args=(name, function), daemon=True)
+                worker.start()
+                worker.join(timeout)
+                if worker.is_alive():
+                    self.finish(name, "тайм-аут")
+        except Exception as e:
+            self.finish(name, "ошибка", str(e))
+
+    def call(self, name, function):
+        try:
+            function(self.action_mode)
+            self.finish(name, "готово")
+        except Exception as e:
+            self.finish(name, "ошибка", str(e))
+
+    def kill(self, name):
+        """Завершает процесс команды вместе с дочерними процессами"""
+        with self.lock:
+            process = self.processes.get(name)
+        if process is None or process.poll() is not None:
+            return
+        try:
+            for child in psutil.Process(process.pid).children(recursive=True):
+                child.kill()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+        process.kill()
+
+    def wait(self, deadline):
+        """Ждет завершения команд, но не дольше deadline секунд от начала отсчета"""
+        for name, thread in self.threads:
+            thread.join(max(self.started + deadline - time.monotonic(), 0))
+        for name, thread in self.threads:
+            if thread.is_alive():
+                self.kill(name)
+                self.finish(name, "прервано по общему сроку")
+
+    def cancel(self):
+        """Действие отменено: незавершенные команды останавливаются"""
+        for name, _ in self.threads:
+            self.kill(name)
+
+def countdown_action(seconds, shutdown_event, action_mode='s', recorder=None, clock=None, action=None,
+                     hooks=None, hooks_deadline=HOOKS_DEADLINE):
+    """
+    Обратный отсчет перед выполнением действия
+    hooks - подготовительные команды профиля: запускаются сразу, действие выполняется
+    после их завершения, но не позже hooks_deadline секунд от начала отсчета
+    """
+    runner = HookRunner(hooks, action_mode, recorder) if hooks else None
+    if runner:
+        hooks_deadline = _parse_duration(hooks_deadline)
+        runner.start()
+    try:
+        action_name = ACTION_NAMES.get(action_mode, 'выключение')
+        
+        for i in range(seconds, 0, -1):
+            if shutdown_event.is_set():
+                return
+            print(f"\r{action_name.capitalize()} через {format_time(i)}. [ESC - отмена]".ljust(80), end='', flush=True)
+            (clock or SYSTEM_CLOCK).sleep(1)
+        if runner and not shutdown_event.is_set():
+            print(f"\n⏳ Ожидание подготовительных команд (не дольше {format_time(int(hooks_deadline))} от начала отсчета)...")
+            runner.wait(hooks_deadline)
+        if not shutdown_event.is_set():
+            if recorder:
+                recorder.event(f"perform_action {action_mode}")
+                recorder.dump('action')
+            (action or perform_action)(action_mode)
+            if action_mode == 'b':
+                return
+    except Exception:
+        pass
+    finally:
+        if runner and shutdown_event.is_set():
+            runner.cancel()
+
+def check_user_input(shutdown_event, monitoring_event=None, pause_event=None, recorder=None, wake_event=None):
+    """Обработка пользовательского ввода; wake_event прерывает ожидание следующего замера"""
+    try:
+        while not shutdown_event.is_set():
+            if BACKEND.key_pressed():
+                key = BACKEND.read_key()
+                if recorder:
+                    recorder.event(f"key {key!r}")
+                if key == b'\x1b':  # ESC
+                    shutdown_event.set()
+                    if monitoring_event:
+                        monitoring_event.set()
+                    if wake_event:
+                        wake_event.set()
+                    BACKEND.cancel_shutdown()
+                    print("\n🚨 Действие отменено! Нажмите Enter для возврата в меню...")
+                    return
+                elif key == b'\x13' and monitoring_event and pause_event:  # Ctrl+S
+                    if pause_event.is_set():
+                        pause_event.clear()
+                        print("\n▶️ Мониторинг продолжен (нажмите Ctrl+S для паузы)")
+                    else:
+                        pause_event.set()
+                        print("\n⏸️ Мониторинг приостановлен (нажмите любую клавишу для продолжения)")
+                elif key == b'\x04':  # Ctrl+D - выключение дисплея
+                    turn_off_display()
+    except Exception:
+        pass
+
+class MonitorReporter:
+    """
+    Окружение цикла мониторинга (MonitorLoop): ожидание, пауза, вывод и обратный отсчет
+    Методы по умолчанию ничего не делают; их переопределяют ConsoleReporter
+    (monitor_traffic) и Monitor
+    """
+
+    def open(self):
+        """Подготовка перед началом мониторинга (monitor_traffic с persist=True)"""
+
+    def close(self):
+        """Завершение мониторинга"""
+
+    def sleep(self, seconds):
+        """Ожидание следующего замера; True - ожидание прервано"""
+        return False
+
+    def is_stopped(self):
+        return False
+
+    def is_paused(self):
+        return False
+
+    def wait_resume(self):
+        """Ожидание во время паузы; может вернуться и до ее окончания"""
+
+    def take_update(self):
+        """Измененный профиль и откуда он получен: (Profile, источник) или None"""
+        return None
+
+    def take_action(self):
+        """Режим действия, запрошенного без ожидания пропусков, или None"""
+        return None
+
+    def report(self, text):
+        """Сообщение триггера или проверки дисков"""
+
+    def profile_changed(self, profile, source, kept):
+        """Профиль применен на ходу; kept - счетчик пропусков сохранен"""
+
+    def disk_checked(self, active, now=None, sample=None):
+        """Проверка дисков; при активности передаются время и счетчики (rx, tx) новой точки отсчета"""
+
+    def sampled(self, now, sample, speed, failures, required, status, disk_active):
+        """Замер скорости и решение триггера"""
+
+    def countdown(self, action_mode, delay):
+        """Обратный отсчет и действие; True - действие выполнено"""
+        return False
+
+    def failed(self, error):
+        """Ошибка замера: цикл продолжится через 5 секунд"""
+
+class MonitorLoop:
+    """
+    Цикл принятия решений мониторинга, общий для monitor_traffic и Monitor:
+    замеры скорости, триггер, счетчик пропусков, активность дисков и изменения профиля.
+    Ожидание, вывод и обратный отсчет выполняет reporter (MonitorReporter)
+    """
+
+    def __init__(self, profile, reporter, counters=None, clock=None, action=None):
+        self.profile = profile
+        self.reporter = reporter
+        self.counters = counters or profile.make_counters()
+        self.clock = clock or SYSTEM_CLOCK
+        self.action = action or perform_action
+        self.trigger = None
+        self.failure_count = 0
+        self.old_bytes = self.last_sample = None
+        self.action_mode = None
+
+    @property
+    def required(self):
+        """Сколько пропусков подряд запускают действие"""
+        return 1 if self.trigger.decisive else self.profile.allowed_failures
+
+    def baseline(self):
+        """Новая точка отсчета скорости: время паузы или смены счетчиков не учитывается"""
+        self.old_bytes = self.counters.read()[self.profile.counter_index]
+        self.last_sample = self.clock.time()
+
+    def restart(self, trigger=None):
+        """Начинает отсчет заново с новым триггером (при запуске и после отмены действия)"""
+        self.baseline()
+        self.new_trigger(trigger)
+
+    def new_trigger(self, trigger=None):
+        self.trigger = trigger or self.profile.make_trigger()
+        self.trigger.bind(self.action, self.reporter.report)
+        self.trigger.start(self.last_sample, self.old_bytes)
+        self.failure_count = 0
+
+    def apply(self, updated, source):
+        """
+        Профиль изменен на ходу: история триггера и счетчик пропусков сохраняются,
+        если новые настройки с ними совместимы
+        """
+        profile = self.profile
+        same_source = (updated.interfaces, updated.traffic_type) == (profile.interfaces, profile.traffic_type)
+        same_trigger = updated.trigger_mode == profile.trigger_mode
+        self.profile = updated
+        if not same_source:
+            self.counters = updated.make_counters()
+            self.baseline()
+        kept = same_source and same_trigger and self.trigger.reconfigure(updated.settings)
+        if not kept:
+            self.new_trigger()
+        self.reporter.profile_changed(updated, source, kept)
+
+    def run(self):
+        """
+        Замеры до действия или остановки (перед первым вызовом нужен restart):
+        'action' - действие выполнено (режим в action_mode), 'cancelled' - обратный
+        отсчет отменен, 'stopped' - мониторинг остановлен
+        """
+        reporter = self.reporter
+        while not reporter.is_stopped():
+            try:
+                if reporter.is_paused():
+                    reporter.wait_resume()
+                    if not reporter.is_paused():
+                        self.baseline()
+                    continue
+                reporter.sleep(self.trigger.next_interval(self.profile.interval))
+                if reporter.is_stopped():
+                    break
+                if reporter.is_paused():
+                    continue
+                outcome = self.step()
+                if outcome:
+                    return outcome
+            except TraceFinished:
+                raise
+            except Exception as e:
+                reporter.failed(e)
+                reporter.sleep(5)
+        return 'stopped'
+
+    def step(self):
+        """Один замер; возвращает исход run, если дело дошло до обратного отсчета"""
+        reporter = self.reporter
+        update = reporter.take_update()
+        if update:
+            self.apply(*update)
+        forced = reporter.take_action()
+        profile = self.profile
+        index = profile.counter_index
+
+        # Проверяем активность дисков, если включена опция; при скорости намного выше
+        # порога триггер может отложить проверку до замера, который окажется пропуском
+        check_disk = profile.monitor_disk and not forced
+        deferred = check_disk and self.trigger.defer_checks(self.clock.time())
+        disk_active = check_disk_activity(report=reporter.report) if check_disk and not deferred else None
+        if disk_active:
+            self.failure_count = 0
+            sample = self.counters.read()
+            self.old_bytes, self.last_sample = sample[index], self.clock.time()
+            reporter.disk_checked(True, self.last_sample, sample)
+            return None
+        if check_disk and not deferred:
+            reporter.disk_checked(disk_active)
+
+        # Проверяем сетевую активность
+        sample = self.counters.read()
+        new_bytes = sample[index]
+        now = self.clock.time()
+        speed = (new_bytes - self.old_bytes) / max(now - self.last_sample, 0.001)
+        self.old_bytes, self.last_sample = new_bytes, now
+        failed = self.trigger.update(speed, now, new_bytes)
+        if failed and deferred:
+            # Отложенная проверка: при активности дисков этот пропуск не засчитывается
+            disk_active = check_disk_activity(report=reporter.report)
+            reporter.disk_checked(disk_active, now, sample)
+            if disk_active:
+                self.failure_count = 0
+                return None
+        self.failure_count = self.failure_count + 1 if failed else 0
+        required = self.required
+        if forced:
+            self.failure_count = required
+        reporter.sampled(now, sample, speed, self.failure_count, required, self.trigger.status(), disk_active)
+        if self.failure_count < required:
+            return None
+
+        action_mode = forced or self.trigger.action_mode or profile.action_mode
+        delay = profile.shutdown_delay if forced or self.trigger.countdown is None else self.trigger.countdown
+        if reporter.countdown(action_mode, delay):
+            self.action_mode = action_mode
+            return 'action'
+        return 'cancelled'
+
+class ConsoleReporter(MonitorReporter):
+    """
+    Окружение monitor_traffic: вывод в консоль, клавиши, история, журнал замеров,
+    бортовой самописец, отслеживание файла профиля и локальное управление
+    """
+
+    def __init__(self, profile, clock, action=None, interactive=True, watcher=None, control=None):
+        self.clock = clock
+        self.action = action
+        self.interactive = interactive
+        self.watcher = watcher
+        self.control = control
+        self.history = self.journal = self.recorder = None
+        self.last_history_save = clock.time()
+        self.shutdown_event = threading.Event()
+        self.monitoring_event = threading.Event()
+        self.pause_event = threading.Event()
+        self.wake_event = threading.Event()
+        self.hints = " [ESC - стоп | Ctrl+S - пауза | Ctrl+D - выкл. дисплей]" if interactive else ""
+        self.use(profile)
+
+    def use(self, profile):
+        self.profile = profile
+        self.journal_tag = journal_tag(profile.interfaces)
+        # Строка замера собирается один раз: в цикле подставляются только числа
+        self.sample_line = profile.direction + ": {:.2f} МБ/с{}" + self.hints
+
+    def open(self):
+        """История, журнал замеров и бортовой самописец (monitor_traffic с persist=True)"""
+        profile = self.profile
+        self.history = HistoryStore.load()
+        try:
+            self.journal = MetricsJournal()
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Журнал замеров недоступен: {e}")
+        self.recorder = FlightRecorder(profile.interval, {
+            'interface': profile.interfaces[0],
+            'traffic_type': profile.traffic_type,
+            'allowed_failures': profile.allowed_failures,
+            'threshold': profile.threshold,
+            'interval': profile.interval,
+            'shutdown_delay': profile.shutdown_delay,
+            'action_mode': profile.action_mode,
+            'monitor_disk': profile.monitor_disk
+        })
+        self.recorder.event("monitoring started")
+
+    def close(self):
+        if self.history:
+            try:
+                self.history.save()
+            except OSError as e:
+                print(f"⚠️ Не удалось сохранить историю: {e}")
+        if self.journal:
+            self.journal.close()
+
+    def sleep(self, seconds):
+        if self.clock.wait(self.wake_event, seconds):
+            self.wake_event.clear()
+            return True
+        return False
+
+    def is_stopped(self):
+        return self.monitoring_event.is_set()
+
+    def is_paused(self):
+        return self.pause_event.is_set()
+
+    def wait_resume(self):
+        if self.interactive and BACKEND.key_pressed():
+            BACKEND.read_key()
+            self.pause_event.clear()
+            print("▶️ Мониторинг продолжен (нажмите Ctrl+S для паузы)")
+        else:
+            self.clock.sleep(0.1)
+        if not self.pause_event.is_set():
+            # Пробуждение от команды resume уже не нужно: замер будет через полный интервал
+            self.wake_event.clear()
+
+    def take_update(self):
+        # Профиль изменен в файле или командой управления
+        watcher, control = self.watcher, self.control
+        update = None
+        if watcher and watcher.changed.is_set():
+            updated = watcher.reload(self.profile)
+            if updated:
+                update = updated, "из файла"
+        if control:
+            requested = control.take_update()
+            if requested:
+                update = requested, "по команде управления"
+                if watcher:
+                    watcher.name = requested.name
+        return update
+
+    def take_action(self):
+        return self.control.take_action() if self.control else None
+
+    def report(self, text):
+        print(text)
+
+    def profile_changed(self, profile, source, kept):
+        self.use(profile)
+        if self.control:
+            self.control.profile = profile
+        if self.recorder:
+            self.recorder.event("profile reloaded")
+        print(f"🔁 Профиль{f' {profile.name!r}' if profile.name else ''} обновлен {source}"
+              f"{'' if kept else ' (счетчик пропусков сброшен)'}")
+
+    def disk_checked(self, active, now=None, sample=None):
+        if self.recorder:
+            self.recorder.record('disk', active)
+        if active:
+            print("💾 Обнаружена активность дисков - сброс счетчика пропусков")
+            if self.journal:
+                self.journal.append(now, self.journal_tag, *sample, True, 0)
+
+    def sampled(self, now, sample, speed, failures, required, status, disk_active):
+        if self.history:
+            self.history.add(now, speed)
+            if now - self.last_history_save >= HISTORY_SAVE_INTERVAL:
+                self.history.save()
+                self.last_history_save = now
+        print(self.sample_line.format(speed / 1024**2, status))
+        if self.control:
+            self.control.publish(speed=speed, failures=failures, required=required, trigger=status.lstrip(' |'))
+        if self.recorder:
+            self.recorder.record('sample', *sample, speed, failures)
+        if self.journal:
+            self.journal.append(now, self.journal_tag, *sample, disk_active, failures)
+        if failures:
+            print(f"⚠️ Пропусков до {self.profile.action_name}: {required - failures}")
+
+    def countdown(self, action_mode, delay):
+        profile, recorder, control = self.profile, self.recorder, self.control
+        print(f"🔴 Критическое падение скорости! Инициируется {ACTION_NAMES[action_mode]}...")
+        if self.journal:
+            self.journal.flush()
+        if recorder:
+            recorder.event(f"countdown started ({delay} s)")
+        countdown_thread = threading.Thread(target=countdown_action, args=(delay, self.shutdown_event, action_mode, recorder, self.clock,
+                                                                           self.action, profile.hooks, profile.hooks_deadline))
+        if control:
+            control.publish(countdown_until=time.time() + delay, action_mode=action_mode)
+        countdown_thread.start()
+        countdown_thread.join()
+        if control:
+            control.publish(countdown_until=None)
+        if self.shutdown_event.is_set():
+            if recorder:
+                recorder.event("countdown cancelled")
+                recorder.dump('cancel')
+            print("\n🔄 Перезапуск мониторинга...")
+            return False
+        return True
+
+    def failed(self, error):
+        print(f"\n⚠️ Ошибка мониторинга: {error}")
+
+class SilentReporter(MonitorReporter):
+    """
+    Окружение цикла без вывода на экран (воспроизведение трасс): ожидание и обратный
+    отсчет идут по часам clock, после отсчета выполняется action
+    """
+
+    def __init__(self, clock, action):
+        self.clock = clock
+        self.action = action
+
+    def sleep(self, seconds):
+        self.clock.sleep(seconds)
+        return False
+
+    def countdown(self, action_mode, delay):
+        self.clock.sleep(delay)
+        self.action(action_mode)
+        return True
+
+def monitor_traffic(profile, counters=None, clock=None, action=None, interactive=True, persist=True, trigger=None,
+                    watcher=None, control=None, reporter=None):
+    """
+    Основная функция мониторинга
+    profile - проверенный профиль (Profile).
+    counters, clock и action позволяют подменить источник счетчиков, часы и
+    выполнение действия (используется при воспроизведении трасс).
+    interactive=False - без обработки клавиатуры, persist=False - без записи истории,
+    журнала и бортового самописца. trigger - правило, определяющее пропуск
+    (по умолчанию создается по профилю). watcher - ProfileWatcher: изменения профиля
+    в файле применяются на ходу. control - ControlServer: команды локального управления
+    (если адрес еще не открыт, он открывается здесь). reporter - свое окружение цикла
+    (MonitorReporter) вместо вывода в консоль, например SilentReporter
+    """
+    clock = clock or SYSTEM_CLOCK
+    reporter = reporter or ConsoleReporter(profile, clock, action, interactive, watcher, control)
+    if persist:
+        reporter.open()
+    if watcher:
+        watcher.start()
+    try:
+        loop = MonitorLoop(profile, reporter, counters, clock, action)
+        loop.restart(trigger)
+        if control:
+            control.attach(profile, reporter.shutdown_event, reporter.pause_event, reporter.wake_event)
+            # Адрес управления открывается после первого чтения счетчиков:
+            # начало мониторинга не ждет загрузки multiprocessing
+            control.start()
+        
+        if interactive:
+            BACKEND.enable_keys()
+            input_thread = threading.Thread(target=check_user_input, args=(reporter.shutdown_event, reporter.monitoring_event,
+                                                                          reporter.pause_event, reporter.recorder, reporter.wake_event))
+            input_thread.daemon = True
+            input_thread.start()
+            print("\nℹ️ Управление мониторингом:")
+            print("ESC - остановить мониторинг и вернуться в меню")
+            print("Ctrl+S - приостановить/возобновить мониторинг")
+            print("Ctrl+D - выключить дисплей")
+
+        try:
+            outcome = loop.run()
+        except (KeyboardInterrupt, SystemExit, TraceFinished):
+            if not interactive:
+                raise
+            print("\n🛑 Мониторинг остановлен пользователем.")
+            return True
+        if outcome == 'stopped':
+            reporter.report("\n🛑 Мониторинг остановлен по запросу пользователя.")
+        elif outcome == 'action' and loop.action_mode == 'b':
+            reporter.report("\n🔊 Звуковой сигнал выполнен." + (" Возврат в меню..." if interactive else ""))
+        return outcome != 'action' or loop.action_mode == 'b'
+                
+    except TraceFinished:
+        raise
+    except Exception as e:
+        print(f"\n❌ Критическая ошибка мониторинга: {e}")
+        return True
+    finally:
+        if watcher:
+            watcher.stop()
+        if control:
+            control.detach()
+        if interactive:
+            BACKEND.disable_keys()
+        reporter.close()
+
+MonitorEvent = namedtuple('MonitorEvent', 'kind time data')
+
+class Action:
+    """
+    Действие при срабатывании для Monitor: вызывается с режимом действия (s/r/h/b)
+    callback - своя функция вместо действия питания, например уведомление в окне программы
+    """
+
+    def __init__(self, callback=None):
+        self.callback = callback
+
+    def __call__(self, action_mode):
+        if self.callback:
+            return self.callback(action_mode)
+        return execute_action(action_mode)
+
+class Monitor(MonitorReporter):
+    """
+    Мониторинг для встраивания в другие программы на Python
+    Работает в фоновом потоке без вывода в консоль и чтения клавиатуры и сообщает
+    о ходе работы событиями MonitorEvent(kind, time, data), где kind - started, sample,
+    countdown, cancelled, action, paused, resumed, message, error или stopped (последнее).
+    События получают обработчики (on_event, subscribe) и асинхронный итератор:
+
+        monitor = Monitor(Profile({'interface': 'eth0', 'threshold': 100 * 1024}),
+                          action=Action(lambda mode: print('готово')))
+        async for event in monitor:
+            ...
+
+    Обработчики вызываются в потоке мониторинга и не должны надолго его задерживать
+    """
+
+    def __init__(self, profile, counters=None, action=None, clock=None, on_event=None):
+        self.profile = profile if isinstance(profile, Profile) else Profile(profile)
+        self.counters = counters
+        self.action = action or Action()
+        self.clock = clock or SYSTEM_CLOCK
+        self.callbacks = [on_event] if on_event else []
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stopping = threading.Event()
+        self.cancelling = threading.Event()
+        self.paused = threading.Event()
+        self.interrupt = threading.Event()
+        self.counting = False
+        self.result = None
+
+    def subscribe(self, callback):
+        with self.lock:
+            self.callbacks.append(callback)
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            if callback in self.callbacks:
+                self.callbacks.remove(callback)
+
+    def emit(self, kind, **data):
+        event = MonitorEvent(kind, self.clock.time(), data)
+        with self.lock:
+            callbacks = list(self.callbacks)
+        for callback in callbacks:
+            try:
+                callback(event)
+            except Exception:
+                # Ошибка в обработчике программы-хозяина не должна останавливать мониторинг
+                pass
+
+    def report(self, text):
+        self.emit('message', text=text.strip())
+
+    def start(self):
+        """Запускает мониторинг в фоновом потоке"""
+        if self.is_running():
+            raise RuntimeError("мониторинг уже запущен")
+        for event in (self.stopping, self.cancelling, self.paused, self.interrupt):
+            event.clear()
+        self.result = None
+        self.thread = threading.Thread(target=self.run, name="network-switch-monitor", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Останавливает мониторинг (и обратный отсчет) и ждет завершения потока"""
+        self.stopping.set()
+        self.interrupt.set()
+        self.wait(timeout)
+
+    def wait(self, timeout=None):
+        """Ждет окончания мониторинга; возвращает режим выполненного действия или None"""
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+        return self.result
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def pause(self):
+        if not self.paused.is_set():
+            self.paused.set()
+            self.emit('paused')
+
+    def resume(self):
+        if self.paused.is_set():
+            self.paused.clear()
+            self.interrupt.set()
+            self.emit('resumed')
+
+    def cancel(self):
+        """Отменяет идущий обратный отсчет; мониторинг продолжается"""
+        if self.counting:
+            self.cancelling.set()
+            self.interrupt.set()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def __aiter__(self):
+        return self.events()
+
+    async def events(self):
+        """Асинхронный итератор событий до события stopped включительно"""
+        import asyncio
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+
+        def forward(event):
+            loop.call_soon_threadsafe(queue.put_nowait, event)
+
+        self.subscribe(forward)
+        try:
+            if not self.is_running():
+                self.start()
+            while True:
+                event = await queue.get()
+                yield event
+                if event.kind == 'stopped':
+                    return
+        finally:
+            self.unsubscribe(forward)
+
+    def sleep(self, seconds):
+        """Ожидание, которое прерывают stop(), resume() и cancel(); True - прервано"""
+        interrupted = self.clock.wait(self.interrupt, seconds)
+        self.interrupt.clear()
+        return interrupted
+
+    def is_stopped(self):
+        return self.stopping.is_set()
+
+    def is_paused(self):
+        return self.paused.is_set()
+
+    def wait_resume(self):
+        self.interrupt.wait()
+        self.interrupt.clear()
+
+    def sampled(self, now, sample, speed, failures, required, status, disk_active):
+        rx, tx = sample
+        self.emit('sample', rx=rx, tx=tx, speed=speed, failures=failures,
+                  required=required, status=status.lstrip(' |'))
+
+    def failed(self, error):
+        self.emit('error', error=str(error))
+
+    def run(self):
+        profile = self.profile
+        reason = 'stop'
+        try:
+            loop = MonitorLoop(profile, self, self.counters, self.clock, self.action)
+            loop.restart()
+            self.emit('started', profile=profile.name, interfaces=profile.interfaces)
+            # После отмены обратного отсчета мониторинг начинается заново: триггер
+            # сохраняется, если умеет продолжать (rearm), иначе создается новый
+            while loop.run() == 'cancelled':
+                loop.restart(loop.trigger if loop.trigger.rearm() else None)
+            if loop.action_mode:
+                reason = 'action'
+        except TraceFinished:
+            reason = 'finished'
+        except Exception as e:
+            reason = 'error'
+            self.emit('error', error=str(e))
+        finally:
+            self.emit('stopped', reason=reason, action_mode=self.result)
+
+    def countdown(self, action_mode, delay):
+        """Обратный отсчет и действие; False - отсчет отменен или мониторинг остановлен"""
+        runner = HookRunner(self.profile.hooks, action_mode, report=self.report) if self.profile.hooks else None
+        self.cancelling.clear()
+        self.counting = True
+        try:
+            if runner:
+                runner.start()
+            for remaining in range(delay, 0, -1):
+                self.emit('countdown', remaining=remaining, action_mode=action_mode)
+                if self.sleep(1) and (self.cancelling.is_set() or self.stopping.is_set()):
+                    break
+            if self.cancelling.is_set() or self.stopping.is_set():
+                if runner:
+                    runner.cancel()
+                self.emit('cancelled', action_mode=action_mode)
+                return False
+            if runner:
+                runner.wait(self.profile.hooks_deadline)
+            try:
+                result = self.action(action_mode)
+            except Exception as e:
+                self.emit('error', error=f"ошибка при выполнении действия: {e}")
+                return True
+            self.result = action_mode
+            self.emit('action', action_mode=action_mode, result=result)
+            return True
+        finally:
+            self.counting = False
+
+def control_address():
+    """
+    Адрес управления: именованный канал (Windows) или сокет Unix в каталоге,
+    доступном только пользователю (XDG_RUNTIME_DIR или личный подкаталог временной папки)
+    """
+    if os.name == 'nt':
+        return r'\\.\pipe\network_switch-' + os.environ.get('USERNAME', 'user')
+    folder = os.environ.get('XDG_RUNTIME_DIR') or os.path.join(tempfile.gettempdir(), f"network_switch-{os.getuid()}")
+    return os.path.join(folder, f"network_switch-{os.getuid()}.sock")
+
+def control_key_path(address):
+    """Файл ключа управления: рядом с сокетом, в Windows - в локальной папке профиля пользователя"""
+    if os.name == 'nt':
+        folder = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+        return os.path.join(folder, 'network_switch', 'control.key')
+    return address + '.key'
+
+def private_folder(path):
+    """Создает каталог, доступный только пользователю; чужой или открытый каталог - PermissionError"""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    if os.name != 'nt':
+        info = os.stat(path)
+        if info.st_uid != os.getuid() or info.st_mode & 0o077:
+            raise PermissionError(f"каталог {path} доступен другим пользователям")
+
+def control_key(address, create=False):
+    """
+    Ключ проверки подлинности клиентов управления (запрос-ответ HMAC multiprocessing.connection)
+    Хранится в файле с доступом только для пользователя; create - создать, если его нет
+    """
+    path = control_key_path(address)
+    try:
+        with open(path, 'rb') as file:
+            key = file.read().strip()
+        if key:
+            return key
+    except FileNotFoundError:
+        if not create:
+            raise
+    private_folder(os.path.dirname(path))
+    key = os.urandom(32).hex().encode('ascii')
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    handle = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(handle, 'wb') as file:
+        file.write(key)
+    os.replace(tmp_path, path)
+    return key
+
+def control_request(request, address=None):
+    """
+    Отправляет запрос запущенному мониторингу и возвращает ответ
+    OSError - мониторинг не запущен, PermissionError - ключ управления не подошел
+    """
+    from multiprocessing import AuthenticationError
+    from multiprocessing.connection import Client
+    address = address or control_address()
+    try:
+        connection = Client(address, 'AF_PIPE' if os.name == 'nt' else 'AF_UNIX', authkey=control_key(address))
+    except AuthenticationError as e:
+        raise PermissionError(f"ключ управления не подошел: {e}") from None
+    with connection:
+        connection.send_bytes(json.dumps(request, ensure_ascii=False).encode('utf-8'))
+        return json.loads(connection.recv_bytes(CONTROL_MAX_MESSAGE))
+
+class ControlServer:
+    """
+    Локальное управление запущенным мониторингом: сокет Unix (Linux) или именованный канал (Windows)
+    Запрос и ответ - JSON-объекты: {"command": "status"} -> {"ok": true, ...}
+    Команды выполняются в потоке сервера и только выставляют события и флаги,
+    поэтому не задерживают замеры; новый профиль и действие забирает цикл мониторинга.
+    Сокет создается с правами только для пользователя, а клиент подтверждает
+    знание ключа из файла control_key_path - это закрывает и именованный канал Windows
+    """
+
+    def __init__(self, address=None):
+        # Адрес по умолчанию определяется в start(): он требует загрузки tempfile
+        self.address = address
+        self.family = 'AF_PIPE' if os.name == 'nt' else 'AF_UNIX'
+        self.authkey = None
+        self.listener = None
+        self.thread = None
+        self.closing = False
+        self.lock = threading.Lock()
+        self.profile = None
+        self.events = None
+        self.state = {}
+        self.update = None
+        self.action = None
+        self.cancelled = False
+        self.commands = {
+            'status': self.command_status,
+            'pause': self.command_pause,
+            'resume': self.command_resume,
+            'cancel': self.command_cancel,
+            'profile': self.command_profile,
+            'threshold': self.command_threshold,
+            'action': self.command_action
+        }
+
+    def start(self):
+        """Открывает адрес управления; False - недоступен (например, уже запущен другой мониторинг)"""
+        if self.listener is not None:
+            return True
+        from multiprocessing.connection import Listener
+        self.address = self.address or control_address()
+        try:
+            if self.family == 'AF_UNIX':
+                private_folder(os.path.dirname(self.address))
+            self.authkey = control_key(self.address, create=True)
+        except OSError as e:
+            print(f"⚠️ Управление недоступно: {e}")
+            return False
+        if self.family == 'AF_UNIX' and os.path.exists(self.address):
+            try:
+                control_request({'command': 'status'}, self.address)
+                print(f"⚠️ Управление недоступно: по адресу {self.address} уже отвечает другой мониторинг")
+                return False
+            except PermissionError:
+                print(f"⚠️ Управление недоступно: сокет {self.address} занят другим процессом")
+                return False
+            except (OSError, EOFError):
+                # Сокет остался от аварийно завершенного процесса
+                with contextlib.suppress(OSError):
+                    os.remove(self.address)
+        # Сокет сразу создается с правами только для пользователя, без промежутка до chmod
+        umask = os.umask(0o077) if self.family == 'AF_UNIX' else None
+        try:
+            # Ключ проверяется в потоке подключения (serve_connection), а не в accept():
+            # клиент, оборвавший или затянувший проверку, не останавливает прием подключений
+            self.listener = Listener(self.address, self.family, backlog=8)
+        except OSError as e:
+            print(f"⚠️ Управление недоступно: {e}")
+            return False
+        finally:
+            if umask is not None:
+                os.umask(umask)
+        self.closing = False
+        self.thread = threading.Thread(target=self.serve, name="network-switch-control", daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self):
+        if self.listener is None:
+            return
+        self.closing = True
+        # accept() не прерывается закрытием слушателя - будим его подключением
+        with contextlib.suppress(Exception):
+            from multiprocessing.connection import Client
+            Client(self.address, self.family, authkey=self.authkey).close()
+        self.thread.join(1)
+        self.listener.close()
+        self.listener = None
+
+    def serve(self):
+        while True:
+            try:
+                connection = self.listener.accept()
+            except OSError:
+                return
+            if self.closing:
+                connection.close()
+                return
+            threading.Thread(target=self.serve_connection, args=(connection,), daemon=True).start()
+
+    def serve_connection(self, connection):
+        from multiprocessing import AuthenticationError
+        from multiprocessing.connection import answer_challenge, deliver_challenge
+        with connection:
+            try:
+                deliver_challenge(connection, self.authkey)
+                answer_challenge(connection, self.authkey)
+            except (AuthenticationError, EOFError, OSError):
+                # Клиент без ключа или оборвавший проверку
+                return
+            while True:
+                try:
+                    data = connection.recv_bytes(CONTROL_MAX_MESSAGE)
+                except (EOFError, OSError):
+                    return
+                try:
+                    request = json.loads(data)
+                    if not isinstance(request, dict):
+                        raise ValueError("запрос должен быть объектом JSON")
+                    response = self.handle(request)
+                except ValueError as e:
+                    response = {'ok': False, 'error': str(e)}
+                try:
+                    connection.send_bytes(json.dumps(response, ensure_ascii=False).encode('utf-8'))
+                except OSError:
+                    return
+
+    def handle(self, request):
+        command = self.commands.get(request.get('command'))
+        if command is None:
+            raise ValueError(f"неизвестная команда {request.get('command')!r}, доступны: {', '.join(self.commands)}")
+        if self.events is None:
+            raise ValueError("мониторинг сейчас не запущен")
+        return dict(command(request) or {}, ok=True)
+
+    def attach(self, profile, shutdown_event, pause_event, wake_event):
+        """Начало мониторинга: события, через которые команды управляют циклом"""
+        with self.lock:
+            self.profile = profile
+            self.events = (shutdown_event, pause_event, wake_event)
+            self.state = {'started': time.time(), 'countdown_until': None}
+            self.update = self.action = None
+
+    def detach(self):
+        with self.lock:
+            self.events = None
+
+    def publish(self, **values):
+        """Состояние для команды status; вызывается циклом мониторинга"""
+        self.state.update(values)
+
+    def take_update(self):
+        with self.lock:
+            update, self.update = self.update, None
+        return update
+
+    def take_action(self):
+        with self.lock:
+            action, self.action = self.action, None
+        return action
+
+    def take_cancelled(self):
+        with self.lock:
+            cancelled, self.cancelled = self.cancelled, False
+        return cancelled
+
+    def command_status(self, request):
+        profile = self.profile
+        state = dict(self.state)
+        until = state.pop('countdown_until', None)
+        return dict(state, pid=os.getpid(), profile=profile.name, interfaces=list(profile.interfaces),
+                    threshold=profile.threshold / 1024**2, interval=profile.interval,
+                    action_mode=state.get('action_mode', profile.action_mode),
+                    paused=self.events[1].is_set(),
+                    countdown=max(until - time.time(), 0) if until else None)
+
+    def command_pause(self, request):
+        self.events[1].set()
+        print("\n⏸️ Мониторинг приостановлен командой управления")
+
+    def command_resume(self, request):
+        self.events[1].clear()
+        self.events[2].set()
+        print("\n▶️ Мониторинг продолжен командой управления")
+
+    def command_cancel(self, request):
+        if not self.state.get('countdown_until'):
+            raise ValueError("обратный отсчет не идет")
+        with self.lock:
+            self.cancelled = True
+        self.events[0].set()
+        print("\n🚨 Действие отменено командой управления")
+        BACKEND.cancel_shutdown()
+
+    def command_profile(self, request):
+        name = request.get('name')
+        profiles = load_profiles()
+        if name not in profiles:
+            raise ValueError(f"профиль {name!r} не найден")
+        self.queue_update(Profile(profiles[name], name))
+        return {'profile': name}
+
+    def command_threshold(self, request):
+        try:
+            threshold = float(request.get('value'))
+        except (TypeError, ValueError):
+            raise ValueError("нужно значение value в МБ/с") from None
+        self.queue_update(Profile(dict(self.profile.settings, threshold=threshold * 1024**2), self.profile.name))
+        return {'threshold': threshold}
+
+    def command_action(self, request):
+        """Запускает обратный отсчет действия, как при срабатывании: его можно отменить командой cancel"""
+        mode = request.get('mode') or self.profile.action_mode
+        if mode not in ACTION_NAMES:
+            raise ValueError(f"неизвестный режим действия {mode!r}")
+        with self.lock:
+            self.action = mode
+        self.events[2].set()
+        return {'action_mode': mode, 'countdown': self.profile.shutdown_delay}
+
+    def queue_update(self, profile):
+        """Новый профиль применит цикл мониторинга сразу после пробуждения"""
+        with self.lock:
+            self.update = profile
+        self.events[2].set()
+
+def run_control(command, value=None, as_json=False):
+    """Клиент управления: отправляет команду запущенному мониторингу и выводит ответ"""
+    if command in ('profile', 'threshold') and value is None:
+        print(f"❌ Для команды {command} нужно значение: {'имя профиля' if command == 'profile' else 'порог в МБ/с'}")
+        return 1
+    request = {'command': command}
+    if command == 'profile':
+        request['name'] = value
+    elif command == 'threshold':
+        request['value'] = value
+    elif command == 'action' and value:
+        request['mode'] = value
+    try:
+        response = control_request(request)
+    except PermissionError as e:
+        print(f"❌ Нет доступа к управлению: {e}")
+        return 1
+    except (OSError, EOFError):
+        print(f"❌ Мониторинг не запущен (нет ответа по адресу {control_address()})")
+        return 1
+    if as_json:
+        print(json.dumps(response, ensure_ascii=False, indent=2))
+    elif not response.get('ok'):
+        print(f"❌ {response.get('error')}")
+    elif command == 'status':
+        profile = f" (профиль {response['profile']})" if response.get('profile') else ""
+        countdown = response.get('countdown')
+        print(f"▶️ PID {response['pid']}: {', '.join(response['interfaces'])}{profile}"
+              f"{' - пауза' if response['paused'] else ''}")
+        if response.get('speed') is not None:
+            trigger = f" | {response['trigger']}" if response.get('trigger') else ""
+            print(f"📊 {response['speed']/1024**2:.2f} МБ/с, порог {response['threshold']:.2f} МБ/с, "
+                  f"пропусков {response['failures']} из {response['required']}{trigger}")
+        if countdown is not None:
+            print(f"🔴 {ACTION_NAMES[response['action_mode']].capitalize()} через {format_time(int(countdown))}")
+    elif command == 'action':
+        print(f"🔴 Запущен обратный отсчет: {ACTION_NAMES[response['action_mode']]} через "
+              f"{format_time(int(response['countdown']))} (control cancel - отмена)")
+    else:
+        print("✅ Выполнено")
+    return 0 if response.get('ok') else 1
+
+def parse_schedule(text):
+    """
+    Разбирает расписание повторяющегося таймера:
+    "every 2h" - каждые 2 часа, "daily 02:00" - каждый день,
+    "mon-fri 23:00" или "sat,sun 10:30" - по дням недели
+    Возвращает ('every', секунды) или ('days', дни недели, часы, минуты)
+    """
+    parts = text.lower().split()
+    if len(parts) != 2:
+        raise ValueError(f"неверное расписание '{text}'")
+    kind, value = parts
+    if kind == 'every':
+        seconds = parse_time_input(value)
+        if seconds <= 0:
+            raise ValueError(f"неверный период '{value}'")
+        return ('every', seconds)
+    match = re.fullmatch(r'(\d{1,2}):(\d{2})', value)
+    if not match or int(match.group(1)) > 23 or int(match.group(2)) > 59:
+        raise ValueError(f"неверное время '{value}'")
+    if kind == 'daily':
+        days = frozenset(range(7))
+    else:
+        days = set()
+        for item in kind.split(','):
+            first, _, last = item.partition('-')
+            if first not in WEEKDAYS or (last and last not in WEEKDAYS):
+                raise ValueError(f"неизвестный день недели в '{kind}' (mon, tue, wed, thu, fri, sat, sun)")
+            a, b = WEEKDAYS.index(first), WEEKDAYS.index(last or first)
+            days.update(range(a, b + 1) if a <= b else [*range(a, 7), *range(0, b + 1)])
+        days = frozenset(days)
+    return ('days', days, int(match.group(1)), int(match.group(2)))
+
+def next_occurrence(schedule, after):
+    """Ближайший момент срабатывания расписания строго после after (время Unix)"""
+    if schedule[0] == 'every':
+        return after + schedule[1]
+    _, days, hour, minute = schedule
+    today = time.localtime(after)
+    for offset in range(8):
+        # mktime сам переносит день через границу месяца и учитывает переход на летнее время
+        moment = time.mktime((today.tm_year, today.tm_mon, today.tm_mday + offset, hour, minute, 0, 0, 0, -1))
+        if moment > after and time.localtime(moment).tm_wday in days:
+            return moment
+    raise ValueError("расписание без дней недели")
+
+def parse_deadline(text, now=None):
+    """Момент разового таймера: через заданное время (1h30m) или в заданное время (23:30)"""
+    now = time.time() if now is None else now
+    if ':' in text:
+        return next_occurrence(parse_schedule(f"daily {text.strip()}"), now)
+    seconds = parse_time_input(text)
+    if seconds <= 0:
+        raise ValueError("время должно быть больше 0")
+    return now + seconds
+
+class TimerScheduler:
+    """
+    Таймеры действий: разовые и повторяющиеся, со сроками по настенным часам
+    Сроки хранятся в куче (heapq), срабатывания ожидает один поток. Отмена только
+    помечает запись, помеченные записи выбрасываются при извлечении из кучи.
+    Действие выполняется после обратного отсчета countdown секунд, который
+    отменяется клавишей ESC или отменой таймера
+    """
+
+    def __init__(self, perform=None, countdown=TIMER_COUNTDOWN, clock=None):
+        self.heap = []
+        self.timers = {}        # id -> [срок, id, режим, расписание, текст расписания, отменен]
+        self.cancelled = 0
+        self.next_id = 1
+        self.condition = threading.Condition()
+        self.thread = None
+        self.perform = perform
+        self.countdown = countdown
+        self.clock = clock
+        self.counting = None    # (номер таймера, событие отмены) идущего обратного отсчета
+
+    def add(self, deadline, action_mode, schedule=None, label=None):
+        """Добавляет таймер; возвращает его номер"""
+        with self.condition:
+            timer_id = self.next_id
+            self.next_id += 1
+            entry = [deadline, timer_id, action_mode, schedule, label, False]
+            heapq.heappush(self.heap, entry)
+            self.timers[timer_id] = entry
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+            self.condition.notify()
+        return timer_id
+
+    def cancel(self, timer_id):
+        """Отменяет таймер по номеру (и его идущий отсчет); возвращает False, если такого таймера нет"""
+        with self.condition:
+            counting = self.counting is not None and self.counting[0] == timer_id
+            if counting:
+                self.counting[1].set()
+            entry = self.timers.pop(timer_id, None)
+            if entry is None:
+                return counting
+            entry[5] = True
+            self.cancelled += 1
+            if self.cancelled > len(self.heap) // 2:
+                # Помеченных записей слишком много - пересобираем кучу
+                self.heap = [item for item in self.heap if not item[5]]
+                heapq.heapify(self.heap)
+                self.cancelled = 0
+            self.condition.notify()
+        return True
+
+    def pending(self):
+        """Список ожидающих таймеров (номер, срок, режим, расписание) по возрастанию срока"""
+        with self.condition:
+            return sorted((entry[0], entry[1], entry[2], entry[4]) for entry in self.timers.values())
+
+    def due(self):
+        """Ждет и возвращает (запись, опоздание) для наступивших таймеров"""
+        with self.condition:
+            while True:
+                while self.heap and self.heap[0][5]:
+                    heapq.heappop(self.heap)
+                    self.cancelled -= 1
+                now = time.time()
+                if self.heap and self.heap[0][0] <= now:
+                    break
+                # Ожидание ограничено: после спящего режима настенные часы уходят вперед
+                timeout = min(self.heap[0][0] - now, TIMER_MAX_WAIT) if self.heap else None
+                self.condition.wait(timeout)
+            fired = []
+            while self.heap and self.heap[0][0] <= now:
+                entry = heapq.heappop(self.heap)
+                if entry[5]:
+                    self.cancelled -= 1
+                    continue
+                fired.append((entry, now - entry[0]))
+                if entry[3]:
+                    if entry[3][0] == 'every':
+                        # Сохраняем фазу: следующий срок кратен периоду от прежнего
+                        period = entry[3][1]
+                        deadline = entry[0] + (int((now - entry[0]) // period) + 1) * period
+                    else:
+                        deadline = next_occurrence(entry[3], now)
+                    following = [deadline, entry[1], entry[2], entry[3], entry[4], False]
+                    heapq.heappush(self.heap, following)
+                    self.timers[entry[1]] = following
+                else:
+                    self.timers.pop(entry[1], None)
+            return fired
+
+    def fire(self, timer_id, action_mode):
+        """Обратный отсчет и действие таймера; возвращает False, если отсчет отменен"""
+        cancel_event = threading.Event()
+        with self.condition:
+            self.counting = (timer_id, cancel_event)
+        BACKEND.enable_keys()
+        input_thread = threading.Thread(target=check_user_input, args=(cancel_event,), daemon=True)
+        input_thread.start()
+        try:
+            countdown_action(self.countdown, cancel_event, action_mode, clock=self.clock,
+                             action=self.perform or perform_action)
+            cancelled = cancel_event.is_set()
+        finally:
+            with self.condition:
+                self.counting = None
+            cancel_event.set()  # Завершает поток чтения клавиш
+            BACKEND.disable_keys()
+        if cancelled:
+            print(f"\n🚫 Таймер #{timer_id}: действие отменено")
+        return not cancelled
+
+    def run(self):
+        while True:
+            for (deadline, timer_id, action_mode, schedule, label, _), late in self.due():
+                name = ACTION_NAMES.get(action_mode, action_mode)
+                if late > TIMER_GRACE:
+                    print(f"\n⏭️ Таймер #{timer_id} ({name}) пропущен: опоздание {format_time(int(late))} "
+                          f"(компьютер был в спящем режиме?)")
+                    continue
+                print(f"\n⏰ {time.strftime('%H:%M:%S')}: таймер #{timer_id} - {name}")
+                try:
+                    self.fire(timer_id, action_mode)
+                except Exception as e:
+                    print(f"❌ Ошибка таймера #{timer_id}: {e}")
+
+SCHEDULER = TimerScheduler()
+
+def timed_action():
+    """Таймеры действий: добавление, просмотр и отмена"""
+    try:
+        while True:
+            print("\n=== Таймеры действий ===")
+            timers = SCHEDULER.pending()
+            if timers:
+                for deadline, timer_id, action_mode, label in timers:
+                    repeat = f", повтор: {label}" if label else ""
+                    print(f"#{timer_id}: {ACTION_NAMES[action_mode]} в {time.strftime('%d.%m %H:%M:%S', time.localtime(deadline))}{repeat}")
+            else:
+                print("Нет ожидающих таймеров")
+            print("\n1. Разовый таймер (через 1h30m или в 23:30)")
+            print("2. Повторяющийся таймер (every 2h, daily 02:00, mon-fri 23:00)")
+            print("3. Отменить таймер")
+            choice = input("\nВыберите вариант (1/2/3, Enter - возврат в меню): ")
+            if not choice:
+                return
+
+            if choice in ("1", "2"):
+                print("\nВыберите режим действия:")
+                print("s - Выключение компьютера")
+                print("r - Перезагрузка компьютера")
+                print("h - Спящий режим")
+                print("b - Звуковой сигнал")
+                action_mode = input("\nВведите режим действия (s/r/h/b): ").lower()
+                if action_mode not in ACTION_NAMES:
+                    print("❌ Неверный режим.")
+                    continue
+                try:
+                    if choice == "1":
+                        deadline = parse_deadline(input("Когда выполнить (например, 1h30m или 23:30): "))
+                        timer_id = SCHEDULER.add(deadline, action_mode)
+                    else:
+                        label = input("Расписание: ").strip().lower()
+                        schedule = parse_schedule(label)
+                        deadline = next_occurrence(schedule, time.time())
+                        timer_id = SCHEDULER.add(deadline, action_mode, schedule, label)
+                except ValueError as e:
+                    print(f"❌ {e}")
+                    continue
+                print(f"\n🕒 Таймер #{timer_id}: {ACTION_NAMES[action_mode]} в "
+                      f"{time.strftime('%d.%m %H:%M:%S', time.localtime(deadline))} "
+                      f"(через {format_time(int(deadline - time.time()))})")
+                print("ℹ️ Таймеры работают, пока программа запущена, в том числе во время мониторинга")
+            elif choice == "3":
+                try:
+                    timer_id = int(input("Номер таймера: ").lstrip('#'))
+                except ValueError:
+                    print("❌ Неверный номер.")
+                    continue
+                if SCHEDULER.cancel(timer_id):
+                    print(f"✅ Таймер #{timer_id} отменен")
+                else:
+                    print(f"❌ Таймер #{timer_id} не найден")
+            else:
+                print("❌ Неверный выбор. Попробуйте снова.")
+
+    except Exception as e:
+        print(f"\n❌ Ошибка: {e}")
+
+def main():
+    """Главная функция программы"""
+    try:
+        while True:
+            try:
+                print("\n--- Меню ---")
+                print("1. Выбрать существующий профиль (мониторинг сети)")
+                print("2. Создать новый профиль (мониторинг сети)")
+                print("3. Удалить профиль")
+                print("4. Редактировать профиль")
+                print("5. Изменить порядок профилей")
+                print("6. Таймеры действий (разовые и повторяющиеся)")
+                print("7. Выход")
+                
+                choice = input("\nВыберите вариант (1/2/3/4/5/6/7): ")
+                
+                if choice == "1":
+                    profiles = list_profiles()
+                    if not profiles:
+                        continue
+                        
+                    profile_names = list(profiles.keys())
+                    try:
+                        profile_choice = input("\nВведите номер профиля (или Enter для отмены): ")
+                        if not profile_choice:
+                            continue
+                            
+                        profile_name = profile_names[int(profile_choice) - 1]
+                        try:
+                            profile = Profile(profiles[profile_name], profile_name)
+                        except ValueError as e:
+                            print(f"\n❌ {e}")
+                            continue
+                        print(f"\n✅ Выбран профиль: {profile_name}")
+
+                        while True:
+                            trigger = profile.make_trigger()
+                            should_restart = monitor_traffic(profile, trigger=trigger, watcher=ProfileWatcher(profile_name))
+                            if isinstance(trigger, BaselineTrigger):
+                                trigger.save()
+                            # Перезапуск - с текущими настройками профиля из файла
+                            saved = load_profiles().get(profile_name)
+                            if saved:
+                                try:
+                                    profile = Profile(saved, profile_name)
+                                except ValueError as e:
+                                    print(f"\n❌ {e} - используются прежние настройки")
+                            
+                            if not should_restart:
+                                return
+                            print("\nНажмите Enter для возврата в меню или любую другую клавишу для перезапуска мониторинга...")
+                            if BACKEND.read_key() == b'\r':
+                                break
+                            
+                    except (ValueError, IndexError):
+                        print("\n❌ Неверный выбор. Попробуйте снова.")
+
+                elif choice == "2":
+                    interface = get_interface()
+                    if not interface:
+                        continue
+
+                    while True:
+                        traffic_type = input("Мониторить Upload/Download? (u/d): ").lower()
+                        if traffic_type in ["u", "d"]:
+                            break
+                        print("Ошибка! Введите 'u' или 'd'")
+
+                    allowed_failures = 3
+                    threshold = 0.1
+                    interval = 10
+                    shutdown_delay = 30
+                    action_mode = 's'
+                    monitor_disk = False
+                    
+                    try:
+                        allowed_failures = int(input(f"Допустимые пропуски [по умолчанию: {allowed_failures}]: ") or allowed_failures)
+                        threshold = float(input(f"Пороговая скорость (МБ/с) [по умолчанию: {threshold}]: ") or threshold) * 1024**2
+                        interval = int(input(f"Интервал проверки (сек) [по умолчанию: {interval}]: ") or interval)
+                        
+                        default_delay_str = format_time(shutdown_delay)
+                        delay_input = input(f"Задержка до действия (Например: 1h30m15s) [по умолчанию: {default_delay_str}]: ")
+                        if delay_input:
+                            parsed_seconds = parse_time_input(delay_input)
+                            if parsed_seconds > 0:
+                                shutdown_delay = parsed_seconds
+                            else:
+                                print("❌ Некорректный формат времени. Используется значение по умолчанию.")
+                        
+                        print("\nВыберите режим действия при срабатывании:")
+                        print("s - Выключение компьютера")
+                        print("r - Перезагрузка компьютера")
+                        print("h - Спящий режим")
+                        print("b - Звуковой сигнал")
+                        action_mode = input("Введите режим действия (s/r/h/b) [по умолчанию: s]: ").lower()
+                        if action_mode not in ['s', 'r', 'h', 'b']:
+                            action_mode = 's'
+                            print("Используется режим по умолчанию: выключение")
+                            
+                        # Новая опция: мониторинг дисков
+                        monitor_disk = input("\nВключить мониторинг активности дисков? (y/n) [по умолчанию: n]: ").lower() == 'y'
+                    except ValueError:
+                        print("❌ Неверный формат числа. Используются значения по умолчанию.")
+
+                    settings = {
+                        "interface": interface,
+                        "traffic_type": traffic_type,
+                        "allowed_failures": allowed_failures,
+                        "threshold": threshold,
+                        "interval": interval,
+                        "shutdown_delay": shutdown_delay,
+                        "action_mode": action_mode,
+                        "monitor_disk": monitor_disk
+                    }
+                    ask_trigger_settings(settings)
+                    try:
+                        profile = Profile(settings)
+                    except ValueError as e:
+                        print(f"\n❌ {e}")
+                        continue
+
+                    save_choice = input("\nСохранить эти настройки как новый профиль? (y/n): ").lower()
+                    if save_choice == "y":
+                        profile_name = input("Введите имя профиля: ")
+                        if profile_name:
+                            save_profile(profile_name, settings)
+
+                    while True:
+                        should_restart = monitor_traffic(profile)
+                        if not should_restart:
+                            return
+                        print("\nНажмите Enter для возврата в меню или любую другую клавишу для перезапуска мониторинга...")
+                        if BACKEND.read_key() == b'\r':
+                            break
+
+                elif choice == "3":
+                    delete_profile()
+
+                elif choice == "4":
+                    profiles = list_profiles()
+                    if not profiles:
+                        continue
+                        
+                    profile_names = list(profiles.keys())
+                    try:
+                        profile_choice = input("\nВведите номер профиля для редактирования (или Enter для отмены): ")
+                        if not profile_choice:
+                            continue
+                            
+                        profile_choice = int(profile_choice) - 1
+                        profile_to_edit = profile_names[profile_choice]
+                        edit_profile(profile_to_edit)
+                    except (ValueError, IndexError):
+                        print("\n❌ Неверный выбор. Попробуйте снова.")
+
+                elif choice == "5":
+                    move_profile()
+
+                elif choice == "6":
+                    timed_action()
+
+                elif choice == "7":
+                    print("\nВыход из программы.")
+                    break
+
+                else:
+                    print("\n❌ Неверный выбор. Попробуйте снова.")
+
+            except KeyboardInterrupt:
+                print("\n🛑 Операция прервана пользователем. Возврат в меню...")
+                continue
+                
+    except Exception as e:
+        print(f"\n❌ Критическая ошибка: {e}")
+    finally:
+        print("\nПрограмма завершена.")
+
+def add_profile_arguments(parser):
+    """Добавляет параметры профиля в парсер командной строки"""
+    parser.add_argument('--profile', help="имя сохраненного профиля")
+    parser.add_argument('--traffic', choices=['u', 'd'], help="тип трафика: u - Upload, d - Download")
+    parser.add_argument('--threshold', type=float, help="пороговая скорость (МБ/с)")
+    parser.add_argument('--allowed-failures', type=int, help="допустимые пропуски")
+    parser.add_argument('--interval', type=int, help="интервал проверки (сек)")
+    parser.add_argument('--delay', help="задержка до действия, например 30s")
+    parser.add_argument('--action', choices=['s', 'r', 'h', 'b'], help="режим действия")
+    parser.add_argument('--trigger', choices=list(TRIGGER_MODES), help="режим срабатывания")
+    parser.add_argument('--percentile', type=int, help="перцентиль для режима p")
+    parser.add_argument('--window', help="длина окна для режима p, например 10m")
+    parser.add_argument('--fraction', type=float, help="доля от обычной скорости для режима a")
+    parser.add_argument('--sigmas', type=float, help="число стандартных отклонений для режима a")
+    parser.add_argument('--drop', type=float, help="минимальное обнаруживаемое падение для режима c (0-1)")
+    parser.add_argument('--false-alarms', type=float, help="допустимые ложные срабатывания в сутки для режима c")
+    parser.add_argument('--forecast-window', help="окно прогноза для режима f, например 5m")
+    parser.add_argument('--min-r2', type=float, help="минимальное качество прогноза R² для режима f")
+    parser.add_argument('--budget', type=float, help="объем данных (ГБ) для режима v")
+    parser.add_argument('--max-interval', help="режим t: при высокой скорости проверять диски не чаще чем раз в, например 5m")
+
+def overrides_from_args(args):
+    """Параметры командной строки, заменяющие значения профиля"""
+    overrides = {}
+    if args.traffic:
+        overrides['traffic_type'] = args.traffic
+    if args.threshold is not None:
+        overrides['threshold'] = args.threshold * 1024**2
+    if args.allowed_failures is not None:
+        overrides['allowed_failures'] = args.allowed_failures
+    if args.interval is not None:
+        overrides['interval'] = args.interval
+    if args.delay:
+        overrides['shutdown_delay'] = parse_time_input(args.delay)
+    if args.action:
+        overrides['action_mode'] = args.action
+    if args.trigger:
+        overrides['trigger_mode'] = args.trigger
+    if args.percentile is not None:
+        overrides['percentile'] = args.percentile
+    if args.window:
+        overrides['percentile_window'] = parse_time_input(args.window)
+    if args.fraction is not None:
+        overrides['baseline_fraction'] = args.fraction
+    if args.sigmas is not None:
+        overrides['baseline_sigmas'] = args.sigmas
+    if args.drop is not None:
+        overrides['cusum_drop'] = args.drop
+    if args.false_alarms is not None:
+        overrides['cusum_false_alarms'] = args.false_alarms
+    if args.forecast_window:
+        overrides['forecast_window'] = parse_time_input(args.forecast_window)
+    if args.min_r2 is not None:
+        overrides['forecast_min_r2'] = args.min_r2
+    if args.budget is not None:
+        overrides['budget_bytes'] = int(args.budget * 1024**3)
+    if args.max_interval:
+        overrides['max_interval'] = parse_time_input(args.max_interval)
+    return overrides
+
+def profile_from_args(args):
+    """Собирает настройки профиля из сохраненного профиля и параметров командной строки"""
+    settings = dict(PROFILE_DEFAULTS)
+    if args.profile:
+        profiles = load_profiles()
+        if args.profile not in profiles:
+            raise ValueError(f"Профиль '{args.profile}' не найден")
+        settings.update(profiles[args.profile])
+    settings.update(overrides_from_args(args))
+    return settings
+
+def stop_on_signal(signum, frame):
+    """Обработчик сигнала завершения: останавливает мониторинг как Ctrl+C"""
+    raise KeyboardInterrupt
+
+def redirect_output(path):
+    """Перенаправляет вывод в файл журнала (нет консоли или фоновый режим)"""
+    stream = open(path, 'a', encoding='utf-8', buffering=1)
+    sys.stdout = sys.stderr = stream
+    return stream
+
+def spawn_daemon(argv):
+    """Перезапускает программу в фоне без консоли; возвращает PID фонового процесса"""
+    import subprocess
+    command = [sys.executable]
+    if not getattr(sys, 'frozen', False):
+        command.append(LAUNCHER)
+    command += [arg for arg in argv if arg != '--daemon'] + ['--detached']
+    if os.name == 'nt':
+        flags = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+        process = subprocess.Popen(command, creationflags=flags, close_fds=True,
+                                   stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    else:
+        process = subprocess.Popen(command, start_new_session=True, close_fds=True,
+                                   stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return process.pid
+
+def run_headless_timer(seconds, action_mode):
+    """Действие по таймеру без меню; возвращает код завершения"""
+    if seconds <= 0:
+        print("❌ Время должно быть больше 0!")
+        return EXIT_ERROR
+    print(f"🕒 {time.strftime('%Y-%m-%d %H:%M:%S')}: {ACTION_NAMES[action_mode]} через {format_time(seconds)}")
+    try:
+        SYSTEM_CLOCK.sleep(seconds)
+    except KeyboardInterrupt:
+        print("🛑 Таймер остановлен до выполнения действия.")
+        return EXIT_STOPPED
+    print(f"🔴 {time.strftime('%Y-%m-%d %H:%M:%S')}: выполняется {ACTION_NAMES[action_mode]}")
+    return EXIT_DONE if perform_action(action_mode) is not None else EXIT_ERROR
+
+def run_headless(settings, profile_name=None, watcher=None, control=True):
+    """
+    Мониторинг без меню и клавиатуры (планировщик заданий, systemd, скрипты)
+    watcher - ProfileWatcher для применения изменений профиля на ходу,
+    control - принимать команды локального управления (команда control)
+    Возвращает EXIT_DONE, если действие выполнено, иначе EXIT_ERROR или EXIT_STOPPED
+    """
+    try:
+        profile = Profile(settings, profile_name)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return EXIT_ERROR
+    interfaces = profile.interfaces
+    available = net_counters()
+    missing = [name for name in interfaces if name not in available]
+    if missing:
+        print(f"❌ Интерфейс не найден: {', '.join(str(name) for name in missing)}")
+        return EXIT_ERROR
+
+    performed = []
+    failed = []
+
+    def action(mode):
+        # Действие считается выполненным, только если системный вызов прошел без ошибки
+        (performed if perform_action(mode) is not None else failed).append(mode)
+
+    server = ControlServer() if control else None
+    print(f"▶️ {time.strftime('%Y-%m-%d %H:%M:%S')}: мониторинг {', '.join(interfaces)}"
+          f"{f' (профиль {profile_name})' if profile_name else ''}")
+    trigger = source = None
+    try:
+        while True:
+            # После отмены отсчета триггер, который умеет продолжать (rearm), сохраняется,
+            # если профиль по-прежнему следит за тем же источником в том же режиме
+            current = (profile.interfaces, profile.traffic_type, profile.trigger_mode)
+            if not (trigger and source == current and trigger.reconfigure(profile.settings) and trigger.rearm()):
+                trigger, source = profile.make_trigger(), current
+            monitor_traffic(profile, action=action, interactive=False, trigger=trigger, watcher=watcher, control=server)
+            # Отсчет, отмененный командой управления, не завершает фоновый мониторинг
+            if performed or failed or not (server and server.take_cancelled()):
+                break
+            if isinstance(trigger, BaselineTrigger) and trigger.profile_name:
+                trigger.save()
+            profile = server.profile
+    except KeyboardInterrupt:
+        print(f"\n🛑 {time.strftime('%Y-%m-%d %H:%M:%S')}: мониторинг остановлен до выполнения действия.")
+        return EXIT_STOPPED
+    finally:
+        if server:
+            server.stop()
+        if isinstance(trigger, BaselineTrigger) and trigger.profile_name:
+            trigger.save()
+    return EXIT_DONE if performed else EXIT_ERROR
+
+# Запускается отдельным интерпретатором: выполняет run --interface как обычно,
+# но вместо правила срабатывания подставляет пробу, которая отмечает первый замер
+STARTUP_SAMPLE_PROBE = """
+import sys
+import network_switch
+module = network_switch.core
+
+class Probe(module.Trigger):
+    def start(self, now, total):
+        print('STARTUP-FIRST-SAMPLE', flush=True)
+        raise KeyboardInterrupt
+
+module.make_trigger = lambda settings, profile_name=None: Probe()
+sys.exit(module.run_cli(['run', '--interface', sys.argv[1]]))
+"""
+
+def measure_startup(command, marker, cwd):
+    """
+    Запускает команду и возвращает время (сек) до появления в выводе строки с marker
+    Папка программы добавляется в PYTHONPATH, чтобы проба первого замера (python -c)
+    импортировала пакет network_switch из любой рабочей папки
+    """
+    import subprocess
+    path = os.pathsep.join(filter(None, (PROGRAM_FOLDER, os.environ.get('PYTHONPATH'))))
+    env = dict(os.environ, PYTHONIOENCODING='utf-8', PYTHONUTF8='1', PYTHONPATH=path)
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=cwd, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                               stderr=subprocess.STDOUT, encoding='utf-8', errors='replace')
+    watchdog = threading.Timer(STARTUP_TIMEOUT, process.kill)
+    watchdog.start()
+    try:
+        for line in process.stdout:
+            if marker in line:
+                return time.perf_counter() - started
+        raise RuntimeError(f"программа завершилась раньше, чем вывела '{marker}'")
+    finally:
+        watchdog.cancel()
+        process.kill()
+        process.wait()
+        process.stdout.close()
+        process.stdin.close()
+
+def show_startup(interface=None, runs=STARTUP_RUNS, menu_budget=STARTUP_MENU_BUDGET, sample_budget=STARTUP_SAMPLE_BUDGET):
+    """
+    Замеряет время от запуска до меню и до первого замера (медиана по runs запускам)
+    Меню замеряется при запуске файла программы, как он запускается по README: файл
+    только импортирует пакет network_switch, код которого берется из кэша байт-кода.
+    Возвращает 1, если медиана превышает допустимое время
+    """
+    import statistics
+    import tempfile
+    interface = interface or next(iter(net_counters()), None)
+    if not interface:
+        print("\n❌ Не найдено ни одного сетевого интерфейса.")
+        return 1
+    frozen = getattr(sys, 'frozen', False)
+    program = [sys.executable] if frozen else [sys.executable, LAUNCHER]
+    checks = [("до меню", program, "--- Меню ---", menu_budget)]
+    if frozen:
+        print("ℹ️ В собранной программе измеряется только время до меню")
+    else:
+        checks.append(("до первого замера", [sys.executable, '-c', STARTUP_SAMPLE_PROBE, interface],
+                       "STARTUP-FIRST-SAMPLE", sample_budget))
+
+    failed = False
+    print(f"\n=== Время запуска ({runs} запусков, интерфейс {interface}) ===")
+    # Пустая рабочая папка: замер не зависит от профилей и истории и не изменяет их
+    with tempfile.TemporaryDirectory() as folder:
+        for name, command, marker, budget in checks:
+            try:
+                times = [measure_startup(command, marker, folder) for _ in range(runs)]
+            except (OSError, RuntimeError) as e:
+                print(f"❌ Время {name}: {e}")
+                failed = True
+                continue
+            median = statistics.median(times)
+            verdict = "✅" if median <= budget else "❌"
+            print(f"{verdict} Время {name}: медиана {median*1000:.0f} мс (мин. {min(times)*1000:.0f}, "
+                  f"макс. {max(times)*1000:.0f}), допустимо {budget*1000:.0f} мс")
+            failed = failed or median > budget
+    return 1 if failed else 0
+
+def run_cli(argv):
+    """Обработка аргументов командной строки (без интерактивного меню)"""
+    import argparse
+    # Параметры без подкоманды (--profile, --timer, --daemon) означают run
+    if argv and argv[0].startswith('--') and argv[0] != '--help':
+        argv = ['run'] + list(argv)
+    parser = argparse.ArgumentParser(description="Сетевой выключатель")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    # Аргументы добавляются только вызванной подкоманде: разбор описаний остальных
+    # подкоманд занимает заметную часть времени до первого замера
+    command = argv[0] if argv else None
+
+    history_parser = subparsers.add_parser('history', help="показать историю скорости")
+    if command == 'history':
+        history_parser.add_argument('--last', default='1h', help="период, например 1h30m (по умолчанию: 1h)")
+        history_parser.add_argument('--resolution', choices=['1s', '1m', '15m'], help="шаг истории")
+        history_parser.add_argument('--file', default=HISTORY_FILE, help="файл истории")
+
+    journal_parser = subparsers.add_parser('journal', help="показать последние записи журнала замеров")
+    if command == 'journal':
+        journal_parser.add_argument('--last', type=int, default=20, help="количество записей (по умолчанию: 20)")
+        journal_parser.add_argument('--file', default=JOURNAL_FILE, help="файл журнала")
+
+    record_parser = subparsers.add_parser('record', help="записать трассу счетчиков интерфейса")
+    if command == 'record':
+        record_parser.add_argument('interface', help="сетевой интерфейс")
+        record_parser.add_argument('output', help="файл трассы (CSV)")
+        record_parser.add_argument('--duration', default='', help="длительность записи, например 8h (по умолчанию: до Ctrl+C)")
+        record_parser.add_argument('--period', type=float, default=1.0, help="период замеров (сек)")
+
+    replay_parser = subparsers.add_parser('replay', help="воспроизвести трассу на виртуальных часах")
+    if command == 'replay':
+        replay_parser.add_argument('trace', help="файл трассы (CSV)")
+        add_profile_arguments(replay_parser)
+        replay_parser.add_argument('--compare', help="сравнить задержку обнаружения с режимами, например t,c")
+        replay_parser.add_argument('--end', help="момент реального окончания загрузки от начала трассы, например 3h")
+
+    tune_parser = subparsers.add_parser('tune', help="подобрать параметры профиля по записанным трассам")
+    if command == 'tune':
+        tune_parser.add_argument('folder', help="папка с трассами (CSV)")
+        tune_parser.add_argument('--labels', help="JSON {файл трассы: время окончания загрузки от начала трассы, например 3h или 10800, "
+                                                    "или null} (по умолчанию: labels.json в папке)")
+        tune_parser.add_argument('--thresholds', default='0.05,0.1,0.2,0.5,1', help="пороги (МБ/с) через запятую")
+        tune_parser.add_argument('--failures', default='1,2,3,4,5,6,8,10', help="допустимые пропуски через запятую")
+        tune_parser.add_argument('--intervals', default='5,10,30,60', help="интервалы (сек) через запятую")
+        tune_parser.add_argument('--traffic', choices=['u', 'd'], help="тип трафика (по умолчанию из профиля или d)")
+        tune_parser.add_argument('--top', type=int, default=10, help="сколько лучших вариантов показать")
+        tune_parser.add_argument('--workers', type=int, help="количество процессов")
+        tune_parser.add_argument('--apply', metavar='PROFILE', help="записать лучший вариант в профиль")
+
+    analyze_parser = subparsers.add_parser('analyze', help="пакетный анализ истории замеров")
+    if command == 'analyze':
+        analyze_parser.add_argument('files', nargs='+', help="журналы (.bin) и трассы (.csv)")
+        analyze_parser.add_argument('--profile', action='append', help="профиль для отчета (по умолчанию все)")
+        analyze_parser.add_argument('--csv', help="сохранить сводку в CSV")
+        analyze_parser.add_argument('--npz', help="сохранить гистограммы и срабатывания в .npz")
+
+    run_parser = subparsers.add_parser('run', help="мониторинг или таймер без меню (коды завершения: 0 - действие выполнено, 1 - ошибка, 3 - остановлено)")
+    if command == 'run':
+        add_profile_arguments(run_parser)
+        run_parser.add_argument('--interface', help="сетевой интерфейс (если не задан профилем)")
+        run_parser.add_argument('--timer', help="выполнить действие через заданное время без мониторинга, например 1h30m")
+        run_parser.add_argument('--daemon', action='store_true', help="запустить в фоне без консоли")
+        run_parser.add_argument('--log', default=DAEMON_LOG_FILE, help=f"журнал вывода в фоновом режиме (по умолчанию: {DAEMON_LOG_FILE})")
+        run_parser.add_argument('--dry-run', action='store_true', help="пробный запуск: действие только выводится, но не выполняется")
+        run_parser.add_argument('--detached', action='store_true', help=argparse.SUPPRESS)
+
+    control_parser = subparsers.add_parser('control', help="управление запущенным мониторингом (run, в том числе --daemon)")
+    if command == 'control':
+        control_parser.add_argument('request', choices=['status', 'pause', 'resume', 'cancel', 'profile', 'threshold', 'action'],
+                                    help="status - состояние, pause/resume - пауза, cancel - отменить обратный отсчет, "
+                                         "profile ИМЯ - сменить профиль, threshold МБ/с - изменить порог, "
+                                         "action [s/r/h/b] - запустить обратный отсчет действия")
+        control_parser.add_argument('value', nargs='?', help="имя профиля, порог (МБ/с) или режим действия")
+        control_parser.add_argument('--json', action='store_true', help="вывести ответ в формате JSON")
+
+    startup_parser = subparsers.add_parser('startup', help="замерить время запуска до меню и до первого замера")
+    if command == 'startup':
+        startup_parser.add_argument('--interface', help="интерфейс для первого замера (по умолчанию первый найденный)")
+        startup_parser.add_argument('--runs', type=int, default=STARTUP_RUNS, help=f"количество запусков (по умолчанию: {STARTUP_RUNS})")
+        startup_parser.add_argument('--menu-budget', type=float, default=STARTUP_MENU_BUDGET, help="допустимое время до меню (сек)")
+        startup_parser.add_argument('--sample-budget', type=float, default=STARTUP_SAMPLE_BUDGET, help="допустимое время до первого замера (сек)")
+
+    args = parser.parse_args(argv)
+    if args.command == 'run':
+        if args.daemon:
+            try:
+                pid = spawn_daemon(argv)
+            except OSError as e:
+                print(f"❌ Не удалось запустить фоновый процесс: {e}")
+                return EXIT_ERROR
+            print(f"✅ Запущено в фоне (PID {pid}), вывод: {os.path.abspath(args.log)}")
+            return EXIT_DONE
+        if args.detached or sys.stdout is None:
+            # Без консоли (pythonw, планировщик заданий) print некуда выводить
+            try:
+                redirect_output(args.log)
+            except OSError:
+                sys.stdout = sys.stderr = open(os.devnull, 'w', encoding='utf-8')
+        if args.dry_run:
+            enable_dry_run()
+        signal.signal(signal.SIGTERM, stop_on_signal)
+        if hasattr(signal, 'SIGBREAK'):
+            signal.signal(signal.SIGBREAK, stop_on_signal)
+        if args.timer:
+            return run_headless_timer(parse_time_input(args.timer), args.action or 's')
+        try:
+            settings = profile_from_args(args)
+            overrides = overrides_from_args(args)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return EXIT_ERROR
+        if args.interface:
+            settings['interface'] = overrides['interface'] = args.interface
+        if not settings.get('interface') and not settings.get('interfaces'):
+            print("❌ Укажите --profile или --interface")
+            return EXIT_ERROR
+        return run_headless(settings, args.profile, ProfileWatcher(args.profile, overrides) if args.profile else None)
+    if args.command == 'control':
+        return run_control(args.request, args.value, args.json)
+    if args.command == 'startup':
+        return show_startup(args.interface, max(args.runs, 1), args.menu_budget, args.sample_budget)
+    if args.command == 'analyze':
+        profiles = load_profiles()
+        if args.profile:
+            missing = [name for name in args.profile if name not in profiles]
+            if missing:
+                print(f"\n❌ Профили не найдены: {', '.join(missing)}")
+                return 1
+            profiles = {name: profiles[name] for name in args.profile}
+        for name in list(profiles):
+            try:
+                check_offline_mode(profiles[name])
+            except ValueError as e:
+                print(f"⚠️ Профиль '{name}' пропущен: {e}")
+                del profiles[name]
+        if not profiles:
+            print("\n❌ Нет сохраненных профилей.")
+            return 1
+        return show_analysis(args.files, profiles, args.csv, args.npz)
+    if args.command == 'tune':
+        settings = dict(PROFILE_DEFAULTS)
+        if args.apply:
+            profiles = load_profiles()
+            if args.apply not in profiles:
+                print(f"\n❌ Профиль '{args.apply}' не найден.")
+                return 1
+            settings.update(profiles[args.apply])
+        if args.traffic:
+            settings['traffic_type'] = args.traffic
+        try:
+            thresholds = [float(v) for v in args.thresholds.split(',')]
+            failures = [int(v) for v in args.failures.split(',')]
+            intervals = [int(v) for v in args.intervals.split(',')]
+        except ValueError:
+            print("\n❌ Неверный формат сетки параметров.")
+            return 1
+        labels = args.labels or os.path.join(args.folder, 'labels.json')
+        return show_tuning(args.folder, labels, intervals, thresholds, failures, settings,
+                           args.top, args.apply, args.workers)
+    if args.command == 'record':
+        if args.interface not in net_counters():
+            print(f"\n❌ Интерфейс '{args.interface}' не найден.")
+            return 1
+        record_trace(args.interface, args.output, parse_time_input(args.duration), args.period)
+        return 0
+    if args.command == 'replay':
+        try:
+            settings = profile_from_args(args)
+        except ValueError as e:
+            print(f"\n❌ {e}")
+            return 1
+        compare = [mode for mode in args.compare.split(',') if mode in TRIGGER_MODES] if args.compare else None
+        end = parse_time_input(args.end) if args.end else None
+        return show_replay(args.trace, settings, compare, end)
+    if args.command == 'history':
+        return show_history(args.last, args.resolution, args.file)
+    if args.command == 'journal':
+        return show_journal(args.file, args.last)
+    return 0
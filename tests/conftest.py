@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import network_switch  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def nsw():
+    """Модуль программы network_switch.core"""
+    return network_switch.core
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Пустая рабочая папка: профили, история и самописец пишутся в нее"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+class FakeCounters(network_switch.CounterSource):
+    """Счетчики с заданной скоростью (байт за вызов read)"""
+
+    def __init__(self, rate=10**7):
+        self.rate = rate
+        self.total = 0
+
+    def read(self):
+        self.total += self.rate
+        return self.total, self.total
+
+
+@pytest.fixture
+def fake_counters():
+    return FakeCounters
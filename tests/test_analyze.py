@@ -0,0 +1,54 @@
+import pytest
+
+
+@pytest.fixture
+def journal(nsw, tmp_path):
+    """Журнал двух интерфейсов: eth0 загружен, wlan0 простаивает"""
+    path = str(tmp_path / 'journal.bin')
+    journal = nsw.MetricsJournal(path)
+    for second in range(1, 101):
+        journal.append(1_700_000_000 + second, 'eth0', second * 10 * 1024**2, 0, False, 0)
+        journal.append(1_700_000_000 + second, 'wlan0', 0, 0, False, second)
+    journal.close()
+    return path
+
+
+def test_chunks_filter_by_interface(nsw, journal):
+    pytest.importorskip('numpy')
+    eth = list(nsw.iter_sample_chunks(journal, chunk=30, interfaces=('eth0',)))
+    assert [len(block) for block in eth] == [30, 30, 30, 10]
+    assert eth[-1]['rx'][-1] == 100 * 10 * 1024**2
+    assert sum(len(block) for block in nsw.iter_sample_chunks(journal)) == 200
+
+
+def test_profiles_see_only_their_interface(nsw, journal):
+    pytest.importorskip('numpy')
+    profiles = {
+        'eth': dict(nsw.PROFILE_DEFAULTS, interface='eth0', threshold=1024**2, allowed_failures=3),
+        'wifi': dict(nsw.PROFILE_DEFAULTS, interface='wlan0', threshold=1024**2, allowed_failures=3),
+    }
+    eth, wifi = nsw.analyze_history([journal], profiles)
+    assert eth.samples == wifi.samples == 99
+    assert eth.below_time == 0 and not eth.fires
+    assert wifi.below_time == pytest.approx(99)
+    assert len(wifi.fires) == 1
+    assert eth.percentile(50) == pytest.approx(10 * 1024**2, rel=0.15)
+
+
+def test_multi_interface_profile_reads_its_own_records(nsw, tmp_path):
+    pytest.importorskip('numpy')
+    path = str(tmp_path / 'journal.bin')
+    journal = nsw.MetricsJournal(path)
+    for second in range(1, 101):
+        # Сумма eth0 и wlan0 загружена, а сам eth0 простаивает
+        journal.append(1_700_000_000 + second, 'eth0+wlan0', second * 10 * 1024**2, 0, False, 0)
+        journal.append(1_700_000_000 + second, 'eth0', 0, 0, False, second)
+    journal.close()
+    profiles = {
+        'both': dict(nsw.PROFILE_DEFAULTS, interfaces=['eth0', 'wlan0'], threshold=1024**2, allowed_failures=3),
+        'eth': dict(nsw.PROFILE_DEFAULTS, interface='eth0', threshold=1024**2, allowed_failures=3),
+    }
+    both, eth = nsw.analyze_history([path], profiles)
+    assert both.samples == eth.samples == 99
+    assert both.below_time == 0 and not both.fires
+    assert eth.below_time == pytest.approx(99)
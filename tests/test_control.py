@@ -0,0 +1,197 @@
+import os
+import threading
+import time
+
+import pytest
+
+MB = 1024**2
+
+pytestmark = pytest.mark.skipif(os.name == 'nt', reason="тест использует сокет Unix")
+
+
+@pytest.fixture
+def address(tmp_path_factory):
+    # Путь сокета Unix ограничен ~100 символами - берем короткий каталог
+    return str(tmp_path_factory.mktemp('ctl') / 'c.sock')
+
+
+@pytest.fixture
+def server(nsw, address):
+    server = nsw.ControlServer(address)
+    assert server.start()
+    yield server
+    server.stop()
+
+
+class Monitoring:
+    """monitor_traffic на виртуальных часах в отдельном потоке, под управлением сервера"""
+
+    def __init__(self, nsw, server, fake_counters, **settings):
+        self.nsw = nsw
+        self.performed = []
+        self.stopped = threading.Event()
+        profile = nsw.Profile(dict({'interface': 'eth0', 'threshold': 0.1 * MB, 'shutdown_delay': 7}, **settings), 'ctl')
+        monitoring = self
+
+        class Counters(fake_counters):
+            def read(self):
+                if monitoring.stopped.is_set():
+                    raise nsw.TraceFinished()
+                time.sleep(0.001)
+                return super().read()
+
+        self.thread = threading.Thread(target=self.run, daemon=True, args=(profile, Counters(10 * MB), server))
+        self.thread.start()
+        deadline = time.monotonic() + 5
+        while server.events is None:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+
+    def run(self, profile, counters, server):
+        try:
+            self.nsw.monitor_traffic(profile, counters=counters, clock=self.nsw.VirtualClock(1000.0),
+                                     action=self.performed.append, interactive=False, persist=False,
+                                     control=server)
+        except self.nsw.TraceFinished:
+            pass
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join(5)
+
+
+@pytest.fixture
+def monitoring(nsw, server, fake_counters):
+    started = []
+
+    def start(**settings):
+        started.append(Monitoring(nsw, server, fake_counters, **settings))
+        return started[-1]
+
+    yield start
+    for item in started:
+        item.stop()
+
+
+def test_commands_without_monitoring(nsw, server, address):
+    response = nsw.control_request({'command': 'status'}, address)
+    assert response == {'ok': False, 'error': "мониторинг сейчас не запущен"}
+    response = nsw.control_request({'command': 'reboot'}, address)
+    assert not response['ok'] and 'неизвестная команда' in response['error']
+
+
+def test_status_pause_and_threshold(nsw, server, address, monitoring):
+    monitoring()
+    status = nsw.control_request({'command': 'status'}, address)
+    assert status['ok'] and status['profile'] == 'ctl' and status['interfaces'] == ['eth0']
+    assert status['countdown'] is None and not status['paused']
+
+    assert nsw.control_request({'command': 'pause'}, address)['ok']
+    assert nsw.control_request({'command': 'status'}, address)['paused']
+    assert nsw.control_request({'command': 'resume'}, address)['ok']
+
+    assert nsw.control_request({'command': 'threshold', 'value': 'x'}, address)['ok'] is False
+    assert nsw.control_request({'command': 'threshold', 'value': 0.5}, address)['threshold'] == 0.5
+    deadline = time.monotonic() + 5
+    while nsw.control_request({'command': 'status'}, address)['threshold'] != 0.5:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert not nsw.control_request({'command': 'cancel'}, address)['ok'], "отсчет не идет"
+
+
+def test_action_starts_profile_countdown(nsw, server, address, monitoring):
+    running = monitoring()
+    response = nsw.control_request({'command': 'action', 'mode': 'b'}, address)
+    assert response == {'ok': True, 'action_mode': 'b', 'countdown': 7}
+    running.thread.join(5)
+    assert not running.thread.is_alive()
+    assert running.performed == ['b']
+
+    assert nsw.control_request({'command': 'action', 'mode': 'x'}, address)['ok'] is False
+
+
+def test_run_control_reports_countdown(nsw, server, address, monitoring, monkeypatch, capsys):
+    monkeypatch.setattr(nsw, 'control_address', lambda: address)
+    monitoring(shutdown_delay=90)
+    assert nsw.run_control('action', 'b') == 0
+    assert "обратный отсчет: звуковой сигнал через" in capsys.readouterr().out
+
+
+def test_malformed_requests(nsw, server, address):
+    from multiprocessing.connection import Client
+    with Client(address, 'AF_UNIX', authkey=nsw.control_key(address)) as connection:
+        connection.send_bytes(b'[1, 2]')
+        assert b'"ok": false' in connection.recv_bytes()
+        connection.send_bytes(b'not json')
+        assert b'"ok": false' in connection.recv_bytes()
+
+
+def test_socket_and_key_are_private(nsw, server, address):
+    assert os.stat(address).st_mode & 0o077 == 0
+    key_path = nsw.control_key_path(address)
+    assert os.stat(key_path).st_mode & 0o777 == 0o600
+    assert nsw.control_key(address) == server.authkey
+
+
+def test_client_without_key_is_rejected(nsw, server, address):
+    from multiprocessing import AuthenticationError
+    from multiprocessing.connection import Client
+    with pytest.raises((AuthenticationError, EOFError, OSError)):
+        with Client(address, 'AF_UNIX', authkey=b'wrong') as connection:
+            connection.send_bytes(b'{"command": "status"}')
+            connection.recv_bytes()
+    # Клиент без ключа получает только вызов проверки, а его запрос сервер отвергает
+    with Client(address, 'AF_UNIX') as connection:
+        connection.send_bytes(b'{"command": "status"}')
+        assert b'"ok"' not in connection.recv_bytes()
+    # Сервер продолжает обслуживать клиентов с ключом
+    assert nsw.control_request({'command': 'status'}, address)['error'] == "мониторинг сейчас не запущен"
+
+
+
+def test_silent_client_does_not_block_others(nsw, server, address):
+    import socket
+    # Клиент подключился, но не отвечает на проверку ключа и сразу обрывает связь
+    silent = socket.socket(socket.AF_UNIX)
+    silent.connect(address)
+    hasty = socket.socket(socket.AF_UNIX)
+    hasty.connect(address)
+    hasty.close()
+    try:
+        assert nsw.control_request({'command': 'status'}, address)['error'] == "мониторинг сейчас не запущен"
+    finally:
+        silent.close()
+
+def test_wrong_key_file_is_reported(nsw, server, address):
+    with open(nsw.control_key_path(address), 'wb') as file:
+        file.write(b'other')
+    with pytest.raises(PermissionError):
+        nsw.control_request({'command': 'status'}, address)
+
+
+def test_open_folder_is_refused(nsw, tmp_path, capsys):
+    folder = tmp_path / 'open'
+    folder.mkdir(mode=0o777)
+    folder.chmod(0o777)
+    server = nsw.ControlServer(str(folder / 'c.sock'))
+    assert not server.start()
+    assert 'доступен другим пользователям' in capsys.readouterr().out
+
+
+def test_default_address_uses_private_folder(nsw, monkeypatch, tmp_path):
+    monkeypatch.delenv('XDG_RUNTIME_DIR', raising=False)
+    monkeypatch.setattr(nsw.tempfile, 'gettempdir', lambda: str(tmp_path))
+    address = nsw.control_address()
+    assert os.path.dirname(address) == str(tmp_path / f"network_switch-{os.getuid()}")
+    server = nsw.ControlServer()
+    assert server.start()
+    try:
+        assert os.stat(os.path.dirname(address)).st_mode & 0o777 == 0o700
+    finally:
+        server.stop()
+
+
+def test_start_is_idempotent(nsw, server):
+    listener = server.listener
+    assert server.start()
+    assert server.listener is listener
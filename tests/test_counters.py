@@ -0,0 +1,21 @@
+import sys
+
+import pytest
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason="/proc/net/dev есть только в Linux")
+def test_net_counters_match_psutil(nsw):
+    import psutil
+    before = {name: (nic.bytes_recv, nic.bytes_sent) for name, nic in psutil.net_io_counters(pernic=True).items()}
+    stats = nsw.net_counters()
+    after = {name: (nic.bytes_recv, nic.bytes_sent) for name, nic in psutil.net_io_counters(pernic=True).items()}
+    assert set(stats) == set(before)
+    for name, (rx, tx) in stats.items():
+        assert before[name][0] <= rx <= after[name][0]
+        assert before[name][1] <= tx <= after[name][1]
+
+
+def test_counters_sum_interfaces(nsw, monkeypatch):
+    monkeypatch.setattr(nsw, 'net_counters', lambda: {'eth0': (10, 1), 'wlan0': (5, 2), 'lo': (100, 100)})
+    assert nsw.PsutilCounters('eth0').read() == (10, 1)
+    assert nsw.PsutilCounters('eth0', 'wlan0').read() == (15, 3)
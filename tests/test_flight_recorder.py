@@ -0,0 +1,56 @@
+import json
+import os
+import threading
+
+
+def test_ring_keeps_last_entries(nsw):
+    recorder = nsw.FlightRecorder(60, minutes=1)
+    for number in range(recorder.size + 10):
+        recorder.event(str(number))
+    messages = [data[0] for _, _, data in recorder.snapshot()]
+    assert len(messages) == recorder.size
+    assert messages[-1] == str(recorder.size + 9)
+    assert messages[0] == '10'
+
+
+def test_concurrent_writers_lose_no_entries(nsw):
+    recorder = nsw.FlightRecorder(1, minutes=200)
+    writers, per_writer = 8, 2000
+    assert recorder.size > writers * per_writer
+
+    def write(name):
+        for number in range(per_writer):
+            recorder.event(f"{name}:{number}")
+
+    threads = [threading.Thread(target=write, args=(name,)) for name in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert recorder.pos == writers * per_writer
+    assert len({data[0] for _, _, data in recorder.snapshot()}) == writers * per_writer
+
+
+def test_dump_writes_context_and_entries(nsw, workdir):
+    recorder = nsw.FlightRecorder(10, {'interface': 'lo'})
+    recorder.record('sample', 1, 2, 3.0, 0)
+    recorder.event("monitoring started")
+    path = recorder.dump('action')
+    lines = [json.loads(line) for line in open(path, encoding='utf-8')]
+    assert lines[0]['reason'] == 'action' and lines[0]['interface'] == 'lo'
+    assert lines[1]['kind'] == 'sample' and lines[1]['speed'] == 3.0
+    assert lines[2] == {'t': lines[2]['t'], 'kind': 'event', 'message': "monitoring started"}
+
+
+def test_dumps_in_same_second_do_not_overwrite(nsw, workdir, monkeypatch):
+    monkeypatch.setattr(nsw.time, 'strftime', lambda fmt: '20240101_120000')
+    recorder = nsw.FlightRecorder(10)
+    paths = []
+    for reason in ('cancel', 'cancel', 'action'):
+        recorder.event(reason)
+        paths.append(recorder.dump(reason))
+    assert [os.path.basename(path) for path in paths] == [
+        'flight_20240101_120000_cancel.jsonl', 'flight_20240101_120000_cancel_2.jsonl',
+        'flight_20240101_120000_action.jsonl']
+    assert [len(open(path, encoding='utf-8').readlines()) for path in paths] == [2, 3, 4]
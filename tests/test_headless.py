@@ -0,0 +1,60 @@
+import pytest
+
+
+class FailingBackend:
+    """Платформа, на которой системный вызов выключения завершается ошибкой"""
+    name = "отказ"
+
+    def __init__(self):
+        self.calls = []
+
+    def shutdown(self):
+        self.calls.append('s')
+        raise OSError("нет привилегии SE_SHUTDOWN_NAME")
+
+
+class WorkingBackend(FailingBackend):
+    def shutdown(self):
+        self.calls.append('s')
+
+
+CASES = [(FailingBackend, 'EXIT_ERROR'), (WorkingBackend, 'EXIT_DONE')]
+
+
+@pytest.fixture
+def backend(nsw, monkeypatch, request):
+    backend = request.param()
+    monkeypatch.setattr(nsw, 'BACKEND', backend)
+    return backend
+
+
+@pytest.mark.parametrize('backend, code', CASES, indirect=['backend'])
+def test_headless_exit_code_follows_action_result(nsw, monkeypatch, backend, code):
+    monkeypatch.setattr(nsw, 'net_counters', lambda: {'eth0': None})
+    # Мониторинг сразу решает выполнить действие
+    monkeypatch.setattr(nsw, 'monitor_traffic', lambda profile, action, **kwargs: action('s') or False)
+    assert nsw.run_headless({'interface': 'eth0', 'action_mode': 's'}, control=False) == getattr(nsw, code)
+    assert backend.calls == ['s']
+
+
+@pytest.mark.parametrize('backend, code', CASES, indirect=['backend'])
+def test_headless_timer_exit_code_follows_action_result(nsw, backend, code):
+    assert nsw.run_headless_timer(0.01, 's') == getattr(nsw, code)
+    assert backend.calls == ['s']
+
+
+def test_daemon_restarts_through_launcher(nsw, monkeypatch):
+    import subprocess
+    started = []
+
+    class Popen:
+        pid = 4321
+
+        def __init__(self, command, **kwargs):
+            started.append(command)
+
+    monkeypatch.setattr(subprocess, 'Popen', Popen)
+    assert nsw.spawn_daemon(['--profile', 'ночь', '--daemon']) == 4321
+    # Фоновая копия запускается тем же файлом программы, что описан в README
+    assert started == [[nsw.sys.executable, nsw.LAUNCHER, '--profile', 'ночь', '--detached']]
+    assert nsw.os.path.isfile(nsw.LAUNCHER)
@@ -0,0 +1,99 @@
+import struct
+from array import array
+
+TIERS = ((1, 120), (60, 10))
+
+
+def test_tiers_consolidate_average_min_max(nsw):
+    store = nsw.HistoryStore(TIERS)
+    start = 6000    # Начало минуты
+    for second in range(180):
+        store.add(start + second + 0.5, float(second))
+    minutes = store.tiers[1].rows(start, start + 179)
+    assert minutes == [(start, 29.5, 0.0, 59.0), (start + 60, 89.5, 60.0, 119.0), (start + 120, 149.5, 120.0, 179.0)]
+    seconds = store.tiers[0].rows(start + 170, start + 179)
+    assert [row[1] for row in seconds] == [float(value) for value in range(170, 180)]
+
+
+def test_ring_overwrites_stale_slots(nsw):
+    tier = nsw.HistoryTier(1, 10)
+    for second in range(25):
+        tier.add(second, float(second))
+    rows = tier.rows(0, 24)
+    assert [row[0] for row in rows] == list(range(15, 25))
+    # После перерыва старое значение ячейки не смешивается с новым
+    tier.add(40, 100.0)
+    assert tier.rows(40, 40) == [(40, 100.0, 100.0, 100.0)]
+    assert tier.rows(30, 39) == []
+
+
+def test_tier_for_span(nsw):
+    store = nsw.HistoryStore(TIERS)
+    assert store.tier_for(60).step == 1
+    assert store.tier_for(300).step == 60
+    assert store.tier_for(10**6).step == 60
+
+
+def test_save_and_load(nsw, tmp_path):
+    path = str(tmp_path / 'history.rrd')
+    store = nsw.HistoryStore(TIERS)
+    for second in range(200):
+        store.add(6000 + second, second * 1024.0)
+    store.save(path)
+    loaded = nsw.HistoryStore.load(path, TIERS)
+    for saved, restored in zip(store.tiers, loaded.tiers):
+        assert restored.rows(6000, 6199) == saved.rows(6000, 6199)
+
+
+def test_load_starts_empty_for_other_layout_or_damage(nsw, tmp_path, capsys):
+    path = str(tmp_path / 'history.rrd')
+    store = nsw.HistoryStore(TIERS)
+    store.add(6000, 1.0)
+    store.save(path)
+    assert nsw.HistoryStore.load(path, ((1, 60),)).tiers[0].rows(6000, 6000) == []
+    with open(path, 'r+b') as file:
+        file.truncate(100)
+    assert nsw.HistoryStore.load(path, TIERS).tiers[0].rows(6000, 6000) == []
+    assert "Не удалось загрузить историю" in capsys.readouterr().out
+
+
+def test_file_layout_is_fixed_width_little_endian(nsw, tmp_path):
+    path = tmp_path / 'history.rrd'
+    store = nsw.HistoryStore(TIERS)
+    store.add(6000, 5.0)
+    store.save(str(path))
+    data = path.read_bytes()
+    assert data[:8] == b'NSHIST' + struct.pack('<H', nsw.HistoryStore.VERSION)
+    # Заголовок, затем для каждого уровня: номера ячеек (q), суммы (d), количества (q), минимумы и максимумы (d)
+    header = 8 + 4 + 8 * len(TIERS)
+    assert len(data) == header + sum(size * 8 * 5 for _, size in TIERS)
+    counts = header + 120 * 8 * 2
+    assert struct.unpack_from('<q', data, counts + (6000 % 120) * 8) == (1,)
+
+
+def test_legacy_file_is_still_read(nsw, tmp_path):
+    path = tmp_path / 'history.rrd'
+    store = nsw.HistoryStore(TIERS)
+    for second in range(100):
+        store.add(6000 + second, float(second))
+    # Версия 1: счетчики в формате long платформы
+    with open(path, 'wb') as file:
+        file.write(b'NSHIST01' + struct.pack('<I', len(TIERS)))
+        for step, size in TIERS:
+            file.write(struct.pack('<II', step, size))
+        for tier in store.tiers:
+            for column in (tier.slots, tier.sums, array('l', tier.counts), tier.mins, tier.maxs):
+                column.tofile(file)
+    loaded = nsw.HistoryStore.load(str(path), TIERS)
+    for saved, restored in zip(store.tiers, loaded.tiers):
+        assert restored.rows(6000, 6099) == saved.rows(6000, 6099)
+        assert restored.counts.typecode == 'q'
+
+
+def test_save_syncs_before_replacing(nsw, tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(nsw.os, 'fsync', lambda fd: calls.append('fsync'))
+    replace = nsw.os.replace
+    monkeypatch.setattr(nsw.os, 'replace', lambda src, dst: calls.append('replace') or replace(src, dst))
+    nsw.HistoryStore(TIERS).save(str(tmp_path / 'history.rrd'))
+    assert calls == ['fsync', 'replace']
@@ -0,0 +1,96 @@
+import pytest
+
+
+def records(nsw):
+    """Замеры с неравными шагами, сбросом счетчика, сменой интерфейса и вердиктами дисков"""
+    rx = tx = 10**9
+    result = []
+    for index in range(200):
+        timestamp = 1700000000.0 + index * 10 + (index % 7) * 0.125
+        rx += (index * 7919) % 50000
+        tx += (index * 104729) % 3000
+        if index == 120:
+            rx, tx = 1000, 10   # Переподключение интерфейса
+        interface = 'eth0' if index < 150 else 'wlan0'
+        disk = (None, False, True)[index % 3]
+        failures = index % 4 if index % 10 else 0
+        result.append(nsw.JournalRecord(timestamp, interface, rx, tx, disk, failures))
+    return result
+
+
+def test_round_trip(nsw, tmp_path):
+    path = str(tmp_path / 'journal.bin')
+    written = records(nsw)
+    journal = nsw.MetricsJournal(path, block_size=4096, blocks=8)
+    for record in written:
+        journal.append(*record)
+    journal.close()
+    with nsw.JournalReader(path) as reader:
+        assert list(reader) == written
+
+
+def test_ring_keeps_latest_blocks_in_order(nsw, tmp_path):
+    path = str(tmp_path / 'journal.bin')
+    written = records(nsw)
+    journal = nsw.MetricsJournal(path, block_size=128, blocks=4)
+    for record in written:
+        journal.append(*record)
+    journal.close()
+    with nsw.JournalReader(path) as reader:
+        kept = list(reader)
+    assert 0 < len(kept) < len(written)
+    assert kept == written[-len(kept):]
+
+
+def test_reopened_journal_continues(nsw, tmp_path):
+    path = str(tmp_path / 'journal.bin')
+    written = records(nsw)
+    for part in (written[:80], written[80:]):
+        journal = nsw.MetricsJournal(path, block_size=4096, blocks=8)
+        for record in part:
+            journal.append(*record)
+        journal.close()
+    with nsw.JournalReader(path) as reader:
+        assert list(reader) == written
+
+
+def test_reader_rejects_other_files(nsw, tmp_path):
+    path = tmp_path / 'history.rrd'
+    path.write_bytes(b'NSHIST01' + bytes(100))
+    with pytest.raises(ValueError, match="не является журналом"):
+        nsw.JournalReader(str(path))
+
+
+def test_varint_round_trip(nsw):
+    values = [0, 1, -1, 63, -64, 64, 2**31, -(2**40), 2**62]
+    buf = bytearray()
+    for value in values:
+        nsw._put_varint(buf, value)
+    pos, decoded = 0, []
+    for _ in values:
+        value, pos = nsw._get_varint(buf, pos)
+        decoded.append(value)
+    assert decoded == values and pos == len(buf)
+
+
+def test_tag_joins_interfaces_and_hashes_long_names(nsw):
+    assert nsw.journal_tag(('eth0',)) == 'eth0'
+    assert nsw.journal_tag(('eth0', 'wlan0')) == 'eth0+wlan0'
+    first = nsw.journal_tag(('Подключение по локальной сети',))
+    second = nsw.journal_tag(('Подключение по локальной сети 2',))
+    assert first != second
+    for tag in (first, second):
+        assert len(tag.encode('utf-8')) <= nsw.JOURNAL_TAG_BYTES
+        assert tag.startswith('Подключение')
+
+
+def test_long_interface_names_are_not_truncated(nsw, tmp_path):
+    path = str(tmp_path / 'journal.bin')
+    journal = nsw.MetricsJournal(path, block_size=4096, blocks=8)
+    with pytest.raises(ValueError, match='длиннее'):
+        journal.append(1700000000.0, 'Подключение по локальной сети', 0, 0)
+    tag = nsw.journal_tag(('Подключение по локальной сети',))
+    journal.append(1700000000.0, tag, 0, 0)
+    journal.close()
+    with nsw.JournalReader(path) as reader:
+        assert [record.interface for record in reader] == [tag]
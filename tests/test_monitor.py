@@ -0,0 +1,177 @@
+MB = 1024**2
+
+
+def profile(nsw, **values):
+    return nsw.Profile(dict({'interface': 'eth0', 'threshold': 0.1 * MB, 'interval': 10,
+                             'allowed_failures': 3, 'shutdown_delay': 2}, **values), 'test')
+
+
+class Slowdown:
+    """Счетчики: fast замеров со скоростью 1 МБ/с, затем 1 КБ/с (интервал 10 секунд)"""
+
+    def __init__(self, fast):
+        self.reads = 0
+        self.total = 0
+        self.fast = fast
+
+    def read(self):
+        self.total += 10 * MB if self.reads <= self.fast else 10 * 1024
+        self.reads += 1
+        return self.total, self.total
+
+
+def run_monitor(nsw, counters, on_event=None, **values):
+    events, performed = [], []
+
+    def record(event):
+        events.append(event)
+        if on_event:
+            on_event(monitor, event)
+
+    monitor = nsw.Monitor(profile(nsw, **values), counters=counters, clock=nsw.VirtualClock(1000.0),
+                          action=nsw.Action(performed.append), on_event=record)
+    monitor.start()
+    monitor.wait(5)
+    monitor.stop(5)
+    return events, performed
+
+
+def test_monitor_counts_failures_and_performs_action(nsw):
+    events, performed = run_monitor(nsw, Slowdown(2), action_mode='h')
+    assert performed == ['h']
+    kinds = [event.kind for event in events]
+    assert kinds == ['started', 'sample', 'sample', 'sample', 'sample', 'sample',
+                     'countdown', 'countdown', 'action', 'stopped']
+    assert [event.data['failures'] for event in events if event.kind == 'sample'] == [0, 0, 1, 2, 3]
+    assert events[-1].data == {'reason': 'action', 'action_mode': 'h'}
+
+
+def test_monitor_restarts_after_cancelled_countdown(nsw):
+    def cancel_first(monitor, event):
+        if event.kind == 'countdown' and not any(item.kind == 'cancelled' for item in seen):
+            monitor.cancel()
+        seen.append(event)
+
+    seen = []
+    events, performed = run_monitor(nsw, Slowdown(0), on_event=cancel_first, action_mode='h')
+    assert performed == ['h']
+    failures = [event.data['failures'] if event.kind == 'sample' else event.kind
+                for event in events if event.kind in ('sample', 'cancelled')]
+    # После отмены счетчик пропусков начинается заново
+    assert failures == [1, 2, 3, 'cancelled', 1, 2, 3]
+
+
+def test_budget_monitor_keeps_counting_after_cancel(nsw):
+    def cancel_first(monitor, event):
+        if event.kind == 'countdown' and not any(item.kind == 'cancelled' for item in seen):
+            monitor.cancel()
+        seen.append(event)
+
+    seen = []
+    events, performed = run_monitor(nsw, Slowdown(100), on_event=cancel_first, action_mode='h',
+                                    trigger_mode='v', budget_bytes=25 * MB)
+    assert performed == ['h']
+    totals = [event.data['rx'] if event.kind == 'sample' else event.kind
+              for event in events if event.kind in ('sample', 'cancelled')]
+    # Счет идет от первого чтения (10 МБ): отсчет при 30 МБ из 25, после отмены - при 50 МБ
+    # из следующих 50, а не через 25 МБ после перезапуска
+    assert totals == [20 * MB, 30 * MB, 40 * MB, 'cancelled', 60 * MB]
+
+
+def test_monitor_traffic_takes_same_decisions(nsw, capsys):
+    events, _ = run_monitor(nsw, Slowdown(2), action_mode='h')
+    monitor_failures = [event.data['failures'] for event in events if event.kind == 'sample']
+
+    performed = []
+    result = nsw.monitor_traffic(profile(nsw, action_mode='h'), counters=Slowdown(2), clock=nsw.VirtualClock(1000.0),
+                                 action=performed.append, interactive=False, persist=False)
+    assert result is False and performed == ['h']
+    remaining = [int(line.rsplit(' ', 1)[1]) for line in capsys.readouterr().out.splitlines()
+                 if line.startswith("⚠️ Пропусков до")]
+    assert [3 - count for count in remaining] == [count for count in monitor_failures if count]
+
+
+def recording(nsw, samples):
+    """Окружение цикла, которое запоминает замеры и останавливает его после samples замеров"""
+
+    class Recording(nsw.MonitorReporter):
+        def __init__(self):
+            self.clock = nsw.VirtualClock(1000.0)
+            self.failures = []
+            self.disk = []
+
+        def sleep(self, seconds):
+            self.clock.sleep(seconds)
+
+        def is_stopped(self):
+            return len(self.failures) >= samples
+
+        def disk_checked(self, active, now=None, sample=None):
+            self.disk.append(active)
+
+        def sampled(self, now, sample, speed, failures, required, status, disk_active):
+            self.failures.append(failures)
+
+    return Recording()
+
+
+def test_loop_resets_failures_on_disk_activity(nsw, monkeypatch):
+    activity = iter([False, False, True, False, False])
+    monkeypatch.setattr(nsw, 'check_disk_activity', lambda report: next(activity))
+    reporter = recording(nsw, 4)
+    loop = nsw.MonitorLoop(profile(nsw, monitor_disk=True), reporter, Slowdown(0), reporter.clock)
+    loop.restart()
+    assert loop.run() == 'stopped'
+    assert reporter.disk == [False, False, True, False, False]
+    assert reporter.failures == [1, 2, 1, 2]
+
+
+def test_loop_forced_action_skips_failures(nsw):
+    reporter = recording(nsw, 10)
+    reporter.take_action = iter(['b']).__next__
+    countdowns = []
+    reporter.countdown = lambda mode, delay: countdowns.append((mode, delay)) or True
+    loop = nsw.MonitorLoop(profile(nsw), reporter, Slowdown(100), reporter.clock)
+    loop.restart()
+    assert loop.run() == 'action'
+    assert loop.action_mode == 'b' and countdowns == [('b', 2)]
+    assert reporter.failures == [3]
+
+
+def test_loop_defers_disk_checks_while_far_above_threshold(nsw, monkeypatch):
+    checks = []
+
+    def disk(report):
+        checks.append(reporter.clock.time())
+        return False
+
+    monkeypatch.setattr(nsw, 'check_disk_activity', disk)
+    reporter = recording(nsw, 9)
+    # 1 МБ/с при пороге 0.1 МБ/с: проверка дисков нужна не чаще раза в 60 секунд
+    loop = nsw.MonitorLoop(profile(nsw, monitor_disk=True, max_interval=60), reporter, Slowdown(7), reporter.clock)
+    loop.restart()
+    assert loop.run() == 'stopped'
+    assert reporter.failures == [0, 0, 0, 0, 0, 0, 0, 1, 2]
+    # Первый замер, затем раз в 60 секунд; замер ниже порога проверяет диски сразу после себя
+    assert checks == [1010.0, 1070.0, 1080.0, 1090.0]
+    assert 'сэкономлено' in loop.trigger.status()
+
+
+def test_deferred_disk_check_discards_failure(nsw, monkeypatch):
+    activity = iter([False, True, False, False])
+    monkeypatch.setattr(nsw, 'check_disk_activity', lambda report: next(activity))
+    reporter = recording(nsw, 4)
+    loop = nsw.MonitorLoop(profile(nsw, monitor_disk=True, max_interval=600), reporter, Slowdown(2), reporter.clock)
+    loop.restart()
+    assert loop.run() == 'stopped'
+    # Третий замер ниже порога, но диски заняты: пропуск не засчитан
+    assert reporter.failures == [0, 0, 1, 2]
+    assert reporter.disk[-3:] == [True, False, False]
+
+
+def test_journal_records_are_tagged_with_interface_set(nsw, workdir):
+    profile_both = profile(nsw, interfaces=['eth0', 'wlan0'], action_mode='b')
+    nsw.monitor_traffic(profile_both, counters=Slowdown(2), clock=nsw.VirtualClock(1000.0),
+                        action=lambda mode: None, interactive=False)
+    with nsw.JournalReader(nsw.JOURNAL_FILE) as reader:
+        assert {record.interface for record in reader} == {'eth0+wlan0'}
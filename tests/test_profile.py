@@ -0,0 +1,115 @@
+import pytest
+
+MB = 1024**2
+
+
+def make(nsw, **values):
+    return nsw.Profile(dict({'interface': 'eth0'}, **values), 'test')
+
+
+def test_defaults_are_valid(nsw):
+    profile = make(nsw)
+    assert profile.interfaces == ('eth0',)
+    assert profile.action_name == nsw.ACTION_NAMES[profile.action_mode]
+
+
+@pytest.mark.parametrize('budget', [0, -1, None, '5', True])
+def test_budget_mode_requires_positive_budget(nsw, budget):
+    with pytest.raises(ValueError, match='budget_bytes'):
+        make(nsw, trigger_mode='v', budget_bytes=budget)
+
+
+def test_budget_trigger_rejects_zero_budget(nsw):
+    with pytest.raises(ValueError, match='budget_bytes'):
+        nsw.ByteBudgetTrigger({'budget_bytes': 0})
+    trigger = make(nsw, trigger_mode='v', budget_bytes=MB).make_trigger()
+    trigger.start(0, 0)
+    assert not trigger.update(MB / 10, 10, MB // 2)
+    assert trigger.update(MB / 10, 20, MB)
+
+
+def test_budget_prompt_insists_on_positive_value(nsw, monkeypatch, capsys):
+    answers = iter(['v', '', 'abc', '0', '1.5', ''])
+    monkeypatch.setattr('builtins.input', lambda prompt='': next(answers))
+    settings = dict(nsw.PROFILE_DEFAULTS, interface='eth0', budget_bytes=0)
+    nsw.ask_trigger_settings(settings)
+    assert settings['budget_bytes'] == int(1.5 * 1024**3)
+    assert capsys.readouterr().out.count('больше 0') == 2
+
+
+@pytest.mark.parametrize('values, key', [
+    ({'trigger_mode': 'p', 'percentile_window': 0}, 'percentile_window'),
+    ({'trigger_mode': 'p', 'percentile': 150}, 'percentile'),
+    ({'trigger_mode': 'p', 'percentile': '90'}, 'percentile'),
+    ({'trigger_mode': 'a', 'baseline_fraction': 'x'}, 'baseline_fraction'),
+    ({'trigger_mode': 'a', 'baseline_sigmas': -1}, 'baseline_sigmas'),
+    ({'trigger_mode': 'a', 'baseline': [1, 2]}, 'baseline'),
+    ({'trigger_mode': 'c', 'cusum_drop': 0}, 'cusum_drop'),
+    ({'trigger_mode': 'c', 'cusum_false_alarms': 0}, 'cusum_false_alarms'),
+    ({'trigger_mode': 'f', 'forecast_window': 0}, 'forecast_window'),
+    ({'trigger_mode': 'f', 'forecast_min_r2': 2}, 'forecast_min_r2'),
+    ({'trigger_mode': 't', 'max_interval': '5m'}, 'max_interval'),
+    ({'trigger_mode': 'r', 'rules': {'all': [{'signal': 'net', 'below': 1}], 'stages': ['x']}}, 'stages'),
+    ({'trigger_mode': 'r', 'rules': {'signal': 'gpu', 'below': 1}}, 'gpu'),
+    ({'trigger_mode': 'i', 'idle_signals': {'cpu': {'weight': 'x'}}}, 'weight'),
+    ({'trigger_mode': 'i', 'idle_signals': {'gpu': {}}}, 'gpu'),
+])
+def test_trigger_parameters_are_validated(nsw, values, key):
+    with pytest.raises(ValueError, match=key):
+        make(nsw, **values)
+
+
+@pytest.mark.parametrize('mode', list('tpacfvri'))
+def test_every_mode_accepts_its_defaults(nsw, mode):
+    values = {'trigger_mode': mode, 'budget_bytes': MB,
+              'rules': {'signal': 'net', 'below': 1}}
+    profile = make(nsw, **values)
+    assert isinstance(profile.make_trigger(), nsw.TRIGGER_CLASSES[mode])
+
+
+@pytest.mark.parametrize('values', [
+    {'interface': ''},
+    {'traffic_type': 'x'},
+    {'allowed_failures': 0},
+    {'allowed_failures': 1.5},
+    {'interval': 0},
+    {'threshold': -1},
+    {'action_mode': 'x'},
+    {'trigger_mode': 'z'},
+    {'hooks': 'echo'},
+])
+def test_base_parameters_are_validated(nsw, values):
+    with pytest.raises(ValueError, match="Профиль 'test'"):
+        make(nsw, **values)
+
+
+@pytest.mark.parametrize('hook, error', [
+    ('echo', 'объектом'),
+    ({'name': 'пусто'}, 'command или python'),
+    ({'command': 'sync', 'python': 'mod:func'}, 'command или python'),
+    ({'python': 'my module:stop'}, 'модуль:функция'),
+    ({'python': 'tools:stop:now'}, 'модуль:функция'),
+    ({'command': 'sync', 'timeout': 'скоро'}, 'скоро'),
+    ({'command': 'sync', 'timeout': 0}, 'тайм-аут'),
+    ({'command': 'sync', 'timeout': -5}, 'тайм-аут'),
+])
+def test_hooks_are_validated_at_load(nsw, hook, error):
+    hooks = [{'command': 'sync', 'timeout': '30s'}, hook]
+    with pytest.raises(ValueError, match=f"Профиль 'test': подготовительная команда №2: .*{error}"):
+        make(nsw, hooks=hooks)
+
+
+def test_valid_hooks_are_accepted(nsw):
+    hooks = [{'command': 'sync'}, {'python': 'tools.torrent:pause', 'timeout': '10s'}, {'python': 'tools'}]
+    assert make(nsw, hooks=hooks).hooks == hooks
+
+
+def test_edit_refuses_rules_that_do_not_compile(nsw, workdir, monkeypatch, capsys):
+    settings = dict(nsw.PROFILE_DEFAULTS, interface='eth0')
+    nsw.save_profile('test', settings)
+    broken = dict(settings, trigger_mode='r', rules={'signal': 'gpu', 'below': 1})
+    monkeypatch.setattr(nsw, 'load_profiles', lambda: {'test': broken})
+    monkeypatch.setattr('builtins.input', lambda prompt='': 'y' if 'Сохранить' in prompt else '')
+    assert nsw.edit_profile('test') is False
+    assert "Изменения не сохранены" in capsys.readouterr().out
+    assert nsw.PROFILES.load()['test'] == settings
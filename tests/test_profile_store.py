@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+
+@pytest.fixture
+def store(nsw, workdir, monkeypatch):
+    store = nsw.ProfileStore(str(workdir / 'profiles.json'))
+    monkeypatch.setattr(nsw, 'PROFILES', store)
+    return store
+
+
+def test_save_and_load_round_trip(store):
+    store.save({'a': {'threshold': 1}})
+    loaded = store.load()
+    assert loaded == {'a': {'threshold': 1}}
+    loaded['a']['threshold'] = 2
+    assert store.load() == {'a': {'threshold': 1}}, "load возвращает копию"
+
+
+def test_external_change_is_picked_up(store, workdir):
+    store.save({'a': {}})
+    (workdir / 'profiles.json').write_text(json.dumps({'a': {}, 'b': {'x': 1}}), encoding='utf-8')
+    assert store.load() == {'a': {}, 'b': {'x': 1}}
+
+
+def test_batch_is_discarded_on_error(store, workdir):
+    store.save({'a': {}})
+    before = (workdir / 'profiles.json').read_bytes()
+    with pytest.raises(RuntimeError):
+        with store.batch() as profiles:
+            profiles['b'] = {}
+            raise RuntimeError
+    assert (workdir / 'profiles.json').read_bytes() == before
+
+
+def test_corrupt_file_is_kept_as_backup(nsw, store, workdir, capsys):
+    path = workdir / 'profiles.json'
+    path.write_text('{"a": {"threshold": ', encoding='utf-8')
+    assert nsw.save_profile('b', {'threshold': 5}) is True
+    assert (workdir / 'profiles.json.bak').read_text(encoding='utf-8') == '{"a": {"threshold": '
+    assert json.loads(path.read_text(encoding='utf-8')) == {'b': {'threshold': 5}}
+    assert '.bak' in capsys.readouterr().out
+    assert store.load() == {'b': {'threshold': 5}}
+
+
+def test_update_profile_changes_only_given_fields(nsw, store):
+    store.save({'a': {'threshold': 1, 'interval': 10}})
+    assert nsw.update_profile('a', threshold=2)
+    assert not nsw.update_profile('missing', threshold=2)
+    assert store.load() == {'a': {'threshold': 2, 'interval': 10}}
+
+
+def test_corrupt_file_keeps_failing_until_changed(store, workdir):
+    (workdir / 'profiles.json').write_text('not json', encoding='utf-8')
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            store.load()
+    store.save({})
+    assert store.load() == {}
@@ -0,0 +1,102 @@
+import sys
+import time
+
+import pytest
+
+MB = 1024**2
+
+
+@pytest.fixture
+def trace_path(tmp_path):
+    """Трасса на полчаса: загрузка 10 минут, затем простой"""
+    lines = ["timestamp,interface,rx,tx"]
+    total = 0
+    for second in range(0, 1801, 5):
+        lines.append(f"{1_700_000_000 + second},eth0,{total},0")
+        if second < 600:
+            total += 5 * 10 * MB
+    path = tmp_path / 'trace.csv'
+    path.write_text("\n".join(lines) + "\n", encoding='utf-8')
+    return str(path)
+
+
+def test_replay_fires_after_download_ends(nsw, trace_path):
+    trace = nsw.load_trace(trace_path)
+    settings = dict(nsw.PROFILE_DEFAULTS, threshold=MB, allowed_failures=3, interval=10, shutdown_delay=30)
+    fired = nsw.replay_trace(trace, settings)
+    assert fired
+    first, mode = fired[0]
+    assert mode == 's'
+    assert 600 + 30 <= first - trace.times[0] <= 600 + 30 + 40
+
+
+def test_replay_runs_no_hooks(nsw, trace_path, tmp_path, monkeypatch):
+    def forbidden(*args, **kwargs):
+        raise AssertionError("подготовительные команды не должны запускаться при воспроизведении")
+
+    monkeypatch.setattr(nsw, 'HookRunner', forbidden)
+    marker = tmp_path / 'hook-ran'
+    settings = dict(nsw.PROFILE_DEFAULTS, threshold=MB, allowed_failures=3, interval=10, shutdown_delay=30,
+                    hooks=[{'command': f'touch "{marker}"', 'timeout': '5s'}], hooks_deadline='10s')
+    started = time.monotonic()
+    fired = nsw.replay_trace(nsw.load_trace(trace_path), settings)
+    assert fired
+    assert not marker.exists()
+    assert time.monotonic() - started < 5
+
+
+LIVE_MODES = {'r': {'rules': {'signal': 'cpu', 'below': 10}}, 'i': {}}
+
+
+@pytest.mark.parametrize('mode', sorted(LIVE_MODES))
+def test_live_modes_are_refused_in_replay(nsw, trace_path, mode, capsys):
+    settings = dict(nsw.PROFILE_DEFAULTS, trigger_mode=mode, **LIVE_MODES[mode])
+    with pytest.raises(ValueError, match='состояния компьютера'):
+        nsw.replay_trace(nsw.load_trace(trace_path), settings)
+    assert nsw.show_replay(trace_path, settings) == 1
+    assert 'состояния компьютера' in capsys.readouterr().out
+
+
+@pytest.mark.parametrize('mode', sorted(LIVE_MODES))
+def test_live_modes_are_skipped_in_comparison(nsw, trace_path, mode, capsys):
+    settings = dict(nsw.PROFILE_DEFAULTS, threshold=MB, **LIVE_MODES[mode])
+    assert nsw.show_replay(trace_path, settings, compare=['t', mode]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert any(line.startswith(mode) and 'не воспроизводится' in line for line in lines)
+    assert any(line.startswith('t ') for line in lines)
+
+
+@pytest.mark.parametrize('mode', sorted(LIVE_MODES))
+def test_live_modes_are_refused_in_tune_and_analyze(nsw, trace_path, mode, workdir, capsys):
+    settings = dict(nsw.PROFILE_DEFAULTS, interface='eth0', trigger_mode=mode, **LIVE_MODES[mode])
+    assert nsw.show_tuning(str(workdir), 'labels.json', [10], [1], [3], settings) == 1
+    assert 'состояния компьютера' in capsys.readouterr().out
+
+    nsw.PROFILES.save({'live': settings, 'plain': dict(settings, trigger_mode='t')})
+    assert nsw.run_cli(['analyze', trace_path]) == 0
+    out = capsys.readouterr().out
+    assert "Профиль 'live' пропущен" in out and "Профиль 'plain'" in out
+
+
+def test_max_interval_keeps_fire_times(nsw, trace_path):
+    trace = nsw.load_trace(trace_path)
+    settings = dict(nsw.PROFILE_DEFAULTS, threshold=MB, allowed_failures=3, interval=10, shutdown_delay=30)
+    fixed = nsw.replay_trace(trace, settings)
+    assert fixed
+    assert nsw.replay_trace(trace, dict(settings, max_interval=300)) == fixed
+
+
+def test_replay_leaves_stdout_alone(nsw, trace_path, monkeypatch, capsys):
+    streams = []
+    read = nsw.TraceCounters.read
+
+    def spy(counters):
+        # Другие потоки программы печатают в тот же sys.stdout во время воспроизведения
+        streams.append(sys.stdout)
+        return read(counters)
+
+    monkeypatch.setattr(nsw.TraceCounters, 'read', spy)
+    settings = dict(nsw.PROFILE_DEFAULTS, threshold=MB, allowed_failures=3, interval=10, shutdown_delay=30)
+    assert nsw.replay_trace(nsw.load_trace(trace_path), dict(settings, action_mode='b'))
+    assert streams and all(stream is sys.stdout for stream in streams)
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,102 @@
+import threading
+import time
+
+import pytest
+
+
+def test_parse_every(nsw):
+    assert nsw.parse_schedule('every 2h') == ('every', 7200)
+    assert nsw.parse_schedule('EVERY 1h30m') == ('every', 5400)
+
+
+def test_parse_days(nsw):
+    assert nsw.parse_schedule('daily 02:00') == ('days', frozenset(range(7)), 2, 0)
+    assert nsw.parse_schedule('mon-fri 23:00') == ('days', frozenset(range(5)), 23, 0)
+    assert nsw.parse_schedule('sat,sun 10:30') == ('days', frozenset({5, 6}), 10, 30)
+    # Диапазон через конец недели
+    assert nsw.parse_schedule('fri-mon 08:15')[1] == frozenset({4, 5, 6, 0})
+
+
+@pytest.mark.parametrize('text', ['every', 'every 0', 'daily 24:00', 'daily 7:5', 'xyz 10:00', 'mon-fri'])
+def test_parse_rejects_bad_schedules(nsw, text):
+    with pytest.raises(ValueError):
+        nsw.parse_schedule(text)
+
+
+def test_next_occurrence_is_strictly_after(nsw):
+    base = time.mktime((2026, 3, 4, 10, 0, 0, 0, 0, -1))  # Среда
+    daily = nsw.parse_schedule('daily 10:00')
+    assert nsw.next_occurrence(daily, base) == time.mktime((2026, 3, 5, 10, 0, 0, 0, 0, -1))
+    weekend = nsw.parse_schedule('sat,sun 09:00')
+    assert time.localtime(nsw.next_occurrence(weekend, base)).tm_wday == 5
+    assert nsw.next_occurrence(('every', 60), base) == base + 60
+
+
+def test_parse_deadline(nsw):
+    base = time.mktime((2026, 3, 4, 22, 0, 0, 0, 0, -1))
+    assert nsw.parse_deadline('1h30m', base) == base + 5400
+    assert nsw.parse_deadline('23:30', base) == base + 5400
+    assert nsw.parse_deadline('21:00', base) == base + 23 * 3600
+    with pytest.raises(ValueError):
+        nsw.parse_deadline('0', base)
+
+
+class StepClock:
+    """Часы обратного отсчета: каждый sleep сдвигает время и вызывает on_sleep"""
+
+    def __init__(self, on_sleep=None):
+        self.sleeps = 0
+        self.on_sleep = on_sleep
+
+    def sleep(self, seconds):
+        self.sleeps += 1
+        if self.on_sleep:
+            self.on_sleep(self.sleeps)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "таймер не сработал"
+        time.sleep(0.01)
+
+
+def test_timer_fires_after_countdown(nsw):
+    performed = []
+    clock = StepClock()
+    scheduler = nsw.TimerScheduler(perform=performed.append, countdown=5, clock=clock)
+    scheduler.add(time.time(), 'b')
+    wait_for(lambda: performed)
+    assert performed == ['b']
+    assert clock.sleeps == 5
+
+
+def test_cancel_during_countdown_skips_action(nsw, capsys):
+    performed = []
+    started = threading.Event()
+    scheduler = None
+
+    def on_sleep(count):
+        if count == 2:
+            assert scheduler.cancel(timer_id)
+            started.set()
+
+    scheduler = nsw.TimerScheduler(perform=performed.append, countdown=10, clock=StepClock(on_sleep))
+    timer_id = scheduler.add(time.time(), 's')
+    wait_for(started.is_set)
+    wait_for(lambda: scheduler.counting is None)
+    assert performed == []
+    assert 'действие отменено' in capsys.readouterr().out
+    assert not scheduler.cancel(timer_id)
+
+
+def test_cancelled_and_late_timers_do_not_fire(nsw, capsys):
+    performed = []
+    scheduler = nsw.TimerScheduler(perform=performed.append, countdown=0, clock=StepClock())
+    cancelled = scheduler.add(time.time() + 0.2, 's')
+    assert scheduler.cancel(cancelled)
+    scheduler.add(time.time() - nsw.TIMER_GRACE - 10, 'r')
+    scheduler.add(time.time() + 0.3, 'b')
+    wait_for(lambda: performed)
+    assert performed == ['b']
+    assert 'пропущен' in capsys.readouterr().out
@@ -0,0 +1,323 @@
+from collections import namedtuple
+from types import SimpleNamespace
+
+import pytest
+
+MB = 1024**2
+
+
+def settings(nsw, **values):
+    return dict(nsw.PROFILE_DEFAULTS, **values)
+
+
+def feed(trigger, speeds, interval=10, start=0.0):
+    """Подает замеры триггеру и возвращает список решений"""
+    return [trigger.update(speed, start + index * interval, 0) for index, speed in enumerate(speeds, 1)]
+
+
+def test_baseline_learns_and_detects_drop(nsw):
+    trigger = nsw.BaselineTrigger(settings(nsw, trigger_mode='a', threshold=MB))
+    assert not any(feed(trigger, [10 * MB, 12 * MB] * 20))
+    assert trigger.mean == pytest.approx(11 * MB, rel=0.05)
+    assert trigger.update(MB // 2 * 3, 1000, 0)
+
+
+def test_baseline_ignores_small_dip_at_constant_speed(nsw):
+    trigger = nsw.BaselineTrigger(settings(nsw, trigger_mode='a', threshold=MB))
+    feed(trigger, [10 * MB] * 50)
+    assert trigger.var == pytest.approx(0, abs=1)
+    # Без нижней границы сигмы порог совпадал со средним и срабатывал от любого колебания
+    assert not trigger.update(10 * MB * 0.995, 1000, 0)
+    assert trigger.limit < 10 * MB * 0.98
+    assert trigger.update(10 * MB * 0.9, 1010, 0)
+
+
+def test_forecast_classic_rule_fires_despite_good_fit(nsw):
+    trigger = nsw.ForecastTrigger(settings(nsw, trigger_mode='f', threshold=MB, allowed_failures=3,
+                                           shutdown_delay=30, forecast_window=300))
+    # Скорость плавно падает, прогноз надежен, но пересекает порог позже, чем замеры ушли под него
+    speeds = [4 * MB - index * 2.5 * MB / 80 for index in range(80)] + [0.9 * MB] * 3
+    decisions = feed(trigger, speeds)
+    assert trigger.r2 >= trigger.min_r2 and trigger.eta > trigger.shutdown_delay
+    assert decisions[-3:] == [False, False, True]
+    assert trigger.countdown is None
+
+
+def test_forecast_fires_early_with_minimum_countdown(nsw):
+    trigger = nsw.ForecastTrigger(settings(nsw, trigger_mode='f', threshold=MB, allowed_failures=3,
+                                           shutdown_delay=30))
+    speeds = [10 * MB - index * MB for index in range(9)]
+    decisions = feed(trigger, speeds, interval=10)
+    assert decisions[-1]
+    assert trigger.countdown >= nsw.FORECAST_MIN_COUNTDOWN
+
+
+def test_forecast_falls_back_to_classic_rule_without_fit(nsw):
+    trigger = nsw.ForecastTrigger(settings(nsw, trigger_mode='f', threshold=MB, allowed_failures=2))
+    assert feed(trigger, [0, 0]) == [False, True]
+
+
+def test_percentile_waits_for_full_window(nsw):
+    trigger = nsw.PercentileTrigger(settings(nsw, trigger_mode='p', threshold=MB, percentile_window=100))
+    decisions = feed(trigger, [0.1 * MB] * 12)
+    # Первый замер в момент 10 - окно заполняется к моменту 110
+    assert decisions == [False] * 10 + [True, True]
+
+
+def test_percentile_ignores_short_dips(nsw):
+    speeds = ([0.1 * MB] * 17 + [10 * MB] * 3) * 5
+    p90 = nsw.PercentileTrigger(settings(nsw, trigger_mode='p', threshold=MB, percentile=90, percentile_window=200))
+    assert not any(feed(p90, speeds))
+    p80 = nsw.PercentileTrigger(settings(nsw, trigger_mode='p', threshold=MB, percentile=80, percentile_window=200))
+    assert any(feed(p80, speeds))
+
+
+def test_histogram_quantile_is_within_bucket_precision(nsw):
+    histogram = nsw.SlidingLogHistogram(1000)
+    values = [(index + 1) * 10 * 1024 for index in range(1000)]
+    for index, value in enumerate(values):
+        histogram.add(value, index * 0.5)
+    for q in (0.1, 0.5, 0.9):
+        assert histogram.quantile(q) == pytest.approx(values[int(q * len(values)) - 1], rel=0.1)
+
+
+def test_histogram_forgets_expired_slots(nsw):
+    histogram = nsw.SlidingLogHistogram(160, slots=16)
+    for second in range(0, 160, 10):
+        histogram.add(0.1 * MB, second)
+    for second in range(160, 320, 10):
+        histogram.add(10 * MB, second)
+    assert histogram.count == 16
+    assert histogram.quantile(0.01) == pytest.approx(10 * MB, rel=0.1)
+
+
+def test_percentile_reconfigure_keeps_histogram_only_for_same_window(nsw):
+    trigger = nsw.PercentileTrigger(settings(nsw, trigger_mode='p', threshold=MB, percentile_window=100))
+    assert trigger.reconfigure(settings(nsw, threshold=2 * MB, percentile=50, percentile_window=100))
+    assert trigger.threshold == 2 * MB and trigger.q == 0.5
+    assert not trigger.reconfigure(settings(nsw, threshold=MB, percentile_window=300))
+
+
+def cusum(nsw, **values):
+    return nsw.CusumTrigger(settings(nsw, **dict({'trigger_mode': 'c', 'threshold': MB, 'allowed_failures': 3}, **values)))
+
+
+def test_cusum_uses_classic_rule_during_warmup(nsw):
+    trigger = cusum(nsw)
+    assert feed(trigger, [0, 0, 0]) == [False, False, True]
+    assert trigger.count == 0
+
+
+def test_cusum_detects_drop_quickly_without_false_alarms(nsw):
+    trigger = cusum(nsw)
+    assert trigger.decisive
+    steady = [9.5 * MB, 10.5 * MB] * 200
+    assert not any(feed(trigger, steady))
+    decisions = feed(trigger, [3 * MB] * 5, start=len(steady) * 10)
+    assert True in decisions[:3]
+
+
+def test_cusum_ignores_drop_smaller_than_configured(nsw):
+    trigger = cusum(nsw, cusum_drop=0.5)
+    steady = [9.5 * MB, 10.5 * MB] * 50
+    feed(trigger, steady)
+    assert not any(feed(trigger, [8.5 * MB] * 50, start=len(steady) * 10))
+
+
+def test_cusum_limit_grows_with_rarer_false_alarms(nsw):
+    assert nsw.cusum_limit(1.0, 10**5) > nsw.cusum_limit(1.0, 10**3) > 0
+
+
+def test_cusum_limit_accepts_zero_reference(nsw):
+    assert nsw.cusum_limit(0.0, 10**4) == nsw.cusum_limit(nsw.CUSUM_MIN_K, 10**4) > 0
+
+
+def test_cusum_survives_all_zero_trace(nsw):
+    # Порог 0: замеры 0 Б/с попадают в базу, и обычная скорость оказывается равна нулю
+    trigger = cusum(nsw, threshold=0)
+    assert not any(feed(trigger, [0] * 50))
+    assert trigger.count == 50 and trigger.mean == 0
+    assert 'классическое правило' in trigger.status()
+
+
+def test_cusum_base_at_threshold_falls_back_to_classic_rule(nsw):
+    trigger = cusum(nsw)
+    feed(trigger, [MB] * 20)
+    assert trigger.mean == pytest.approx(MB)
+    assert feed(trigger, [0.5 * MB] * 3, start=200) == [False, False, True]
+
+
+def budget(nsw, size):
+    return nsw.ByteBudgetTrigger(settings(nsw, trigger_mode='v', budget_bytes=size))
+
+
+def test_budget_counts_bytes_since_start(nsw):
+    trigger = budget(nsw, 100 * MB)
+    trigger.start(0.0, 500 * MB)
+    assert not trigger.update(MB, 10, 560 * MB)
+    assert trigger.done == 60 * MB
+    assert trigger.update(MB, 20, 600 * MB)
+
+
+def test_budget_survives_counter_reset(nsw):
+    trigger = budget(nsw, 100 * MB)
+    trigger.start(0.0, 500 * MB)
+    trigger.update(MB, 10, 550 * MB)
+    # Счетчик интерфейса обнулился (переподключение): полученное не уменьшается
+    assert not trigger.update(MB, 20, 10 * MB)
+    assert trigger.done == 50 * MB
+    assert trigger.update(MB, 30, 60 * MB)
+
+
+def test_budget_sleeps_until_close_to_eta(nsw):
+    trigger = budget(nsw, 10 * 1024 * MB)
+    trigger.start(0.0, 0)
+    trigger.update(MB, 10, 10 * MB)
+    # До цели почти 3 часа при 1 МБ/с - замеры не чаще BUDGET_MAX_SLEEP
+    assert trigger.next_interval(10) == nsw.BUDGET_MAX_SLEEP
+    trigger = budget(nsw, 110 * MB)
+    trigger.start(0.0, 0)
+    trigger.update(MB, 10, 10 * MB)
+    assert trigger.next_interval(10) == pytest.approx(100 - nsw.BUDGET_FINE_WINDOW)
+    trigger.update(MB, 50, 100 * MB)
+    assert nsw.BUDGET_FINE_STEP <= trigger.next_interval(10) <= 5
+
+
+def test_budget_keeps_baseline_after_cancel(nsw):
+    trigger = budget(nsw, 100 * MB)
+    trigger.start(0.0, 500 * MB)
+    assert trigger.update(MB, 10, 620 * MB)
+    # Отсчет отменен: за время отсчета получено еще 30 МБ, точка отсчета прежняя
+    assert trigger.rearm()
+    trigger.start(20.0, 650 * MB)
+    assert not trigger.update(MB, 30, 690 * MB)
+    assert trigger.done == 190 * MB
+    assert trigger.update(MB, 40, 700 * MB)
+
+
+def rule(nsw, **rules):
+    trigger = nsw.RuleTrigger(settings(nsw, trigger_mode='r', rules=rules))
+    performed, messages = [], []
+    trigger.bind(performed.append, messages.append)
+    return trigger, performed, messages
+
+
+def test_rule_holds_condition_for_duration(nsw):
+    trigger, _, _ = rule(nsw, signal='net', below=1, **{'for': '30s'})
+    assert feed(trigger, [0.5 * MB] * 4) == [False, False, False, True]
+    trigger, _, _ = rule(nsw, signal='net', below=1, **{'for': '30s'})
+    # Скорость выше порога прерывает отсчет
+    assert not any(feed(trigger, [0.5 * MB, 0.5 * MB, 2 * MB, 0.5 * MB, 0.5 * MB]))
+
+
+def test_rule_k_of_n(nsw):
+    trigger, _, _ = rule(nsw, signal='net', below=1, k=2, n=3)
+    assert not any(feed(trigger, [0.5 * MB, 2 * MB, 2 * MB, 0.5 * MB, 2 * MB, 2 * MB]))
+    trigger, _, _ = rule(nsw, signal='net', below=1, k=2, n=3)
+    assert feed(trigger, [0.5 * MB, 2 * MB, 0.5 * MB]) == [False, False, True]
+
+
+def test_rule_all_and_any(nsw):
+    trigger, _, _ = rule(nsw, all=[{'signal': 'net', 'below': 2}, {'signal': 'net', 'above': 1}])
+    assert feed(trigger, [0.5 * MB, 3 * MB, 1.5 * MB]) == [False, False, True]
+    either = [{'signal': 'net', 'below': 1}, {'signal': 'net', 'above': 2}]
+    trigger, _, _ = rule(nsw, any=either)
+    assert feed(trigger, [1.5 * MB, 3 * MB]) == [False, True]
+    trigger, _, _ = rule(nsw, any=either)
+    assert feed(trigger, [1.5 * MB, 0.5 * MB]) == [False, True]
+
+
+def test_rule_stages_escalate_and_reset(nsw):
+    stages = [{'hold': 0, 'action': 'b'}, {'hold': '20s', 'action': 'h'}]
+    trigger, performed, messages = rule(nsw, signal='net', below=1, stages=stages)
+    assert feed(trigger, [0.5 * MB, 2 * MB, 0.5 * MB, 0.5 * MB, 0.5 * MB]) == [False, False, False, False, True]
+    # Промежуточная ступень выполнялась сразу при каждом новом выполнении условия
+    assert performed == ['b', 'b'] and len(messages) == 2
+    assert trigger.action_mode == 'h'
+
+
+@pytest.mark.parametrize('mode', ['s', 'r', 'h'])
+def test_rule_refuses_destructive_intermediate_stage(nsw, mode):
+    stages = [{'hold': 0, 'action': mode}, {'hold': '5m', 'action': 's'}]
+    with pytest.raises(ValueError, match='промежуточные ступени'):
+        rule(nsw, signal='net', below=1, stages=stages)
+
+
+def test_rule_rejects_unknown_signal(nsw):
+    with pytest.raises(ValueError, match="неизвестный сигнал"):
+        rule(nsw, signal='gpu', below=1)
+
+
+@pytest.fixture
+def idle_readings(nsw, monkeypatch):
+    """Подменяет чтение дисков, процессора, ввода и процессов у IdleTrigger"""
+    readings = {'disk': 0.0, 'cpu': 0.0, 'input': 600.0, 'busy': set(), 'reads': []}
+
+    def reader(name):
+        def read(trigger, now):
+            readings['reads'].append((name, now))
+            return readings[name]
+        return read
+
+    monkeypatch.setattr(nsw.IdleTrigger, 'READERS', {name: reader(name) for name in ('disk', 'cpu', 'input')})
+    monkeypatch.setattr(nsw.IdleTrigger, 'scan_processes', lambda trigger, now: readings['busy'])
+    return readings
+
+
+def idle(nsw):
+    return nsw.IdleTrigger(settings(nsw, trigger_mode='i', threshold=MB))
+
+
+def test_idle_fuses_signals(nsw, idle_readings):
+    trigger = idle(nsw)
+    assert trigger.update(0, 10, 0) and trigger.score == 1.0
+    idle_readings.update(disk=5.0, cpu=50.0, input=0.0)
+    trigger = idle(nsw)
+    assert not trigger.update(5 * MB, 10, 0) and trigger.score == 0.0
+
+
+def test_idle_checks_processes_when_ambiguous(nsw, idle_readings):
+    idle_readings['input'] = 300.0
+    # Сеть занята (вес 2), остальные сигналы простаивают: оценка 3/5
+    trigger = idle(nsw)
+    idle_readings['busy'] = None
+    assert not trigger.update(3 * MB, 10, 0)
+    assert trigger.score == pytest.approx(0.6)
+    idle_readings['busy'] = set()
+    assert trigger.update(3 * MB, 20, 0)
+    idle_readings['busy'] = {'game.exe'}
+    assert not trigger.update(3 * MB, 30, 0)
+    assert 'game.exe' in trigger.status()
+
+
+def test_idle_reads_each_signal_at_its_own_period(nsw, idle_readings):
+    trigger = idle(nsw)
+    feed(trigger, [0] * 7)
+    reads = idle_readings['reads']
+    assert [now for name, now in reads if name == 'disk'] == [10, 40, 70]
+    assert [now for name, now in reads if name == 'cpu'] == [10, 20, 30, 40, 50, 60, 70]
+
+
+def test_idle_skips_disabled_signals(nsw, idle_readings):
+    trigger = nsw.IdleTrigger(settings(nsw, trigger_mode='i', threshold=MB,
+                                       idle_signals={'disk': {'weight': 0}, 'input': {'weight': 0}}))
+    assert set(trigger.signals) == {'net', 'cpu'}
+    idle_readings['disk'] = 100.0
+    assert trigger.update(0, 10, 0)
+    assert all(name == 'cpu' for name, _ in idle_readings['reads'])
+
+
+def test_idle_cpu_load_does_not_count_guest_time_twice(nsw, monkeypatch):
+    CpuTimes = namedtuple('CpuTimes', 'user nice system idle iowait guest guest_nice')
+    samples = iter([CpuTimes(100, 0, 0, 100, 0, 0, 0), CpuTimes(200, 0, 0, 200, 0, 100, 0)])
+    monkeypatch.setattr(nsw, 'psutil', SimpleNamespace(cpu_times=lambda: next(samples)))
+    trigger = idle(nsw)
+    assert trigger.read_cpu(0) is None
+    # Гостевая система заняла половину времени - оно уже учтено в user
+    assert trigger.read_cpu(10) == pytest.approx(50.0)
+
+
+def test_idle_refuses_all_zero_weights(nsw):
+    zero = {name: {'weight': 0} for name in nsw.IDLE_SIGNALS}
+    with pytest.raises(ValueError, match='нулевой вес'):
+        nsw.Profile(settings(nsw, interface='eth0', trigger_mode='i', idle_signals=zero))
@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+
+def write_trace(path, start, seconds, busy_until, rate=10 * 1024**2):
+    """Трасса: загрузка со скоростью rate до busy_until секунд от начала, затем простой"""
+    lines = ["timestamp,interface,rx,tx"]
+    total = 0
+    for second in range(seconds + 1):
+        lines.append(f"{start + second},eth0,{total},0")
+        if second < busy_until:
+            total += rate
+    path.write_text("\n".join(lines) + "\n", encoding='utf-8')
+
+
+@pytest.fixture
+def traces(tmp_path):
+    write_trace(tmp_path / 'a.csv', 1_700_000_000, 600, 300)
+    write_trace(tmp_path / 'b.csv', 1_700_050_000, 600, 120)
+    return tmp_path
+
+
+def test_labels_are_relative_to_trace_start(nsw, traces):
+    pytest.importorskip('numpy')
+    labels = {'a.csv': '5m', 'b.csv': 120}
+    results = nsw.tune_profile(str(traces), labels, [10], [1024**2], [3], shutdown_delay=0, workers=1)
+    best = results[0]
+    assert best['false_rate'] == 0 and best['miss_rate'] == 0
+    # Три замера по 10 секунд после окончания загрузки
+    assert 20 <= best['mean_delay'] <= 40
+
+
+def test_unfinished_label_is_allowed(nsw, traces):
+    pytest.importorskip('numpy')
+    results = nsw.tune_profile(str(traces), {'a.csv': None, 'b.csv': 120}, [10], [1024**2], [3],
+                               shutdown_delay=0, workers=1)
+    assert results[0]['miss_rate'] == 0
+
+
+@pytest.mark.parametrize('label', [1_700_000_300, 601, -5])
+def test_label_outside_trace_is_rejected(nsw, traces, label):
+    pytest.importorskip('numpy')
+    with pytest.raises(ValueError, match='a.csv'):
+        nsw.tune_profile(str(traces), {'a.csv': label}, [10], [1024**2], [3], workers=1)
+
+
+def test_show_tuning_reports_bad_label(nsw, traces, capsys):
+    pytest.importorskip('numpy')
+    (traces / 'labels.json').write_text(json.dumps({'a.csv': 1_700_000_300}), encoding='utf-8')
+    settings = dict(nsw.PROFILE_DEFAULTS, shutdown_delay=0, traffic_type='d')
+    assert nsw.show_tuning(str(traces), str(traces / 'labels.json'), [10], [1], [3], settings, workers=1) == 1
+    assert 'вне трассы' in capsys.readouterr().out
+
+
+@pytest.mark.parametrize('mode', list('pacfv'))
+def test_apply_is_refused_for_other_trigger_modes(nsw, traces, workdir, mode, capsys):
+    (traces / 'labels.json').write_text(json.dumps({'a.csv': '5m'}), encoding='utf-8')
+    settings = dict(nsw.PROFILE_DEFAULTS, trigger_mode=mode, shutdown_delay=0)
+    assert nsw.show_tuning(str(traces), str(traces / 'labels.json'), [10], [1], [3], settings,
+                           apply_to='test', workers=1) == 1
+    assert '--apply не выполняется' in capsys.readouterr().out
+    assert nsw.PROFILES.load() == {}
+
+
+def test_apply_saves_threshold_profile(nsw, traces, workdir):
+    pytest.importorskip('numpy')
+    (traces / 'labels.json').write_text(json.dumps({'a.csv': '5m', 'b.csv': 120}), encoding='utf-8')
+    settings = dict(nsw.PROFILE_DEFAULTS, interface='eth0', shutdown_delay=0)
+    assert nsw.show_tuning(str(traces), str(traces / 'labels.json'), [10], [1], [3], settings,
+                           apply_to='test', workers=1) == 0
+    assert nsw.PROFILES.load()['test']['threshold'] == 1024**2
@@ -0,0 +1,54 @@
+import ctypes
+
+import pytest
+
+
+class FakeLibrary:
+    """advapi32/kernel32: все вызовы успешны, AdjustTokenPrivileges оставляет код ошибки"""
+
+    def __init__(self, state):
+        self.state = state
+
+    def __getattr__(self, name):
+        def call(*args):
+            if name == 'AdjustTokenPrivileges':
+                self.state['last_error'] = self.state['adjust_error']
+                return self.state['adjust_result']
+            self.state['last_error'] = 0
+            return 1
+        return call
+
+
+@pytest.fixture
+def fake_windows(monkeypatch):
+    state = {'last_error': 0, 'adjust_error': 0, 'adjust_result': 1}
+
+    def win_error(code=None, descr=None):
+        return OSError(code, descr or f"код {code}")
+
+    monkeypatch.setattr(ctypes, 'WinDLL', lambda name, use_last_error=False: FakeLibrary(state), raising=False)
+    monkeypatch.setattr(ctypes, 'WinError', win_error, raising=False)
+    monkeypatch.setattr(ctypes, 'get_last_error', lambda: state['last_error'], raising=False)
+    return state
+
+
+def test_privilege_enabled(nsw, fake_windows):
+    backend = nsw.WindowsBackend()
+    backend.enable_shutdown_privilege()
+    assert backend.privilege_enabled
+
+
+def test_privilege_not_assigned_is_reported(nsw, fake_windows):
+    fake_windows['adjust_error'] = nsw.ERROR_NOT_ALL_ASSIGNED
+    backend = nsw.WindowsBackend()
+    with pytest.raises(OSError, match='SeShutdownPrivilege') as error:
+        backend.enable_shutdown_privilege()
+    assert error.value.errno == nsw.ERROR_NOT_ALL_ASSIGNED
+    assert not backend.privilege_enabled
+
+
+def test_failed_adjust_is_reported(nsw, fake_windows):
+    fake_windows.update(adjust_result=0, adjust_error=5)
+    with pytest.raises(OSError) as error:
+        nsw.WindowsBackend().enable_shutdown_privilege()
+    assert error.value.errno == 5
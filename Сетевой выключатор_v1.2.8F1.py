@@ -1,27 +1,3 @@
-import os
-import sys
-import subprocess
-import time
-
-def install_packages():
-    required_packages = [
-        'psutil',
-        'winsound',
-        'msvcrt',  # Встроен в Windows, не требует установки
-        'ctypes',   # Встроен в Python, не требует установки
-    ]
-    
-    for package in required_packages:
-        try:
-            __import__(package)
-        except ImportError:
-            print(f"Установка пакета: {package}")
-            subprocess.check_call([sys.executable, '-m', 'pip', 'install', package], stdout=subprocess.DEVNULL)
-
-# Проверяем и устанавливаем зависимости перед запуском основной программы
-install_packages()
-
-# Далее идёт оригинальный код программы
 import psutil
 import time
 import os
@@ -1,6 +1,5 @@
 import os
 import sys
-import subprocess
 import time
 import psutil
 import threading
@@ -12,24 +11,6 @@ import winsound
 
 CONFIG_FILE = "profiles.json"
 
-def install_packages():
-    required_packages = [
-        'psutil',
-        'winsound',
-        'msvcrt',  # Встроен в Windows, не требует установки
-        'ctypes',   # Встроен в Python, не требует установки
-    ]
-    
-    for package in required_packages:
-        try:
-            __import__(package)
-        except ImportError:
-            print(f"Установка пакета: {package}")
-            subprocess.check_call([sys.executable, '-m', 'pip', 'install', package], stdout=subprocess.DEVNULL)
-
-# Проверяем и устанавливаем зависимости перед запуском основной программы
-install_packages()
-
 def turn_off_display():
     """Выключает дисплей"""
     try: